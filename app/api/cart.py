@@ -0,0 +1,51 @@
+"""Cart REST API under ``/api/v1``."""
+
+import dataclasses
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+
+from app.core.auth import api_user_id
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import ValidationError
+from app.core.serialization import FastJSONResponse
+from app.models.read_models import CartSummary
+from app.services.cart_service import AsyncCartService, CartOperation
+
+cart_router = APIRouter(prefix="/api/v1", tags=["cart"])
+
+MAX_BATCH_OPERATIONS = 200
+
+class CartOperationIn(BaseModel):
+    op: Literal["add", "set", "remove"]
+    product_id: int
+    quantity: int = Field(default=0, ge=0, le=1000)
+
+class CartBatchIn(BaseModel):
+    operations: List[CartOperationIn] = Field(max_length=MAX_BATCH_OPERATIONS)
+
+def _summary_response(summary: CartSummary) -> FastJSONResponse:
+    # Returned as a response so FastAPI skips jsonable_encoder
+    return FastJSONResponse({
+        "lines": [{**dataclasses.asdict(line), "line_total": round(line.line_total, 2)} for line in summary.lines],
+        "item_count": summary.item_count,
+        "subtotal": summary.subtotal,
+    })
+
+@cart_router.get("/cart")
+async def get_cart(user_id: int = Depends(api_user_id)) -> FastJSONResponse:
+    async with AsyncSessionLocal() as db:
+        lines = await AsyncCartService(db).get_cart_lines(user_id)
+    return _summary_response(CartSummary.from_lines(lines))
+
+@cart_router.post("/cart/batch")
+async def apply_cart_batch(batch: CartBatchIn, user_id: int = Depends(api_user_id)) -> FastJSONResponse:
+    """Apply add/set/remove operations in order, in one transaction, and return the resulting cart."""
+    operations = [CartOperation(op.op, op.product_id, op.quantity) for op in batch.operations]
+    try:
+        async with AsyncSessionLocal() as db:
+            summary = await AsyncCartService(db).apply_cart_batch(user_id, operations)
+    except ValidationError as e:
+        raise e.to_http_exception()
+    return _summary_response(summary)
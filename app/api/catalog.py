@@ -0,0 +1,131 @@
+"""Read-only catalog REST API under ``/api/v1``.
+
+Responses depend only on the URL and the catalog version, so every one
+carries a strong ETag built from the two. A request whose If-None-Match
+matches is answered with 304 before any database work. Responses are also
+tagged with surrogate keys for ``app.core.response_cache``.
+"""
+
+import base64
+import binascii
+import functools
+import hashlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response
+
+from app.core.catalog_version import catalog_version
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import ValidationError
+from app.core.serialization import FastJSONResponse
+from app.services.category_service import AsyncCategoryService
+from app.services.product_service import AsyncProductService
+
+catalog_router = APIRouter(prefix="/api/v1", tags=["catalog"])
+
+def catalog_etag(request: Request) -> str:
+    """Strong ETag for a catalog URL at the current catalog version."""
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+    return f'"{catalog_version.current()}-{digest}"'
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes added by proxies still match
+    return etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    max_age = settings.api_cache_max_age
+    cache_control = f"public, max-age={max_age}" if max_age else "public, no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+CatalogPayload = Tuple[Dict[str, Any], Iterable[str]]
+
+def conditional_get(handler):
+    """Serve the handler's JSON with an ETag, or 304 if the client already has it.
+
+    Handlers return the content and the surrogate keys of the data it shows,
+    or a response of their own (errors), which is sent as is.
+
+    The ETag is computed before the handler queries, so a write racing with
+    the request can only make the response newer than its tag, never older.
+    """
+    @functools.wraps(handler)
+    async def wrapper(request: Request, *args, **kwargs):
+        etag = catalog_etag(request)
+        if _matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=_cache_headers(etag))
+        result = await handler(request, *args, **kwargs)
+        if isinstance(result, Response):
+            return result
+        content, surrogate_keys = result
+        headers = {**_cache_headers(etag), "Surrogate-Key": " ".join(surrogate_keys)}
+        return FastJSONResponse(content=content, headers=headers)
+    return wrapper
+
+def _encode_cursor(product_id: int) -> str:
+    return base64.urlsafe_b64encode(str(product_id).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise ValidationError("Invalid cursor").to_http_exception()
+
+@catalog_router.get("/categories")
+@conditional_get
+async def list_categories(request: Request) -> CatalogPayload:
+    async with AsyncSessionLocal() as db:
+        categories = await AsyncCategoryService(db).get_categories()
+    return {"items": [
+        {"id": category.id, "name": category.name, "description": category.description,
+         "image_url": category.image_url}
+        for category in categories
+    ]}, ["catalog"]
+
+@catalog_router.get("/products")
+@conditional_get
+async def list_products(
+    request: Request,
+    category_id: Optional[int] = None,
+    search: Optional[str] = Query(default=None, max_length=100),
+    limit: int = Query(default=24, ge=1, le=100),
+    cursor: Optional[str] = None,
+) -> CatalogPayload:
+    after_id = _decode_cursor(cursor) if cursor else None
+    async with AsyncSessionLocal() as db:
+        # One extra row tells whether there is a next page
+        cards = await AsyncProductService(db).get_product_card_page(category_id, search, after_id, limit + 1)
+    page = cards[:limit]
+    return {
+        "items": page,
+        "next_cursor": _encode_cursor(page[-1].id) if len(cards) > limit else None,
+    }, ["catalog"]
+
+@catalog_router.get("/products/{product_id}")
+@conditional_get
+async def get_product(request: Request, product_id: int) -> CatalogPayload:
+    async with AsyncSessionLocal() as db:
+        product_service = AsyncProductService(db)
+        product = await product_service.get_product(product_id)
+        if product is None or not product.is_active:
+            # Raising would reach NiceGUI's 404 handler, which renders an HTML page
+            return FastJSONResponse(status_code=404, content={"detail": "Product not found"})
+        average_rating, review_count = await product_service.get_product_rating(product_id)
+    return {
+        "id": product.id,
+        "name": product.name,
+        "description": product.description,
+        "price": product.price,
+        "size": product.size,
+        "image_url": product.image_url,
+        "stock_quantity": product.stock_quantity,
+        "category": {"id": product.category.id, "name": product.category.name},
+        "rating": {"average": round(average_rating, 2) if average_rating is not None else None,
+                   "count": review_count},
+    }, [f"product:{product.id}", f"category:{product.category.id}"]
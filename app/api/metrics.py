@@ -0,0 +1,23 @@
+"""Prometheus scrape endpoint."""
+
+import secrets
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.exceptions import AuthenticationError
+from app.core.metrics import registry
+
+metrics_router = APIRouter(tags=["monitoring"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """All metrics of this worker process in Prometheus text format."""
+    if settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}"
+        if not secrets.compare_digest(request.headers.get("authorization", ""), expected):
+            raise AuthenticationError("Invalid metrics token").to_http_exception()
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,27 +1,39 @@
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
 import time
 
 
-from app.core.health import HealthCheck
-from app.core.logging import app_logger
+from app.api.cart import cart_router
+from app.api.catalog import catalog_router
+from app.api.metrics import metrics_router
+from app.core.health import HealthCheck, StaticProbe
+from app.core.logging import get_logger
+from app.core.serialization import FastJSONResponse
 
-api_router = APIRouter()
+api_router = APIRouter(default_response_class=FastJSONResponse)
 
 health_router = APIRouter()
+health_logger = get_logger("health")
 
 @health_router.get("/health", tags=["health"])
 async def get_health_status():
     try:
-        app_logger.info("Health check endpoint called")
         result = HealthCheck.check_all()
-        app_logger.info(f"Health check completed with status: {result.get('status', 'unknown')}")
-        return JSONResponse(content=result)
+        return FastJSONResponse(content=result)
     except Exception as e:
-        app_logger.error(f"Error in health endpoint: {e}")
-        return JSONResponse(
+        health_logger.error(f"Error in health endpoint: {e}")
+        return FastJSONResponse(
             status_code=500,
             content={"status": "error", "message": f"Health check failed: {str(e)}", "timestamp": time.time()}
         )
 
-api_router.include_router(health_router)
\ No newline at end of file
+health_router.add_route("/health/live", StaticProbe(), methods=["GET", "HEAD"])
+
+@health_router.get("/health/ready", tags=["health"])
+async def get_readiness():
+    result = await HealthCheck.check_ready()
+    return FastJSONResponse(status_code=200 if result["ready"] else 503, content=result)
+
+api_router.include_router(health_router)
+api_router.include_router(catalog_router)
+api_router.include_router(cart_router)
+api_router.include_router(metrics_router)
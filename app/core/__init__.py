@@ -25,40 +25,49 @@ imported and used by other modules as needed.
 # - deployment.py: Deployment utilities
 # - error_handlers.py: Error handling utilities
 
-# Import core modules for easy access
-from app.core.config import settings
-from app.core.logging import app_logger, get_logger
-from app.core.exceptions import (
-    AppException,
-    NotFoundError,
-    ValidationError,
-    DatabaseError,
-    ConfigurationError,
-    ExternalServiceError,
-    RateLimitError
-)
-from app.core.error_handlers import setup_error_handlers, create_error_response, with_error_handling
-from app.core.middleware import setup_middleware
-from app.core.utils import setup_routers, validate_environment, import_string, get_project_root
-from app.core.health import HealthCheck, is_healthy
-from app.core.nicegui_setup import setup_nicegui
+# Core names are resolved lazily on first access (PEP 562), so importing one
+# submodule such as app.core.config does not pull in psutil, NiceGUI and
+# FastAPI middleware at startup.
+import importlib
 
+_LAZY_ATTRIBUTES = {
+    "settings": "app.core.config",
+    "app_logger": "app.core.logging",
+    "get_logger": "app.core.logging",
+    "AppException": "app.core.exceptions",
+    "NotFoundError": "app.core.exceptions",
+    "ValidationError": "app.core.exceptions",
+    "DatabaseError": "app.core.exceptions",
+    "ConfigurationError": "app.core.exceptions",
+    "ExternalServiceError": "app.core.exceptions",
+    "RateLimitError": "app.core.exceptions",
+    "ServiceUnavailableError": "app.core.exceptions",
+    "setup_error_handlers": "app.core.error_handlers",
+    "create_error_response": "app.core.error_handlers",
+    "with_error_handling": "app.core.error_handlers",
+    "setup_middleware": "app.core.middleware",
+    "setup_routers": "app.core.utils",
+    "validate_environment": "app.core.utils",
+    "import_string": "app.core.utils",
+    "get_project_root": "app.core.utils",
+    "HealthCheck": "app.core.health",
+    "is_healthy": "app.core.health",
+    "setup_nicegui": "app.core.nicegui_setup",
+    # Optional modules, which might not be used in all applications
+    "DeploymentManager": "app.core.deployment",
+    "setup_database": "app.core.database",
+}
 
-
-try:
-    from app.core.deployment import DeploymentManager
-except ImportError:
-    # Deployment module might not be used in all applications
-    pass
-
-# Database is optional and might not be used in all applications
-try:
-    from app.core.database import setup_database
-    # Uncomment when you need database functionality
-    # from app.core.database import get_db, create_tables
-except ImportError:
-    # Database module might not be used in all applications
-    pass
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        value = getattr(importlib.import_module(module_name), name)
+    except ImportError as e:
+        raise AttributeError(f"{name} is not available: {e}") from e
+    globals()[name] = value
+    return value
 
 __all__ = [
     "settings",
@@ -72,6 +81,7 @@ __all__ = [
     "ConfigurationError",
     "ExternalServiceError",
     "RateLimitError",
+    "ServiceUnavailableError",
     "setup_error_handlers",
     "create_error_response",
     "with_error_handling",
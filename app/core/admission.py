@@ -0,0 +1,155 @@
+"""Admission control: shed low-priority work when the server is overloaded.
+
+DB queries, page builds and JSON encoding all share one event loop, so
+overload shows up as event-loop lag (``app.core.loop_lag``) and a growing
+number of requests in flight. ``AdmissionMiddleware`` sorts each HTTP
+request into a priority by path prefix and answers 503 with
+``Retry-After`` instead of running it when the server is past that
+priority's limit:
+
+- ``critical`` (health probes, cart, checkout, and the admin page, whose
+  diagnostics and profiler are needed most while the server struggles):
+  always admitted
+- ``low`` (``ADMISSION_LOW_PRIORITY_PATHS``, none by default): shed once
+  the smoothed lag exceeds ``ADMISSION_SHED_LAG_MS`` or half of
+  ``ADMISSION_MAX_IN_FLIGHT`` requests are running
+- everything else: shed once the lag exceeds ``ADMISSION_OVERLOAD_LAG_MS``
+  or ``ADMISSION_MAX_IN_FLIGHT`` requests are running
+
+NiceGUI event handlers arrive over the websocket rather than as requests;
+non-critical UI work can call ``admission_controller.defer()`` to wait
+until the lag has come down before doing it.
+"""
+
+import asyncio
+import math
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.core.loop_lag import LoopLagMonitor, loop_lag_monitor
+from app.core.metrics import requests_shed
+
+CRITICAL, NORMAL, LOW = "critical", "normal", "low"
+
+def _prefixes(value: str) -> Tuple[str, ...]:
+    return tuple(prefix.strip() for prefix in value.split(",") if prefix.strip())
+
+class AdmissionController:
+    """Decides whether a request of a given priority may run now."""
+
+    def __init__(self, monitor: LoopLagMonitor = loop_lag_monitor, shed_lag_ms: float = 250.0,
+                 overload_lag_ms: float = 1000.0, max_in_flight: int = 200, retry_after: float = 5.0,
+                 critical_paths: Tuple[str, ...] = (), low_priority_paths: Tuple[str, ...] = ()):
+        self.monitor = monitor
+        self.shed_lag = shed_lag_ms / 1000
+        self.overload_lag = overload_lag_ms / 1000
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.critical_paths = critical_paths
+        self.low_priority_paths = low_priority_paths
+        self.in_flight = 0  # only touched from the event loop
+        self._counters = {"admitted": 0, "shed_low": 0, "shed_normal": 0}
+
+    def priority(self, path: str) -> str:
+        if path.startswith(self.critical_paths):
+            return CRITICAL
+        if path.startswith(self.low_priority_paths):
+            return LOW
+        return NORMAL
+
+    def overloaded(self, priority: str) -> bool:
+        """Whether work of ``priority`` should be turned away right now."""
+        if priority == CRITICAL:
+            return False
+        lag = self.monitor.smoothed
+        if priority == LOW:
+            return lag > self.shed_lag or self.in_flight >= self.max_in_flight // 2
+        return lag > self.overload_lag or self.in_flight >= self.max_in_flight
+
+    def admit(self, path: str) -> Optional[str]:
+        """The request's priority if it may run, None if it should be shed."""
+        priority = self.priority(path)
+        if self.overloaded(priority):
+            self._counters[f"shed_{priority}"] += 1
+            requests_shed.labels(priority).inc()
+            return None
+        self._counters["admitted"] += 1
+        return priority
+
+    def retry_after_seconds(self) -> int:
+        # Longer when the loop is further behind, so retries don't arrive while it is still catching up
+        return max(1, math.ceil(self.retry_after + self.monitor.smoothed * 4))
+
+    async def defer(self, max_wait: float = 10.0, poll: float = 0.5) -> float:
+        """Wait until low-priority work may run again, or ``max_wait`` seconds have passed.
+
+        For non-critical UI refreshes that can't be refused like a request.
+        Returns the seconds waited.
+        """
+        started = time.monotonic()
+        while self.overloaded(LOW) and time.monotonic() - started < max_wait:
+            await asyncio.sleep(poll)
+        return time.monotonic() - started
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "lag_ms": round(self.monitor.smoothed * 1000, 1),
+            "shedding_low": self.overloaded(LOW),
+            "shedding_normal": self.overloaded(NORMAL),
+            **self._counters,
+        }
+
+admission_controller = AdmissionController(
+    shed_lag_ms=settings.admission_shed_lag_ms,
+    overload_lag_ms=settings.admission_overload_lag_ms,
+    max_in_flight=settings.admission_max_in_flight,
+    retry_after=settings.admission_retry_after,
+    critical_paths=_prefixes(settings.admission_critical_paths),
+    low_priority_paths=_prefixes(settings.admission_low_priority_paths),
+)
+
+_SHED_BODY = b'{"detail":"The server is busy. Please try again shortly."}'
+
+class AdmissionMiddleware:
+    """Raw ASGI middleware answering 503 to requests the ``AdmissionController`` turns away."""
+
+    def __init__(self, app, controller: AdmissionController = admission_controller, exempt_paths=None):
+        self.app = app
+        self.controller = controller
+        self.exempt_paths = tuple(exempt_paths or ["/static", "/_nicegui"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        if self.controller.admit(scope["path"]) is None:
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_SHED_BODY)).encode()),
+                    (b"retry-after", str(self.controller.retry_after_seconds()).encode()),
+                    (b"cache-control", b"no-store"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _SHED_BODY})
+            return
+
+        self.controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.in_flight -= 1
+
+def setup_admission_control(app) -> None:
+    """Add ``AdmissionMiddleware`` outside every middleware added so far."""
+    app.add_middleware(AdmissionMiddleware)
+    controller = admission_controller
+    app_logger.info(f"Admission control enabled: low priority shed above {controller.shed_lag * 1000:.0f} ms lag, "
+                    f"everything but {', '.join(controller.critical_paths)} above "
+                    f"{controller.overload_lag * 1000:.0f} ms or {controller.max_in_flight} requests in flight")
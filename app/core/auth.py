@@ -1,39 +1,54 @@
 """Authentication and authorization system."""
 
+import functools
+import inspect
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from nicegui import ui, app
+from fastapi import Request
+from nicegui import ui
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import AuthenticationError
 from app.core.logging import app_logger
+from app.core.sessions import session_store
+from app.models.user import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def get_pwd_context():
+    """Password hashing context, built on first use to keep passlib off the boot path."""
+    from app.core.hashing import password_context
+    return password_context(settings.bcrypt_rounds)
 
 class AuthManager:
-    """Centralized authentication management."""
+    """Centralized authentication management.
+    
+    Login state lives in the browser's server-side session (see
+    ``app.core.sessions``), so it is shared by all worker processes.
+    """
     
     @staticmethod
     def setup():
         """Setup authentication system."""
-        app.storage.user.setdefault('authenticated', False)
-        app.storage.user.setdefault('user_id', None)
-        app.storage.user.setdefault('username', None)
-        app.storage.user.setdefault('is_admin', False)
+        session = session_store.current()
+        session.setdefault('authenticated', False)
+        session.setdefault('user_id', None)
+        session.setdefault('username', None)
+        session.setdefault('is_admin', False)
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash."""
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
     
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Generate password hash."""
-        return pwd_context.hash(password)
+        return get_pwd_context().hash(password)
     
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         """Create JWT access token."""
+        from jose import jwt
+        
         to_encode = data.copy()
         if expires_delta:
             expire = datetime.utcnow() + expires_delta
@@ -47,6 +62,8 @@ class AuthManager:
     @staticmethod
     def verify_token(token: str) -> Optional[dict]:
         """Verify JWT token and return payload."""
+        from jose import JWTError, jwt
+        
         try:
             payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
             return payload
@@ -56,57 +73,86 @@ class AuthManager:
     @staticmethod
     def login_user(user_id: int, username: str, is_admin: bool = False):
         """Login user and set session."""
-        app.storage.user['authenticated'] = True
-        app.storage.user['user_id'] = user_id
-        app.storage.user['username'] = username
-        app.storage.user['is_admin'] = is_admin
+        session_store.current().update(authenticated=True, user_id=user_id, username=username, is_admin=is_admin)
+        session_store.flush_soon()
         app_logger.info(f"User {username} logged in successfully")
     
     @staticmethod
     def logout_user():
         """Logout user and clear session."""
-        username = app.storage.user.get('username', 'Unknown')
-        app.storage.user['authenticated'] = False
-        app.storage.user['user_id'] = None
-        app.storage.user['username'] = None
-        app.storage.user['is_admin'] = False
+        session = session_store.current()
+        username = session.get('username', 'Unknown')
+        session.update(authenticated=False, user_id=None, username=None, is_admin=False)
+        session_store.flush_soon()  # other workers must see the logout promptly
         app_logger.info(f"User {username} logged out")
     
     @staticmethod
     def is_authenticated() -> bool:
         """Check if user is authenticated."""
-        return app.storage.user.get('authenticated', False)
+        return session_store.current().get('authenticated', False)
     
     @staticmethod
     def get_current_user_id() -> Optional[int]:
         """Get current user ID."""
-        return app.storage.user.get('user_id')
+        return session_store.current().get('user_id')
     
     @staticmethod
     def get_current_username() -> Optional[str]:
         """Get current username."""
-        return app.storage.user.get('username')
+        return session_store.current().get('username')
     
     @staticmethod
     def is_admin() -> bool:
         """Check if current user is admin."""
-        return app.storage.user.get('is_admin', False)
+        return session_store.current().get('is_admin', False)
 
 def require_auth(func):
     """Decorator to require authentication."""
-    def wrapper(*args, **kwargs):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
         if not AuthManager.is_authenticated():
             ui.navigate.to('/login')
             return
-        return func(*args, **kwargs)
+        result = func(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
     return wrapper
 
 def require_admin(func):
     """Decorator to require admin privileges."""
-    def wrapper(*args, **kwargs):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
         if not AuthManager.is_authenticated() or not AuthManager.is_admin():
             ui.notify('Admin access required', type='negative')
             ui.navigate.to('/')
             return
-        return func(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+        result = func(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    return wrapper
+
+async def api_user_id(request: Request) -> int:
+    """FastAPI dependency: the user calling an API endpoint.
+    
+    Accepts a bearer token from ``AuthManager.create_access_token`` (user ID
+    in ``sub``) or the session cookie of a browser logged in to the store.
+    The user must still exist and be active.
+    """
+    user_id = None
+    authorization = request.headers.get('authorization', '')
+    if authorization.lower().startswith('bearer '):
+        payload = AuthManager.verify_token(authorization[7:].strip())
+        if payload and str(payload.get('sub', '')).isdigit():
+            user_id = int(payload['sub'])
+    elif 'session' in request.scope and 'id' in request.session:
+        session = session_store.get(request.session['id'])
+        if session.get('authenticated') and session.get('user_id'):
+            user_id = session['user_id']
+    if user_id is not None:
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, user_id)
+        if user is not None and user.is_active:
+            return user.id
+    raise AuthenticationError('Not authenticated', headers={'WWW-Authenticate': 'Bearer'}).to_http_exception()
@@ -0,0 +1,162 @@
+"""Local publish/subscribe between worker processes.
+
+In multi-worker mode (``WORKERS`` > 1, see ``app.core.cluster``) every
+worker keeps its own in-memory caches. Whatever one worker changes is
+published here so the others can drop their stale copies. Events are rows
+in a small WAL-mode SQLite file that each worker polls every
+``broker_poll_interval`` seconds; old rows are pruned after a few minutes.
+
+Channels in use:
+
+- ``sessions``: ``{"ids": [...]}``, sessions written by a worker
+
+With a single worker the broker is disabled and ``publish`` does nothing.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import app_logger
+
+EventHandler = Callable[[Dict[str, Any]], None]
+
+RETENTION_SECONDS = 300.0
+
+class EventBroker:
+    """SQLite-backed event log that worker processes publish to and poll."""
+
+    def __init__(self, path: str, enabled: bool = True, poll_interval: float = 0.2):
+        self.path = Path(path)
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self.origin = os.getpid()
+        self._handlers: Dict[str, List[EventHandler]] = defaultdict(list)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_id = 0
+        self._outgoing = deque()
+        self.published = 0
+        self.received = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=5000")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, payload TEXT NOT NULL, "
+                "origin INTEGER NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db = db
+        return self._db
+
+    def subscribe(self, channel: str, handler: EventHandler) -> None:
+        """Call ``handler(payload)`` for events other processes publish on ``channel``.
+
+        Handlers run on the broker's polling thread and must be thread-safe.
+        """
+        self._handlers[channel].append(handler)
+
+    def publish(self, channel: str, payload: Dict[str, Any]) -> None:
+        """Announce a change to the other workers."""
+        if not self.enabled:
+            return
+        with self._db_lock:
+            self._connection().execute(
+                "INSERT INTO events (channel, payload, origin, created_at) VALUES (?, ?, ?, ?)",
+                (channel, json.dumps(payload), self.origin, time.time()),
+            )
+            self.published += 1
+
+    def publish_later(self, channel: str, payload: Dict[str, Any]) -> None:
+        """Like ``publish``, but the broker's thread does the write; for callers on the event loop."""
+        if not self.enabled:
+            return
+        if self._thread is None:
+            self.publish(channel, payload)
+            return
+        self._outgoing.append((channel, payload))
+
+    def _publish_outgoing(self) -> None:
+        while self._outgoing:
+            self.publish(*self._outgoing.popleft())
+
+    def start(self) -> None:
+        """Start polling for events published from now on."""
+        if not self.enabled or self._thread:
+            return
+        with self._db_lock:
+            self._last_id = self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="event-broker", daemon=True)
+        self._thread.start()
+        app_logger.info(f"Event broker started ({self.path})")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5.0)
+            self._thread = None
+        self._publish_outgoing()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def poll(self) -> int:
+        """Dispatch events published since the last poll. Returns the number handled."""
+        with self._db_lock:
+            rows = self._connection().execute(
+                "SELECT id, channel, payload, origin FROM events WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+        handled = 0
+        for event_id, channel, payload, origin in rows:
+            self._last_id = event_id
+            if origin == self.origin:
+                continue
+            for handler in self._handlers.get(channel, ()):
+                try:
+                    handler(json.loads(payload))
+                except Exception as e:
+                    app_logger.error(f"Event handler for {channel} failed: {e}")
+            handled += 1
+        self.received += handled
+        return handled
+
+    def prune(self) -> None:
+        with self._db_lock:
+            self._connection().execute("DELETE FROM events WHERE created_at < ?", (time.time() - RETENTION_SECONDS,))
+
+    def _poll_loop(self) -> None:
+        next_prune = time.monotonic() + RETENTION_SECONDS
+        while not self._stop.is_set():
+            try:
+                self._publish_outgoing()
+                self.poll()
+                if time.monotonic() >= next_prune:
+                    self.prune()
+                    next_prune = time.monotonic() + RETENTION_SECONDS
+            except Exception as e:
+                app_logger.error(f"Event broker error: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "published": self.published, "received": self.received}
+
+event_broker = EventBroker(
+    settings.broker_database_path,
+    enabled=settings.workers > 1,
+    poll_interval=settings.broker_poll_interval,
+)
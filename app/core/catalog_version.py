@@ -0,0 +1,123 @@
+"""Catalog version counter for HTTP caching of catalog data.
+
+Every committed change to products, categories or reviews increments a
+single number stored in the ``catalog_version`` table. The REST API derives
+its ETags from it, so a conditional GET can be answered with 304 from the
+in-memory copy without a query.
+
+Changes made through ORM sessions are detected by session events installed
+by ``setup_catalog_versioning``, which increment the counter in the
+session's own transaction just before it commits, so the change and the new
+version are committed together. Bulk loaders writing through Core call
+``catalog_version.bump()`` themselves. In multi-worker mode the new version
+is published on the ``catalog`` broker channel so other workers' ETags move
+on at once.
+"""
+
+import threading
+from itertools import chain
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.broker import event_broker
+from app.core.database import engine
+from app.core.logging import app_logger
+
+def _stored_version(conn) -> int:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS catalog_version (version INTEGER NOT NULL)"))
+    version = conn.execute(text("SELECT version FROM catalog_version")).scalar()
+    if version is None:
+        version = 1
+        conn.execute(text("INSERT INTO catalog_version (version) VALUES (:version)"), {"version": version})
+    return version
+
+def _increment(conn) -> int:
+    _stored_version(conn)
+    conn.execute(text("UPDATE catalog_version SET version = version + 1"))
+    return conn.execute(text("SELECT version FROM catalog_version")).scalar()
+
+class CatalogVersion:
+    """Process-local copy of the catalog version, loaded lazily from the database."""
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        """The catalog version; read from the database only the first time."""
+        if self._version is None:
+            with self._lock:
+                if self._version is None:
+                    self._version = self._load()
+        return self._version
+
+    def _load(self) -> int:
+        with engine.begin() as conn:
+            return _stored_version(conn)
+
+    def bump(self, bind: Optional[Engine] = None) -> int:
+        """Record a catalog change and tell the other workers. Returns the new version.
+
+        ``bind`` is for loaders writing through an engine of their own.
+        """
+        with (bind or engine).begin() as conn:
+            version = _increment(conn)
+        self.committed(version)
+        return version
+
+    def committed(self, version: int) -> None:
+        """Adopt a version this process committed and announce it from the broker's thread."""
+        self.observe(version)
+        event_broker.publish_later("catalog", {"version": version})
+
+    def observe(self, version: int) -> None:
+        """Adopt a version announced by another worker."""
+        with self._lock:
+            self._version = max(self._version or 0, version)
+
+catalog_version = CatalogVersion()
+
+_installed = False
+
+def setup_catalog_versioning() -> None:
+    """Bump the catalog version whenever a session commits catalog changes. Safe to call twice."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from app.models.product import Category, Product, Review
+
+    catalog_models = (Category, Product, Review)
+
+    @event.listens_for(Session, "after_flush")
+    def _track_catalog_changes(session, flush_context):
+        if any(isinstance(obj, catalog_models) for obj in chain(session.new, session.dirty, session.deleted)):
+            session.info["catalog_changed"] = True
+
+    @event.listens_for(Session, "before_commit")
+    def _bump_catalog_version(session):
+        # Runs before the final flush of the commit, so look at pending objects too
+        changed = session.info.get("catalog_changed", False) or any(
+            isinstance(obj, catalog_models) for obj in chain(session.new, session.dirty, session.deleted)
+        )
+        if changed:
+            session.info["catalog_version"] = _increment(session.connection())
+
+    @event.listens_for(Session, "after_commit")
+    def _announce_catalog_version(session):
+        session.info.pop("catalog_changed", None)
+        version = session.info.pop("catalog_version", None)
+        if version is not None:
+            catalog_version.committed(version)
+
+    @event.listens_for(Session, "after_rollback")
+    def _forget_catalog_changes(session):
+        session.info.pop("catalog_changed", None)
+        session.info.pop("catalog_version", None)
+
+    event_broker.subscribe("catalog", lambda event: catalog_version.observe(event["version"]))
+    app_logger.info("Catalog versioning enabled")
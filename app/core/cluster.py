@@ -0,0 +1,406 @@
+"""Multi-process serving: a sticky TCP dispatcher in front of worker processes.
+
+NiceGUI keeps each page's state in the process that rendered it, and the
+page's websocket must reach that same process. With ``WORKERS`` > 1,
+``python main.py`` runs this dispatcher on ``HOST``:``PORT`` instead of the
+app. It starts ``WORKERS`` copies of the app on 127.0.0.1 from
+``WORKER_BASE_PORT`` upwards, restarts any that exit, and forwards each
+incoming request to a worker chosen by hashing the client address.
+Every request and websocket from one client therefore lands on the same
+worker, as long as that worker is up.
+
+Requests are routed one by one, not per connection: a proxy in front
+(Fly's does) pools keep-alive connections and sends requests from many
+clients down each of them. A websocket upgrade hands its connection over
+to the worker for good. The client address is the peer address, or the
+``Fly-Client-IP``/``X-Forwarded-For`` header of a peer listed in
+``TRUSTED_PROXIES`` (``app.core.proxies``). The dispatcher passes it on as
+the only ``X-Forwarded-For`` entry and drops ``Fly-Client-IP``; workers
+trust loopback, so rate limits and login throttling see the real client.
+
+Workers share the database, sessions (``app.core.sessions``), invalidation
+events (``app.core.broker``) and, with more than one worker, login
+throttling counters (``app.core.login_throttle``).
+
+Run the dispatcher directly, or measure how throughput scales::
+
+    python -m app.core.cluster --workers 4
+    python -m app.core.cluster bench --workers 1 2 4 --duration 15
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import h11
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.core.proxies import forwarded_client
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+MAX_HEADER_BYTES = 64 * 1024
+RESTART_DELAY_SECONDS = 1.0
+
+_PROXY_HEADERS = (b"fly-client-ip", b"x-forwarded-for")
+_BAD_REQUEST = b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+
+def client_key(request: h11.Request, peer: Optional[str]) -> str:
+    """Stickiness key for a request: the client address it comes from."""
+    headers = dict(request.headers)  # the last of repeated headers, as the proxy appends its own
+    return forwarded_client(peer, *(headers.get(name, b"").decode("latin-1") for name in _PROXY_HEADERS)) or ""
+
+def _forwarded_request(request: h11.Request, client: str) -> h11.Request:
+    """The request as a worker should see it, with the resolved client address."""
+    headers = [(name, value) for name, value in request.headers
+               if name not in _PROXY_HEADERS and name != b"expect"]  # the dispatcher answers 100-continue itself
+    if client:
+        headers.append((b"x-forwarded-for", client.encode("latin-1")))
+    if not any(name == b"host" for name, _ in headers):
+        headers.append((b"host", b"localhost"))  # HTTP/1.0 clients may omit it; workers get HTTP/1.1
+    return h11.Request(method=request.method, target=request.target, headers=headers)
+
+async def _next_event(connection: h11.Connection, reader: asyncio.StreamReader):
+    while True:
+        event = connection.next_event()
+        if event is not h11.NEED_DATA:
+            return event
+        connection.receive_data(await reader.read(65536))
+
+class _Backend:
+    """One request's connection to a worker."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.http = h11.Connection(h11.CLIENT, max_incomplete_event_size=MAX_HEADER_BYTES)
+
+    def send(self, event) -> None:
+        self.writer.write(self.http.send(event))
+
+    def close(self) -> None:
+        self.writer.close()
+
+class StickyDispatcher:
+    """Forwards HTTP requests to backends chosen by client address hash."""
+
+    def __init__(self, backends: List[Tuple[str, int]]):
+        self.backends = backends
+        self.connections = [0] * len(backends)
+        self.failovers = 0
+
+    def pick(self, key: str) -> int:
+        # crc32 rather than hash(): it must not change between dispatcher restarts
+        return zlib.crc32(key.encode()) % len(self.backends)
+
+    async def _connect(self, first: int) -> Optional[_Backend]:
+        # A worker that is down (or restarting) hands its clients to the next one
+        for offset in range(len(self.backends)):
+            index = (first + offset) % len(self.backends)
+            try:
+                reader, writer = await asyncio.open_connection(*self.backends[index], limit=MAX_HEADER_BYTES)
+            except OSError:
+                self.failovers += 1
+                continue
+            self.connections[index] += 1
+            return _Backend(reader, writer)
+        return None
+
+    async def handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        peer = client_writer.get_extra_info("peername")
+        client = h11.Connection(h11.SERVER, max_incomplete_event_size=MAX_HEADER_BYTES)
+        try:
+            while await self._forward(client, client_reader, client_writer, peer[0] if peer else None):
+                client.start_next_cycle()
+        except h11.RemoteProtocolError:
+            if client.our_state in (h11.IDLE, h11.SEND_RESPONSE):
+                client_writer.write(_BAD_REQUEST)
+        except (ConnectionError, asyncio.IncompleteReadError, h11.LocalProtocolError):
+            pass
+        finally:
+            try:
+                client_writer.close()
+            except RuntimeError:
+                pass  # event loop already closed during shutdown
+
+    async def _forward(self, client: h11.Connection, client_reader: asyncio.StreamReader,
+                       client_writer: asyncio.StreamWriter, peer: Optional[str]) -> bool:
+        """Forward one request and its response; True if the client connection can take another."""
+        request = await _next_event(client, client_reader)
+        if not isinstance(request, h11.Request):
+            return False  # the client closed the connection
+
+        address = client_key(request, peer)
+        backend = await self._connect(self.pick(address))
+        if backend is None:
+            client_writer.write(client.send(h11.Response(
+                status_code=503, headers=[(b"content-length", b"0"), (b"connection", b"close")])))
+            client_writer.write(client.send(h11.EndOfMessage()))
+            return False
+
+        try:
+            backend.send(_forwarded_request(request, address))
+            if client.client_is_waiting_for_100_continue:
+                client_writer.write(client.send(h11.InformationalResponse(status_code=100, headers=[])))
+            while True:
+                event = await _next_event(client, client_reader)
+                if isinstance(event, h11.ConnectionClosed):
+                    return False
+                backend.send(event)
+                await backend.writer.drain()
+                if isinstance(event, h11.EndOfMessage):
+                    break
+
+            while True:
+                try:
+                    event = await _next_event(backend.http, backend.reader)
+                except (ConnectionError, h11.RemoteProtocolError):
+                    event = h11.ConnectionClosed()
+                if isinstance(event, h11.ConnectionClosed):
+                    # The worker went away mid-request; answer if nothing was sent yet
+                    if client.our_state is h11.SEND_RESPONSE:
+                        client_writer.write(client.send(h11.Response(
+                            status_code=502, headers=[(b"content-length", b"0"), (b"connection", b"close")])))
+                        client_writer.write(client.send(h11.EndOfMessage()))
+                    return False
+                client_writer.write(client.send(event))
+                await client_writer.drain()
+                if isinstance(event, h11.InformationalResponse) and event.status_code == 101:
+                    # A websocket: from here on the bytes go through unparsed, both ways
+                    backend.writer.write(client.trailing_data[0])
+                    client_writer.write(backend.http.trailing_data[0])
+                    await asyncio.gather(_pipe(client_reader, backend.writer), _pipe(backend.reader, client_writer))
+                    return False
+                if isinstance(event, h11.EndOfMessage):
+                    return client.our_state is h11.DONE and client.their_state is h11.DONE
+        finally:
+            backend.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES, reuse_address=True)
+        app_logger.info(f"Dispatcher listening on {host}:{port} for {len(self.backends)} workers")
+        async with server:
+            await server.serve_forever()
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        try:
+            writer.close()
+        except RuntimeError:
+            pass  # event loop already closed during shutdown
+
+class WorkerSupervisor:
+    """Starts the worker processes and restarts any that exit."""
+
+    def __init__(self, workers: int, base_port: int, env: Optional[Dict[str, str]] = None):
+        self.ports = [base_port + i for i in range(workers)]
+        self.env = env if env is not None else dict(os.environ)
+        self.processes: Dict[int, subprocess.Popen] = {}
+        self.restarts = 0
+
+    def _spawn(self, worker_id: int) -> None:
+        env = {
+            **self.env,
+            "HOST": "127.0.0.1",
+            "PORT": str(self.ports[worker_id]),
+            "WORKER_ID": str(worker_id),
+            "SEED_ON_STARTUP": "false",  # the dispatcher seeded once before starting workers
+            "DEBUG": "false",  # no reloader or browser per worker
+        }
+        self.processes[worker_id] = subprocess.Popen([sys.executable, "main.py"], cwd=PROJECT_ROOT, env=env)
+
+    def start(self) -> None:
+        for worker_id in range(len(self.ports)):
+            self._spawn(worker_id)
+        app_logger.info(f"Started {len(self.ports)} workers on ports {self.ports[0]}-{self.ports[-1]}")
+
+    async def watch(self) -> None:
+        while True:
+            await asyncio.sleep(RESTART_DELAY_SECONDS)
+            for worker_id, process in list(self.processes.items()):
+                if process.poll() is not None:
+                    app_logger.warning(f"Worker {worker_id} exited with {process.returncode}, restarting")
+                    self.restarts += 1
+                    self._spawn(worker_id)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        for process in self.processes.values():
+            if process.poll() is None:
+                process.send_signal(signal.SIGINT)
+        deadline = time.monotonic() + timeout
+        for process in self.processes.values():
+            try:
+                process.wait(max(deadline - time.monotonic(), 0.1))
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def run_cluster(workers: Optional[int] = None) -> None:
+    """Prepare the database once, then run the workers behind the dispatcher until interrupted."""
+    from app.core.database import ensure_schema
+
+    workers = workers or settings.workers
+    ensure_schema()
+    if settings.seed_on_startup:
+        from app.core.seed import seed_database
+        seed_database()
+
+    supervisor = WorkerSupervisor(workers, settings.worker_base_port, {**os.environ, "WORKERS": str(workers)})
+    dispatcher = StickyDispatcher([("127.0.0.1", port) for port in supervisor.ports])
+    supervisor.start()
+
+    async def serve() -> None:
+        await asyncio.gather(dispatcher.serve(settings.host, settings.port), supervisor.watch())
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app_logger.info(f"Stopping workers (connections per worker: {dispatcher.connections})")
+        supervisor.stop()
+
+# Benchmark
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def _wait_ready(url: str, timeout: float = 60.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+async def _load(base_url: str, paths: List[str], concurrency: int, duration: float) -> Dict[str, float]:
+    """Request ``paths`` round-robin from ``concurrency`` simulated clients for ``duration`` seconds."""
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client_number: int) -> None:
+        nonlocal errors
+        # Distinct forwarded addresses so clients spread over workers as real visitors would
+        headers = {"X-Forwarded-For": f"10.0.{client_number // 250}.{client_number % 250 + 1}"}
+        async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=30.0) as client:
+            request_number = 0
+            while time.monotonic() < deadline:
+                path = paths[request_number % len(paths)]
+                request_number += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.monotonic()
+    await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0,
+    }
+
+def benchmark(worker_counts: List[int], paths: List[str], concurrency: int, duration: float, warmup: float) -> None:
+    """Boot the app with each worker count against a scratch database and load it.
+
+    One worker runs as a plain single process, without the dispatcher hop.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        base_env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{scratch}/bench.db",
+            "SESSION_DATABASE_PATH": f"{scratch}/sessions.db",
+            "BROKER_DATABASE_PATH": f"{scratch}/broker.db",
+            "DEBUG": "false",
+            "RATE_LIMIT_ENABLED": "false",  # all load comes from one address
+        }
+        seed_env = {**base_env, "WORKERS": "1"}
+        subprocess.run([sys.executable, "-m", "app.core.seed"], cwd=PROJECT_ROOT, env=seed_env, check=True,
+                       capture_output=True)
+
+        for workers in worker_counts:
+            port = _free_port()
+            env = {**base_env, "WORKERS": str(workers), "PORT": str(port), "HOST": "127.0.0.1",
+                   "WORKER_BASE_PORT": str(_free_port()), "SEED_ON_STARTUP": "false"}
+            process = subprocess.Popen([sys.executable, "main.py"], cwd=PROJECT_ROOT, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                asyncio.run(_wait_ready(base_url + paths[0]))
+                if warmup:
+                    asyncio.run(_load(base_url, paths, concurrency, warmup))
+                result = asyncio.run(_load(base_url, paths, concurrency, duration))
+            finally:
+                process.send_signal(signal.SIGINT)
+                try:
+                    process.wait(15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            results.append((workers, result))
+            print(f"{workers} worker(s): {result['rps']:.1f} req/s, p50 {result['p50_ms']:.0f}ms, "
+                  f"p99 {result['p99_ms']:.0f}ms, {result['errors']} errors", flush=True)
+
+    baseline = results[0][1]["rps"] or 1.0
+    print(f"\n{os.cpu_count()} CPU(s), {concurrency} clients, {duration:.0f}s per run, paths {', '.join(paths)}")
+    print(f"{'workers':>8} {'req/s':>9} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers, result in results:
+        print(f"{workers:>8} {result['rps']:>9.1f} {result['rps'] / baseline:>7.2f}x "
+              f"{result['p50_ms']:>8.0f} {result['p99_ms']:>8.0f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run or benchmark the multi-worker dispatcher")
+    subcommands = parser.add_subparsers(dest="command")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: WORKERS)")
+
+    bench = subcommands.add_parser("bench", help="measure throughput for several worker counts")
+    bench.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    bench.add_argument("--path", action="append", dest="paths", help="page to request (repeatable)")
+    bench.add_argument("--concurrency", type=int, default=32)
+    bench.add_argument("--duration", type=float, default=15.0, help="seconds of load per worker count")
+    bench.add_argument("--warmup", type=float, default=3.0)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        benchmark(args.workers, args.paths or ["/", "/products"], args.concurrency, args.duration, args.warmup)
+    else:
+        run_cluster(args.workers)
+
+if __name__ == "__main__":
+    main()
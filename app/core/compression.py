@@ -0,0 +1,266 @@
+"""Negotiated response compression with a cache of compressed bodies.
+
+``CompressionMiddleware`` replaces the ``GZipMiddleware`` NiceGUI installs.
+It picks brotli, zstd or gzip from the client's Accept-Encoding, in that
+order of preference when the client has none, and skips media types that
+are already compressed (images, fonts, archives...).
+
+Most bodies worth compressing are identical from one request to the next:
+NiceGUI's vendor JavaScript and CSS, cached API responses. Compressed
+bodies are therefore kept in an LRU keyed by a hash of the uncompressed
+body and the encoding, so each distinct body is compressed once.
+
+The level follows CPU load: with the CPU idle bodies are compressed
+harder, and when it saturates the fastest level is used so compression
+doesn't add to the queue. Large bodies are compressed in a worker thread
+(zlib, brotli and zstd release the GIL) to keep the event loop free.
+
+brotli and zstd are optional: without the ``brotli`` or ``zstandard``
+packages those encodings are not offered.
+"""
+
+import functools
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import anyio
+from fastapi.middleware.gzip import GZipMiddleware
+
+from app.core.config import settings
+from app.core.logging import app_logger
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+MAX_BUFFERED_BYTES = 16 * 1024 * 1024  # larger responses are passed through as they are
+THREAD_THRESHOLD = 256 * 1024  # bodies at least this large are compressed off the event loop
+
+# Levels for (idle, busy, saturated) CPU
+_LEVELS: Dict[str, Tuple[int, int, int]] = {"br": (6, 4, 1), "zstd": (9, 3, 1), "gzip": (6, 4, 1)}
+_BUSY, _SATURATED = 0.5, 0.85
+
+_COMPRESSED_TYPE_PREFIXES = ("image/", "video/", "audio/", "font/woff")
+_COMPRESSED_TYPES = {
+    "application/zip", "application/gzip", "application/x-gzip", "application/zstd", "application/x-brotli",
+    "application/x-7z-compressed", "application/x-rar-compressed", "application/pdf", "application/octet-stream",
+}
+
+def _gzip(body: bytes, level: int) -> bytes:
+    # mtime=0 keeps the output, and so the cache entry, identical between runs
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def _available_codecs() -> Dict[str, Callable[[bytes, int], bytes]]:
+    codecs: Dict[str, Callable[[bytes, int], bytes]] = {}
+    if brotli is not None:
+        codecs["br"] = lambda body, level: brotli.compress(body, quality=level)
+    if zstandard is not None:
+        codecs["zstd"] = lambda body, level: zstandard.ZstdCompressor(level=level).compress(body)
+    codecs["gzip"] = _gzip
+    return codecs
+
+CODECS = _available_codecs()
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type == "image/svg+xml":
+        return True
+    return (bool(media_type) and media_type not in _COMPRESSED_TYPES
+            and not media_type.startswith(_COMPRESSED_TYPE_PREFIXES))
+
+@functools.lru_cache(maxsize=256)
+def negotiate(accept_encoding: str, encodings: Tuple[str, ...]) -> Optional[str]:
+    """The encoding to use for an Accept-Encoding value, or None for identity.
+
+    Highest q-value wins; ties go to the earlier entry of ``encodings``.
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+class CPULoad:
+    """System-wide CPU use as a fraction, sampled at most once per ``interval`` seconds."""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.value = 0.0
+        self._sampled_at = 0.0
+        self._psutil = None
+
+    def current(self) -> float:
+        now = time.monotonic()
+        if now - self._sampled_at >= self.interval:
+            self._sampled_at = now
+            if self._psutil is None:
+                import psutil  # imported on first use, not at startup
+                self._psutil = psutil
+            # Non-blocking: the utilisation since the previous call
+            self.value = self._psutil.cpu_percent(interval=None) / 100
+        return self.value
+
+class CompressedBodyCache:
+    """Size-bounded LRU of compressed bodies keyed by (body hash, encoding)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "compressed_in": 0, "compressed_out": 0}
+
+    def get(self, key: Tuple[bytes, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return body
+
+    def put(self, key: Tuple[bytes, str], body: bytes, original_size: int) -> None:
+        with self._lock:
+            self._counters["compressed_in"] += original_size
+            self._counters["compressed_out"] += len(body)
+            if len(body) > self.max_bytes // 4 or key in self._entries:
+                return
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            compressed_in = self._counters["compressed_in"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                "ratio": round(self._counters["compressed_out"] / compressed_in, 3) if compressed_in else 0.0,
+                **self._counters,
+            }
+
+compressed_cache = CompressedBodyCache(int(settings.compression_cache_mb * 1024 * 1024))
+cpu_load = CPULoad()
+
+def compression_level(encoding: str, load: float) -> int:
+    idle, busy, saturated = _LEVELS[encoding]
+    if load >= _SATURATED:
+        return saturated
+    return busy if load >= _BUSY else idle
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    return next((value for key, value in headers if key == name), None)
+
+class CompressionMiddleware:
+    """Raw ASGI middleware compressing complete response bodies with the negotiated encoding."""
+
+    def __init__(self, app, minimum_size: Optional[int] = None, encodings: Optional[Tuple[str, ...]] = None,
+                 cache: CompressedBodyCache = compressed_cache, load: CPULoad = cpu_load):
+        self.app = app
+        self.minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+        configured = encodings or tuple(name.strip() for name in settings.compression_encodings.split(","))
+        self.encodings = tuple(name for name in configured if name in CODECS)
+        self.cache = cache
+        self.load = load
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = negotiate(accept.decode("latin-1"), self.encodings) if accept else None
+
+        start: Optional[Dict[str, Any]] = None
+        chunks: List[bytes] = []
+
+        async def compressing_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                if self._eligible(message):
+                    start = message  # held back until the body is complete
+                    return
+                await send(message)
+            elif message["type"] == "http.response.body" and start is not None:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._send_compressed(send, start, b"".join(chunks), encoding)
+            else:
+                await send(message)
+
+        await self.app(scope, receive, compressing_send)
+
+    def _eligible(self, start: Dict[str, Any]) -> bool:
+        headers = start.get("headers", [])
+        length = _header(headers, b"content-length")
+        cache_control = _header(headers, b"cache-control") or b""
+        return (
+            start["status"] == 200
+            and length is not None and self.minimum_size <= int(length) <= MAX_BUFFERED_BYTES
+            and _header(headers, b"content-encoding") is None
+            and b"no-transform" not in cache_control
+            and is_compressible((_header(headers, b"content-type") or b"").decode("latin-1"))
+        )
+
+    async def _send_compressed(self, send, start: Dict[str, Any], body: bytes, encoding: Optional[str]) -> None:
+        headers = [(name, value) for name, value in start.get("headers", []) if name not in (b"content-length", b"vary")]
+        vary = _header(start.get("headers", []), b"vary")
+        # Caches must keep the variants apart even for clients sent identity
+        headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        if encoding is not None:
+            body = await self._compress(body, encoding)
+            headers = [(name, b"W/" + value if name == b"etag" and not value.startswith(b"W/") else value)
+                       for name, value in headers]
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _compress(self, body: bytes, encoding: str) -> bytes:
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        compressed = self.cache.get(key)
+        if compressed is not None:
+            return compressed
+        compress = functools.partial(CODECS[encoding], body, compression_level(encoding, self.load.current()))
+        if len(body) >= THREAD_THRESHOLD:
+            compressed = await anyio.to_thread.run_sync(compress)
+        else:
+            compressed = compress()
+        self.cache.put(key, compressed, len(body))
+        return compressed
+
+def setup_compression(app) -> None:
+    """Swap NiceGUI's GZipMiddleware for ``CompressionMiddleware``."""
+    app.user_middleware = [middleware for middleware in app.user_middleware if middleware.cls is not GZipMiddleware]
+    app.add_middleware(CompressionMiddleware)
+    app_logger.info(f"Response compression enabled: {', '.join(CompressionMiddleware(None).encodings)}")
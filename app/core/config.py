@@ -18,14 +18,85 @@ class Settings(BaseSettings):
     debug: bool = Field(default=True)
     host: str = Field(default="127.0.0.1")
     port: int = Field(default=8080)
+    workers: int = Field(default=1)  # more than 1 runs a sticky dispatcher in front of this many processes
+    worker_base_port: int = Field(default=8101)  # workers listen on 127.0.0.1 from this port upwards
+    worker_id: Optional[int] = Field(default=None)  # set by the dispatcher for the processes it starts
+    broker_database_path: str = Field(default="./data/broker.db")  # invalidation events shared by workers
+    broker_poll_interval: float = Field(default=0.2)
     
     # Database
     database_url: str = Field(default="sqlite:///./data/versace_store.db")
+    async_database_url: Optional[str] = Field(default=None)  # derived from database_url when unset
+    query_n_plus_one_threshold: int = Field(default=10)  # same statement shape repeated more often is flagged
+    query_slow_ms: float = Field(default=100.0)
+    seed_on_startup: bool = Field(default=True)  # disable in production and run `python -m app.core.seed` once
+    api_cache_max_age: int = Field(default=0)  # seconds clients/CDNs may reuse catalog API responses unrevalidated
+    response_cache_paths: str = Field(default="/api/v1/categories,/api/v1/products")  # GET prefixes cached in memory
+    response_cache_max_mb: float = Field(default=32.0)
+    response_cache_max_entry_kb: int = Field(default=512)
+    response_cache_ttl_seconds: float = Field(default=300.0)  # bounds staleness from writes outside the services
+    compression_encodings: str = Field(default="br,zstd,gzip")  # server preference; br/zstd need brotli/zstandard
+    compression_minimum_size: int = Field(default=1000)  # smaller bodies are sent uncompressed
+    compression_cache_mb: float = Field(default=16.0)  # compressed bodies kept for reuse
+    metrics_token: Optional[str] = Field(default=None)  # when set, /metrics requires "Authorization: Bearer <token>"
+    admission_enabled: bool = Field(default=True)
+    admission_shed_lag_ms: float = Field(default=250.0)  # low-priority requests get 503 above this event loop lag
+    admission_overload_lag_ms: float = Field(default=1000.0)  # all but critical requests get 503 above this
+    admission_max_in_flight: int = Field(default=200)  # likewise for requests in flight; low priority at half
+    admission_retry_after: float = Field(default=5.0)  # base Retry-After seconds, longer with more lag
+    admission_critical_paths: str = Field(default="/health,/checkout,/order-confirmation,/cart,/api/v1/cart,/admin")  # never shed
+    admission_low_priority_paths: str = Field(default="")  # shed first, e.g. report or export routes
+    profiling_interval_ms: float = Field(default=10.0)  # stack sampler period
+    profiling_max_seconds: float = Field(default=120.0)  # longest sampling run or cProfile window
+    health_sample_interval: float = Field(default=5.0)  # seconds between background CPU/memory/disk samples
+    readiness_db_timeout: float = Field(default=2.0)  # /health/ready fails if the database takes longer
+    readiness_max_loop_lag_ms: float = Field(default=500.0)  # /health/ready fails while the event loop lags more
+    log_level: str = Field(default="INFO")
+    log_to_file: bool = Field(default=True)
+    log_file: str = Field(default="./logs/app.log")  # workers write app.worker<N>.log
+    log_format: str = Field(default="json")  # log file: "json" lines, or a logging format string
+    log_console_format: str = Field(default="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    log_file_max_mb: float = Field(default=10.0)  # rotated at this size...
+    log_rotate_hours: float = Field(default=24.0)  # ...or this age, whichever comes first; 0 disables
+    log_file_backups: int = Field(default=5)
+    log_sample_rates: str = Field(default="versace_store.health=0.01")  # "logger=rate,..." share of INFO records kept
+    tracing_enabled: bool = Field(default=True)
+    tracing_sampler: str = Field(default="tail")  # "head" decides up front, "tail" keeps slow and failed traces
+    tracing_sample_rate: float = Field(default=0.01)  # share of other traces kept
+    tracing_slow_ms: float = Field(default=500.0)  # tail sampling keeps every trace at least this slow
+    tracing_file: str = Field(default="./logs/traces.jsonl")
+    tracing_file_max_mb: float = Field(default=10.0)  # rotated after this size
+    tracing_file_backups: int = Field(default=3)
     
     # Security
     secret_key: str = Field(default="versace-luxury-perfume-store-secret-key-2025")
     algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=1440)  # 24 hours
+    bcrypt_rounds: int = Field(default=12)  # existing hashes are upgraded on next login when this changes
+    hash_workers: int = Field(default=2)  # processes in the password hashing pool
+    hash_max_queue: int = Field(default=32)  # hashing calls in flight before new logins are turned away
+    login_account_free_attempts: int = Field(default=5)  # failed logins per account before throttling
+    login_ip_free_attempts: int = Field(default=20)  # failed logins per client IP before throttling
+    login_throttle_base_seconds: float = Field(default=1.0)  # first lockout, doubled on every further failure
+    login_throttle_max_seconds: float = Field(default=900.0)
+    login_throttle_idle_seconds: float = Field(default=3600.0)  # failures are forgotten after this long
+    login_throttle_max_entries: int = Field(default=100_000)  # memory backend, per table; least recently seen are evicted
+    login_throttle_backend: Optional[str] = Field(default=None)  # "memory" or "sqlite"; sqlite when WORKERS > 1
+    rate_limit_enabled: bool = Field(default=True)
+    rate_limit_default: str = Field(default="600/60")  # requests per seconds for each client IP
+    rate_limit_routes: str = Field(default="/api/v1/cart/batch=60/60")  # "prefix=limit/seconds,..." overrides
+    rate_limit_backend: str = Field(default="memory")  # "sqlite" shares counters between worker processes
+    rate_limit_database_path: str = Field(default="./data/rate_limits.db")
+    rate_limit_max_clients: int = Field(default=100_000)  # memory backend; least recently seen are evicted
+    trusted_proxies: str = Field(default="127.0.0.1,::1")  # peers whose Fly-Client-IP/X-Forwarded-For count; "*" for any
+
+    # Sessions
+    session_backend: str = Field(default="sqlite")  # "sqlite" is shared by worker processes, "memory" is per process
+    session_database_path: str = Field(default="./data/sessions.db")
+    session_flush_interval: float = Field(default=0.5)  # seconds between batched session writes
+    session_cache_seconds: float = Field(default=5.0)  # cached sessions are reloaded after this long
+    session_cache_size: int = Field(default=10_000)
+    session_idle_days: int = Field(default=14)  # sessions not seen for this long are deleted
     
     # File uploads
     max_file_size: int = Field(default=5 * 1024 * 1024)  # 5MB
@@ -37,4 +108,16 @@ class Settings(BaseSettings):
     shipping_cost: float = Field(default=9.99)
     free_shipping_threshold: float = Field(default=75.00)
 
+    # Background jobs
+    job_workers: int = Field(default=2)
+    job_max_attempts: int = Field(default=5)
+    job_retry_base_seconds: float = Field(default=2.0)
+    job_retry_max_seconds: float = Field(default=300.0)
+    job_poll_interval: float = Field(default=1.0)
+    job_lock_timeout_seconds: int = Field(default=300)  # reclaim jobs from crashed or hung workers
+
+    # Email (local file sink stands in for SMTP)
+    email_outbox_directory: str = Field(default="./data/outbox")
+    email_from_address: str = Field(default="orders@versace-perfumes.local")
+
 settings = Settings()
\ No newline at end of file
@@ -1,9 +1,12 @@
 """SQLAlchemy V2 database setup with proper session management."""
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
 from app.core.logging import app_logger
+import hashlib
 import os
 
 # Ensure data directory exists
@@ -17,6 +20,24 @@ engine = create_engine(
     pool_recycle=300
 )
 
+def get_async_database_url(database_url: str) -> str:
+    """Map a SQLite URL onto aiosqlite; other databases need ``ASYNC_DATABASE_URL``."""
+    if database_url.startswith("sqlite://"):
+        return database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    raise ValueError("ASYNC_DATABASE_URL must be set (with an asyncio driver that is installed) "
+                     "when DATABASE_URL is not SQLite")
+
+# Async engine for NiceGUI handlers, so queries don't block the event loop
+async_engine = create_async_engine(
+    settings.async_database_url or get_async_database_url(settings.database_url),
+    echo=settings.debug,
+    pool_pre_ping=True,
+    pool_recycle=300
+)
+
+# Objects stay usable after commit so pages can render them once the session closes
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models."""
     pass
@@ -26,10 +47,79 @@ def create_tables():
     try:
         Base.metadata.create_all(bind=engine)
         app_logger.info("Database tables created successfully")
+        upgrade_schema()
     except Exception as e:
         app_logger.error(f"Error creating database tables: {e}")
         raise
 
+def upgrade_schema():
+    """Bring an existing database up to the current schema.
+    
+    create_all() skips tables that already exist, so indexes added to a
+    model later are never created on old databases. Create any that are
+    missing here, and rebuild those that have since been made unique,
+    after running the statements in the index's ``info["deduplicate"]``.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing = {
+            table_name: {index["name"]: bool(index["unique"]) for index in inspector.get_indexes(table_name)}
+            for table_name in inspector.get_table_names()
+        }
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                indexes = existing.get(table.name, {})
+                if index.name in indexes and indexes[index.name] == bool(index.unique):
+                    continue
+                if index.unique:
+                    for statement in index.info.get("deduplicate", ()):
+                        conn.execute(text(statement))
+                if index.name in indexes:
+                    index.drop(bind=conn)
+                index.create(bind=conn)
+                app_logger.info(f"Created {'unique ' if index.unique else ''}index {index.name} on {table.name}")
+
+def import_models():
+    """Import every model module so Base.metadata describes the full schema."""
+    from app.models import user, product, cart, order, job  # noqa: F401
+
+def schema_fingerprint() -> str:
+    """Hash of the tables, columns and indexes declared on the models."""
+    import_models()
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(f"table {table.name}")
+        for column in table.columns:
+            parts.append(f"column {column.name} {column.type} nullable={column.nullable} pk={column.primary_key}")
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            parts.append(f"index {index.name} {[column.name for column in index.columns]} unique={index.unique}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+def ensure_schema() -> bool:
+    """Create or upgrade the schema only if the database isn't stamped with the current version.
+    
+    Reading the stamp is a single query, so warm boots skip create_all()
+    and the index inspection entirely. Returns True if tables were created.
+    """
+    fingerprint = schema_fingerprint()
+    try:
+        with engine.connect() as conn:
+            stamped = conn.execute(text("SELECT fingerprint FROM schema_version")).scalar()
+    except DBAPIError:
+        stamped = None  # new database, or one created before schema stamps
+    
+    if stamped == fingerprint:
+        app_logger.info("Database schema is up to date, skipping create_all")
+        return False
+    
+    create_tables()
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (fingerprint VARCHAR(64) NOT NULL)"))
+        conn.execute(text("DELETE FROM schema_version"))
+        conn.execute(text("INSERT INTO schema_version (fingerprint) VALUES (:fingerprint)"), {"fingerprint": fingerprint})
+    app_logger.info(f"Database schema stamped with version {fingerprint[:12]}")
+    return True
+
 def get_db() -> Session:
     """Database session dependency."""
     with Session(engine) as session:
@@ -38,8 +128,13 @@ def get_db() -> Session:
         finally:
             session.close()
 
+async def get_async_db() -> AsyncSession:
+    """Async database session dependency."""
+    async with AsyncSessionLocal() as session:
+        yield session
+
 def init_sample_data():
-    """Initialize sample data for the store."""
+    """Initialize sample data for the store (see also ``python -m app.core.seed``)."""
     from app.services.product_service import ProductService
     from app.services.category_service import CategoryService
     
@@ -0,0 +1,410 @@
+"""Deterministic synthetic dataset generator for load testing.
+
+Bulk-loads categories, products, users, orders with their lines, reviews
+and carts at configurable volumes. Popularity is skewed the way real stores
+are: a few categories and products receive most orders, reviews and cart
+adds, a few users place most orders, and recent days are busier than old
+ones. Rows are built in chunks and written with Core ``executemany`` inserts,
+one transaction per chunk, so millions of rows load in minutes.
+
+The same seed and volumes always produce the same data. Each table draws
+from its own random stream, so changing one volume leaves the others alone.
+
+Usage::
+
+    python -m app.core.datagen --profile small
+    python -m app.core.datagen --profile large --database-url sqlite:///./data/loadtest.db --reset
+    python -m app.core.datagen --products 50000 --users 100000 --order-lines 1000000
+
+All generated users share the password ``loadtest123``.
+"""
+
+import argparse
+import itertools
+import math
+import random
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import Engine
+
+from app.core.catalog_version import catalog_version
+from app.core.database import Base
+from app.core.logging import app_logger
+from app.models.cart import Cart, CartItem
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Category, Product, Review
+from app.models.user import User
+from app.models import job  # noqa: F401  (register every table for --reset)
+
+LOADTEST_PASSWORD = "loadtest123"
+
+# Fixed reference point so generated timestamps don't depend on the clock
+EPOCH = datetime(2025, 1, 1)
+
+@dataclass
+class Volumes:
+    """How many rows to generate per table."""
+    categories: int = 12
+    products: int = 2_000
+    users: int = 5_000
+    orders: int = 20_000
+    order_lines: int = 50_000
+    reviews: int = 10_000
+    carts: int = 1_000
+
+PROFILES: Dict[str, Volumes] = {
+    "small": Volumes(),
+    "medium": Volumes(categories=40, products=20_000, users=50_000, orders=200_000,
+                      order_lines=500_000, reviews=100_000, carts=10_000),
+    "large": Volumes(categories=120, products=200_000, users=500_000, orders=2_000_000,
+                     order_lines=5_000_000, reviews=1_000_000, carts=100_000),
+}
+
+_BRANDS = ["Versace", "Versus", "Medusa", "Atelier", "Palazzo", "Barocco"]
+_ADJECTIVES = ["Bright", "Crystal", "Dylan", "Noir", "Eros", "Blue", "Gold", "Pure", "Wild",
+               "Velvet", "Amber", "Royal", "Citrus", "Midnight", "Santal", "Ivory", "Rose"]
+_NOUNS = ["Flame", "Essence", "Jeans", "Pour Homme", "Pour Femme", "Oud", "Garden", "Dream",
+          "Signature", "Intense", "Absolu", "Eau Fraiche", "Reserve", "Night", "Aqua"]
+_SIZES = ["30ml", "50ml", "90ml", "100ml", "200ml"]
+_FIRST_NAMES = ["Alex", "Sam", "Maria", "Luca", "Giulia", "Noah", "Emma", "Marco", "Sofia",
+                "Leo", "Anna", "Paolo", "Chiara", "Omar", "Mia", "Ivan", "Zoe", "Kai"]
+_LAST_NAMES = ["Rossi", "Smith", "Bianchi", "Garcia", "Romano", "Müller", "Colombo", "Chen",
+               "Ricci", "Kowalski", "Marino", "Novak", "Greco", "Silva", "Bruno", "Khan"]
+_STREETS = ["Via Monte Napoleone", "Main Street", "Oak Avenue", "Via Gesù", "Park Lane", "Elm Road"]
+_CITIES = ["Milan", "New York", "London", "Paris", "Dubai", "Tokyo", "Berlin", "Sydney"]
+_PAYMENT_METHODS = ["Credit Card", "Debit Card", "PayPal"]
+_COMMENTS = ["Love it", "Lasts all day", "Too strong for me", "Perfect gift", "Smells amazing",
+             "Not what I expected", "My signature scent", "Great value", None]
+
+_ORDER_STATUSES = list(OrderStatus)
+_ORDER_STATUS_WEIGHTS = [3, 5, 4, 10, 75, 3]  # pending, confirmed, processing, shipped, delivered, cancelled
+_RATINGS = [1, 2, 3, 4, 5]
+_RATING_WEIGHTS = [4, 6, 15, 35, 40]
+
+def zipf_cum_weights(n: int, exponent: float = 1.1) -> List[float]:
+    """Cumulative weights where item ``i`` is picked in proportion to 1 / (i + 1) ** exponent."""
+    return list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+
+def chunked(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+class DatasetGenerator:
+    """Generates and bulk-inserts a synthetic store dataset."""
+
+    def __init__(self, engine: Engine, volumes: Volumes, seed: int = 42,
+                 chunk_size: int = 10_000, days: int = 730):
+        self.engine = engine
+        self.volumes = volumes
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.days = days
+        self.counts: Dict[str, int] = {}
+
+        # Ids are assigned up front so rows can reference each other without round trips
+        self._first_id: Dict[str, int] = {}
+        self._product_prices: List[float] = []
+        self._product_shuffle: List[int] = []
+        self._user_shuffle: List[int] = []
+
+    def rng(self, table: str) -> random.Random:
+        """Independent, reproducible random stream for one table."""
+        return random.Random(f"{self.seed}:{table}")
+
+    def run(self) -> Dict[str, int]:
+        """Generate every table; returns the number of rows inserted per table."""
+        with self.engine.connect() as conn:
+            for table in (Category, Product, User, Order, OrderItem, Review, Cart, CartItem):
+                self._first_id[table.__tablename__] = (conn.execute(select(func.max(table.id))).scalar() or 0) + 1
+
+        self._insert(Category, self._categories())
+        self._insert(Product, self._products())
+        self._insert(User, self._users())
+        self._insert_orders()
+        self._insert(Review, self._reviews())
+        self._insert_carts()
+        return self.counts
+
+    def _insert(self, model, rows: Iterator[dict]) -> None:
+        table = model.__table__
+        started = time.perf_counter()
+        inserted = 0
+        for chunk in chunked(rows, self.chunk_size):
+            with self.engine.begin() as conn:
+                conn.execute(table.insert(), chunk)
+            inserted += len(chunk)
+        self._record(table.name, inserted, started)
+
+    def _record(self, table: str, inserted: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.counts[table] = self.counts.get(table, 0) + inserted
+        rate = inserted / elapsed if elapsed else 0
+        app_logger.info(f"Generated {inserted:,} {table} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+    def _timestamp(self, rng: random.Random) -> datetime:
+        # Square root skews towards recent days, like a growing store
+        age = self.days * (1.0 - math.sqrt(rng.random()))
+        return EPOCH - timedelta(days=age)
+
+    def _ids(self, table: str, count: int) -> range:
+        first = self._first_id[table]
+        return range(first, first + count)
+
+    def _categories(self) -> Iterator[dict]:
+        rng = self.rng("categories")
+        for category_id in self._ids("categories", self.volumes.categories):
+            created_at = self._timestamp(rng)
+            yield {
+                "id": category_id,
+                "name": f"{rng.choice(_ADJECTIVES)} Collection {category_id}",
+                "description": f"Synthetic category {category_id}",
+                "image_url": None,
+                "is_active": True,
+                "created_at": created_at,
+            }
+
+    def _products(self) -> Iterator[dict]:
+        rng = self.rng("products")
+        category_ids = list(self._ids("categories", self.volumes.categories))
+        category_weights = zipf_cum_weights(len(category_ids), exponent=0.8)
+        self._product_prices = []
+        for product_id in self._ids("products", self.volumes.products):
+            price = round(min(max(rng.lognormvariate(4.3, 0.45), 15.0), 950.0), 2)
+            self._product_prices.append(price)
+            created_at = self._timestamp(rng)
+            yield {
+                "id": product_id,
+                "name": f"{rng.choice(_BRANDS)} {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)} {product_id}",
+                "description": f"A {rng.choice(_ADJECTIVES).lower()} fragrance with {rng.choice(_NOUNS).lower()} notes.",
+                "price": price,
+                "size": rng.choice(_SIZES),
+                "image_url": None,
+                "stock_quantity": rng.choice((0, rng.randint(1, 20), rng.randint(20, 500))),
+                "category_id": rng.choices(category_ids, cum_weights=category_weights)[0],
+                "is_active": rng.random() > 0.03,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+
+        # Popularity rank is independent of id, so hot products are spread through the table
+        self._product_shuffle = list(self._ids("products", self.volumes.products))
+        rng.shuffle(self._product_shuffle)
+
+    def _users(self) -> Iterator[dict]:
+        from app.core.auth import AuthManager
+        rng = self.rng("users")
+        hashed_password = AuthManager.get_password_hash(LOADTEST_PASSWORD)  # hashing per user would take hours
+        for user_id in self._ids("users", self.volumes.users):
+            created_at = self._timestamp(rng)
+            yield {
+                "id": user_id,
+                "email": f"user{user_id}@loadtest.local",
+                "username": f"user{user_id}",
+                "hashed_password": hashed_password,
+                "full_name": f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}",
+                "phone": f"+1555{rng.randint(0, 9_999_999):07d}",
+                "address": f"{rng.randint(1, 999)} {rng.choice(_STREETS)}\n{rng.choice(_CITIES)}",
+                "is_active": True,
+                "is_admin": False,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+
+        self._user_shuffle = list(self._ids("users", self.volumes.users))
+        rng.shuffle(self._user_shuffle)
+
+    def _product_picker(self, rng: random.Random, exponent: float) -> Callable[..., List[int]]:
+        """Skewed product picker drawing from the popularity ranking."""
+        cum_weights = zipf_cum_weights(len(self._product_shuffle), exponent)
+        products = self._product_shuffle
+        return lambda k=1: rng.choices(products, cum_weights=cum_weights, k=k)
+
+    def _insert_orders(self) -> None:
+        """Orders and their lines, written together so totals match the lines."""
+        rng = self.rng("orders")
+        if not self.volumes.orders or not self._user_shuffle or not self._product_shuffle:
+            return
+
+        pick_products = self._product_picker(rng, exponent=1.1)
+        user_weights = zipf_cum_weights(len(self._user_shuffle), exponent=0.7)
+        first_product = self._first_id["products"]
+        # Geometric line counts averaging order_lines / orders
+        mean_lines = max(self.volumes.order_lines / self.volumes.orders, 1.0)
+        extra_line_p = 1.0 - 1.0 / mean_lines
+
+        order_ids = self._ids("orders", self.volumes.orders)
+        next_line_id = self._first_id["order_items"]
+        started = time.perf_counter()
+        line_count = 0
+
+        for chunk_start in range(0, len(order_ids), self.chunk_size):
+            orders, lines = [], []
+            chunk_ids = order_ids[chunk_start:chunk_start + self.chunk_size]
+            user_ids = rng.choices(self._user_shuffle, cum_weights=user_weights, k=len(chunk_ids))
+            for order_id, user_id in zip(chunk_ids, user_ids):
+                line_total = 1
+                while rng.random() < extra_line_p and line_total < 20:
+                    line_total += 1
+
+                subtotal = 0.0
+                for product_id in set(pick_products(line_total)):
+                    quantity = 1 if rng.random() < 0.8 else rng.randint(2, 4)
+                    price = self._product_prices[product_id - first_product]
+                    subtotal += price * quantity
+                    lines.append({
+                        "id": next_line_id,
+                        "order_id": order_id,
+                        "product_id": product_id,
+                        "quantity": quantity,
+                        "price": price,
+                    })
+                    next_line_id += 1
+
+                subtotal = round(subtotal, 2)
+                tax_amount = round(subtotal * 0.08, 2)
+                shipping_cost = 0.0 if subtotal >= 75 else 9.99
+                created_at = self._timestamp(rng)
+                orders.append({
+                    "id": order_id,
+                    "order_number": f"LT-{self.seed}-{order_id:010d}",
+                    "subtotal": subtotal,
+                    "tax_amount": tax_amount,
+                    "shipping_cost": shipping_cost,
+                    "total_amount": round(subtotal + tax_amount + shipping_cost, 2),
+                    "status": rng.choices(_ORDER_STATUSES, weights=_ORDER_STATUS_WEIGHTS)[0],
+                    "shipping_name": f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}",
+                    "shipping_address": f"{rng.randint(1, 999)} {rng.choice(_STREETS)}\n{rng.choice(_CITIES)}",
+                    "shipping_phone": None,
+                    "payment_method": rng.choice(_PAYMENT_METHODS),
+                    "payment_status": "paid",
+                    "user_id": user_id,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+
+            with self.engine.begin() as conn:
+                conn.execute(Order.__table__.insert(), orders)
+                conn.execute(OrderItem.__table__.insert(), lines)
+            line_count += len(lines)
+
+        self._record("orders", len(order_ids), started)
+        self.counts["order_items"] = self.counts.get("order_items", 0) + line_count
+        app_logger.info(f"Generated {line_count:,} order_items rows")
+
+    def _reviews(self) -> Iterator[dict]:
+        rng = self.rng("reviews")
+        if not self._user_shuffle or not self._product_shuffle:
+            return
+        pick_products = self._product_picker(rng, exponent=1.2)
+        for review_id in self._ids("reviews", self.volumes.reviews):
+            yield {
+                "id": review_id,
+                "rating": rng.choices(_RATINGS, weights=_RATING_WEIGHTS)[0],
+                "comment": rng.choice(_COMMENTS),
+                "product_id": pick_products()[0],
+                "user_id": rng.choice(self._user_shuffle),
+                "created_at": self._timestamp(rng),
+            }
+
+    def _insert_carts(self) -> None:
+        rng = self.rng("carts")
+        if not self._user_shuffle or not self._product_shuffle:
+            return
+
+        pick_products = self._product_picker(rng, exponent=1.0)
+        # One cart per user, so never more carts than generated users
+        owners = rng.sample(self._user_shuffle, min(self.volumes.carts, len(self._user_shuffle)))
+        cart_ids = self._ids("carts", len(owners))
+        next_item_id = self._first_id["cart_items"]
+        started = time.perf_counter()
+        item_count = 0
+
+        for chunk_start in range(0, len(cart_ids), self.chunk_size):
+            carts, items = [], []
+            for cart_id, user_id in zip(cart_ids[chunk_start:chunk_start + self.chunk_size],
+                                        owners[chunk_start:chunk_start + self.chunk_size]):
+                created_at = self._timestamp(rng)
+                carts.append({"id": cart_id, "user_id": user_id, "created_at": created_at, "updated_at": created_at})
+                for product_id in set(pick_products(rng.randint(1, 5))):
+                    items.append({
+                        "id": next_item_id,
+                        "cart_id": cart_id,
+                        "product_id": product_id,
+                        "quantity": rng.randint(1, 3),
+                        "created_at": created_at,
+                    })
+                    next_item_id += 1
+
+            with self.engine.begin() as conn:
+                conn.execute(Cart.__table__.insert(), carts)
+                conn.execute(CartItem.__table__.insert(), items)
+            item_count += len(items)
+
+        self._record("carts", len(cart_ids), started)
+        self.counts["cart_items"] = self.counts.get("cart_items", 0) + item_count
+
+def create_loader_engine(database_url: str) -> Engine:
+    """Engine tuned for bulk loading (SQLite: WAL, relaxed fsync, bigger cache)."""
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA cache_size=-200000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+    return engine
+
+def main() -> None:
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Bulk-load a deterministic synthetic dataset")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small",
+                        help="base volumes; individual --<table> options override them")
+    for volume in fields(Volumes):
+        parser.add_argument(f"--{volume.name.replace('_', '-')}", type=int, dest=volume.name)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="rows per insert transaction")
+    parser.add_argument("--days", type=int, default=730, help="history length for timestamps")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    volumes = Volumes(**{
+        volume.name: getattr(args, volume.name) if getattr(args, volume.name) is not None
+        else getattr(PROFILES[args.profile], volume.name)
+        for volume in fields(Volumes)
+    })
+
+    engine = create_loader_engine(args.database_url)
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    started = time.perf_counter()
+    counts = DatasetGenerator(engine, volumes, seed=args.seed, chunk_size=args.chunk_size, days=args.days).run()
+    elapsed = time.perf_counter() - started
+
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")  # fresh planner statistics for the new volumes
+
+    # Catalog API ETags must not match responses from before the new products
+    catalog_version.bump(engine)
+
+    total = sum(counts.values())
+    print(f"Inserted {total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    for table, count in counts.items():
+        print(f"  {table:<12} {count:>12,}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError
 from typing import Dict, List, Optional, Union, Any, Callable
@@ -7,6 +6,7 @@ import traceback
 
 from app.core.exceptions import AppException, ErrorDetail
 from app.core.logging import app_logger
+from app.core.serialization import FastJSONResponse
 
 def setup_error_handlers(app: FastAPI) -> None:
     """Set up global exception handlers for the FastAPI application."""
@@ -17,7 +17,7 @@ def setup_error_handlers(app: FastAPI) -> None:
             f"AppException caught: {exc.name} - {exc.detail}",
             extra={"request_url": str(request.url), "status_code": exc.status_code}
         )
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=exc.status_code,
             content={"detail": exc.detail, "name": exc.name},
             headers=exc.headers
@@ -29,7 +29,7 @@ def setup_error_handlers(app: FastAPI) -> None:
             f"Request validation error: {exc.errors()}",
             extra={"request_url": str(request.url), "body": exc.body}
         )
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             content={"detail": exc.errors(), "body": exc.body},
         )
@@ -40,7 +40,7 @@ def setup_error_handlers(app: FastAPI) -> None:
             f"Pydantic validation error: {exc.errors()}",
             extra={"request_url": str(request.url)}
         )
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             content={"detail": exc.errors()},
         )
@@ -51,7 +51,7 @@ def setup_error_handlers(app: FastAPI) -> None:
             f"Unhandled exception: {exc}",
             extra={"request_url": str(request.url)}
         )
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"detail": "An unexpected error occurred."},
         )
@@ -60,7 +60,7 @@ def create_error_response(
     status_code: int, 
     detail: Union[str, List[ErrorDetail]],
     headers: Optional[Dict[str, Any]] = None
-) -> JSONResponse:
+) -> FastJSONResponse:
     """Create a standardized error response.
     
     Args:
@@ -69,14 +69,14 @@ def create_error_response(
         headers: Optional response headers
         
     Returns:
-        JSONResponse with standardized error format
+        FastJSONResponse with standardized error format
     """
     if isinstance(detail, str):
         content = {"detail": detail}
     else:
         content = {"detail": [error.dict() for error in detail]}
     
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status_code,
         content=content,
         headers=headers,
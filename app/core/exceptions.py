@@ -104,6 +104,19 @@ class RateLimitError(AppException):
             headers=headers
         )
 
+class ServiceUnavailableError(AppException):
+    """Exception raised when the server is too busy to take on more work."""
+    def __init__(
+        self, 
+        detail: str = "Service temporarily unavailable",
+        headers: Optional[Dict[str, Any]] = None
+    ):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers=headers
+        )
+
 class DatabaseError(AppException):
     """Exception raised when a database operation fails."""
     def __init__(
@@ -0,0 +1,193 @@
+"""Password hashing on a bounded process pool.
+
+bcrypt deliberately burns tens to hundreds of milliseconds of CPU per call.
+Async handlers hand hashing and verification to ``password_hasher``, which
+runs them in worker processes so neither the event loop nor the GIL is held
+up. When more calls are waiting than ``hash_max_queue`` allows, new ones are
+rejected with ``ServiceUnavailableError`` instead of piling up.
+
+The pool is started with ``forkserver`` rather than ``fork``: by the first
+login the app runs job, session, broker and logging threads, and a forked
+child would inherit whatever locks they held. Forkserver children import
+``main.py`` again, which skips starting the app when
+``is_hashing_worker()`` says so.
+
+The bcrypt cost factor comes from ``settings.bcrypt_rounds``. Hashes made
+with a different cost still verify and are flagged by ``needs_rehash`` so
+they can be upgraded transparently on the next successful login.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import forkserver
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.logging import app_logger
+
+# Set in the environment of the fork server, and so of every pool worker
+_WORKER_ENV = "PASSWORD_HASHING_WORKER"
+
+def is_hashing_worker() -> bool:
+    """Whether this process is a password hashing pool worker (or their fork server)."""
+    return os.environ.get(_WORKER_ENV) == "1"
+
+@functools.lru_cache(maxsize=None)
+def password_context(rounds: int):
+    """bcrypt context that hashes with ``rounds`` and flags any other cost for rehashing."""
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+# Worker process entry points: module-level so they can be pickled.
+# They report wall-clock start/end so the parent can split queue wait from hash time.
+
+def _hash_password(password: str, rounds: int):
+    started = time.time()
+    hashed = password_context(rounds).hash(password)
+    return hashed, started, time.time()
+
+def _verify_password(password: str, hashed_password: str, rounds: int):
+    started = time.time()
+    valid = password_context(rounds).verify(password, hashed_password)
+    return valid, started, time.time()
+
+def _dummy_verify(rounds: int):
+    started = time.time()
+    password_context(rounds).dummy_verify()
+    return False, started, time.time()
+
+@dataclass
+class HashOperationMetrics:
+    """Latency and queue wait for one kind of hashing operation."""
+    count: int = 0
+    rejected: int = 0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+    def record(self, wait_ms: float, latency_ms: float) -> None:
+        self.count += 1
+        self.total_latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "rejected": self.rejected,
+            "avg_latency_ms": round(self.total_latency_ms / self.count, 1) if self.count else 0,
+            "max_latency_ms": round(self.max_latency_ms, 1),
+            "avg_wait_ms": round(self.total_wait_ms / self.count, 1) if self.count else 0,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+        }
+
+class PasswordHasher:
+    """Runs bcrypt hashing and verification on a bounded process pool."""
+
+    def __init__(self, workers: int = 2, max_queue: int = 32, rounds: int = 12):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._metrics = {"hash": HashOperationMetrics(), "verify": HashOperationMetrics()}
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls submitted to the pool and not yet finished (running or waiting)."""
+        return self._in_flight
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a stored hash was made with a different cost factor."""
+        return password_context(self.rounds).needs_update(hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in a worker process."""
+        return await self._submit("hash", _hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Check a password against its hash in a worker process."""
+        return await self._submit("verify", _verify_password, password, hashed_password, self.rounds)
+
+    async def dummy_verify(self) -> bool:
+        """Spend as long as a real verification, for logins with an unknown email.
+
+        Answering unknown emails faster than wrong passwords would reveal
+        which accounts exist. Always returns False.
+        """
+        return await self._submit("verify", _dummy_verify, self.rounds)
+
+    async def _submit(self, operation: str, func, *args):
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                self._metrics[operation].rejected += 1
+                raise ServiceUnavailableError("Too many sign-ins in progress, please try again shortly")
+            self._in_flight += 1
+            executor = self._get_executor()
+
+        submitted = time.time()
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        with self._lock:
+            self._metrics[operation].record(
+                wait_ms=max(started - submitted, 0.0) * 1000,
+                latency_ms=(finished - started) * 1000,
+            )
+        return result
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use so boot doesn't pay for starting worker processes
+        if self._executor is None:
+            # The fork server copies the environment as it is while it starts
+            os.environ[_WORKER_ENV] = "1"
+            try:
+                forkserver.ensure_running()
+            finally:
+                del os.environ[_WORKER_ENV]
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("forkserver"))
+            app_logger.info(f"Password hashing pool started ({self.workers} workers, bcrypt cost {self.rounds})")
+        return self._executor
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and per-operation latency."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "queue_depth": self._in_flight,
+                "max_queue": self.max_queue,
+                **{operation: metrics.to_dict() for operation, metrics in self._metrics.items()},
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher(
+    workers=settings.hash_workers,
+    max_queue=settings.hash_max_queue,
+    rounds=settings.bcrypt_rounds,
+)
@@ -1,96 +1,309 @@
+"""Health checks for probes and monitoring.
+
+System numbers (CPU, memory, disk, process) are collected by
+``SystemSampler`` on a background thread every ``HEALTH_SAMPLE_INTERVAL``
+seconds, so a health request only copies the latest snapshot and never
+waits on psutil on the event loop.
+
+- ``/health``: the latest snapshot with per-resource status
+- ``/health/live``: the process is up and serving requests; a constant
+  body from a raw ASGI endpoint (``StaticProbe``)
+- ``/health/ready``: the database answers and the event loop is not lagging
+
+None of them is a NiceGUI page, so a probe never builds a page or creates
+a ``Client``; ``prioritize_health_routes`` puts them ahead of every page
+route.
+"""
+
+import asyncio
 import os
-import time
 import platform
-import psutil
-from typing import Dict, Any
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("health")
+
+def _status(value: float, limit: float) -> str:
+    return "warning" if value > limit else "healthy"
+
+class SystemSampler:
+    """Refreshes a snapshot of system and process stats on a background thread."""
 
-from app.core.logging import app_logger
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._process = None
+
+    def sample(self) -> Dict[str, Any]:
+        """Collect a fresh snapshot and make it the current one."""
+        import psutil  # imported on first sample, not at startup
+
+        if self._process is None:
+            self._process = psutil.Process(os.getpid())
+        try:
+            # Non-blocking: utilisation since the previous call, which is one interval ago
+            cpu_percent = psutil.cpu_percent(interval=None)
+            memory = psutil.virtual_memory()
+            disk = psutil.disk_usage(os.getcwd())
+            with self._process.oneshot():
+                process_memory_mb = self._process.memory_info().rss / (1024 * 1024)
+                process_cpu_percent = self._process.cpu_percent(interval=None)
+                threads = self._process.num_threads()
+            snapshot = {
+                "status": "healthy",
+                "cpu": {"percent": cpu_percent, "status": _status(cpu_percent, 80)},
+                "memory": {"percent": memory.percent, "status": _status(memory.percent, 80)},
+                "disk": {"percent": disk.percent, "status": _status(disk.percent, 80)},
+                "process": {
+                    "memory_mb": round(process_memory_mb, 2),
+                    "cpu_percent": process_cpu_percent,
+                    "threads": threads,
+                    "status": _status(process_memory_mb, 500),
+                },
+                "platform": platform.platform(),
+                "python_version": platform.python_version(),
+                "sampled_at": time.time(),
+            }
+        except Exception as e:
+            logger.error(f"Error sampling system health: {e}")
+            snapshot = {"status": "error", "message": str(e), "sampled_at": time.time()}
+        self._snapshot = snapshot  # replaced whole, so readers never see a partial update
+        return snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The latest snapshot; the first call samples once and starts the thread."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot or self.sample()
+            self.start()
+        return snapshot
+
+    def start(self) -> None:
+        """Start the background sampler thread."""
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name="system-sampler", daemon=True)
+            self._thread.start()
+        logger.info(f"System stats sampled every {self.interval:g} seconds")
+
+    def stop(self) -> None:
+        # Takes no arguments: NiceGUI passes a client to shutdown handlers that accept one
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5.0)
+            self._thread = None
+
+    def _sample_loop(self) -> None:
+        if self._snapshot is None:
+            self.sample()
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+system_sampler = SystemSampler(settings.health_sample_interval)
 
 class HealthCheck:
     """Health check utility for the application.
-    
+
     This class provides methods to check the health of various components
     of the application, focusing on system resources.
     """
-    
+
     @staticmethod
     def check_system() -> Dict[str, Any]:
-        """Check system health (CPU, memory, disk, process).
-        
+        """System health (CPU, memory, disk, process) from the latest background sample.
+
         Returns:
             Dict with system health information
         """
-        try:
-            app_logger.info("Starting system health check")
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage(os.getcwd())
-            process = psutil.Process(os.getpid())
-            process_memory_mb = process.memory_info().rss / (1024 * 1024)
-            
-            result = {
-                "status": "healthy",
-                "cpu": {"percent": cpu_percent, "status": "warning" if cpu_percent > 80 else "healthy"},
-                "memory": {"percent": memory.percent, "status": "warning" if memory.percent > 80 else "healthy"},
-                "disk": {"percent": disk.percent, "status": "warning" if disk.percent > 80 else "healthy"},
-                "process": {"memory_mb": round(process_memory_mb, 2), "status": "warning" if process_memory_mb > 500 else "healthy"},
-                "platform": platform.platform(),
-                "python_version": platform.python_version(),
-            }
-            app_logger.info("System health check completed successfully")
-            return result
-        except Exception as e:
-            app_logger.error(f"Error checking system health: {e}")
-            return {"status": "error", "message": str(e)}
-    
+        return system_sampler.snapshot()
+
     @staticmethod
     def check_all() -> Dict[str, Any]:
         """Run all health checks.
-        
+
         Returns:
             Dict with all health check information
         """
         try:
-            app_logger.info("Starting all health checks")
-            start_time = time.time()
-            
+            start_time = time.perf_counter()
+
             system_health = HealthCheck.check_system()
-            
+
             overall_status = system_health.get("status", "error")
-            
-            response_time_ms = round((time.time() - start_time) * 1000, 2)
-            
+
+            response_time_ms = round((time.perf_counter() - start_time) * 1000, 3)
+
             result = {
                 "status": overall_status,
                 "timestamp": time.time(),
                 "response_time_ms": response_time_ms,
                 "system": system_health,
             }
-            app_logger.info("All health checks completed successfully")
+            logger.info(f"Health check completed with status: {overall_status}")
             return result
         except Exception as e:
-            app_logger.error(f"Error in check_all: {e}")
+            logger.error(f"Error in check_all: {e}")
             return {"status": "error", "message": str(e), "timestamp": time.time()}
 
+    @staticmethod
+    async def check_ready() -> Dict[str, Any]:
+        """Readiness: the database answers and the event loop keeps up.
+
+        Returns:
+            Dict with a ``ready`` flag and the result of each check
+        """
+        from sqlalchemy import text
+
+        from app.core.database import async_engine
+        from app.core.loop_lag import loop_lag_monitor
+
+        checks: Dict[str, Any] = {}
+        started = time.perf_counter()
+        try:
+            async def ping():
+                async with async_engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+            await asyncio.wait_for(ping(), settings.readiness_db_timeout)
+            checks["database"] = {"status": "ok", "ms": round((time.perf_counter() - started) * 1000, 2)}
+        except Exception as e:
+            checks["database"] = {"status": "failed", "error": str(e) or type(e).__name__}
+
+        lag_ms = loop_lag_monitor.lag * 1000
+        checks["event_loop"] = {
+            "status": "ok" if lag_ms <= settings.readiness_max_loop_lag_ms else "lagging",
+            "lag_ms": round(lag_ms, 2),
+        }
+
+        ready = all(check["status"] == "ok" for check in checks.values())
+        if not ready:
+            logger.warning(f"Not ready: {checks}")
+        return {"status": "ready" if ready else "not_ready", "ready": ready, "timestamp": time.time(), "checks": checks}
+
+LIVENESS_BODY = b'{"status":"alive"}'
+
+class StaticProbe:
+    """Raw ASGI endpoint answering every request with the same small JSON body.
+
+    Liveness only needs the event loop to answer, so this skips FastAPI's
+    request parsing and response encoding altogether.
+    """
+
+    def __init__(self, body: bytes = LIVENESS_BODY):
+        self.body = body
+        self.headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"cache-control", b"no-store"),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        # Fresh header list each time: middlewares may append to it in place
+        await send({"type": "http.response.start", "status": 200, "headers": list(self.headers)})
+        await send({"type": "http.response.body", "body": self.body})
+
+def prioritize_health_routes(app) -> None:
+    """Move the ``/health`` routes to the front so no page route can shadow them."""
+    app.router.routes.sort(key=lambda route: not getattr(route, "path", "").startswith("/health"))
+
 def is_healthy(component: str = "all") -> bool:
     """Check if a specific component is healthy.
-    
+
     Args:
         component: The component to check ("system" or "all")
-        
+
     Returns:
         True if the component is healthy, False otherwise
     """
     try:
-        app_logger.info(f"Checking health for component: {component}")
         if component == "system":
             return HealthCheck.check_system().get("status") == "healthy"
         elif component == "all":
             health = HealthCheck.check_all()
             return health.get("status") == "healthy"
         else:
-            app_logger.warning(f"Unknown health component requested: {component}")
+            logger.warning(f"Unknown health component requested: {component}")
             return False
     except Exception as e:
-        app_logger.error(f"Error checking health for {component}: {e}")
-        return False
\ No newline at end of file
+        logger.error(f"Error checking health for {component}: {e}")
+        return False
+
+# Benchmark
+
+def main() -> None:
+    import argparse
+    import asyncio
+    import logging
+    from nicegui import Client, app, ui
+    import nicegui.storage
+
+    from app.api import api_router
+
+    parser = argparse.ArgumentParser(description="Measure the cost of one health probe")
+    parser.add_argument("--requests", type=int, default=2_000)
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)  # /health logs on every call
+
+    # The probe as it used to be: a NiceGUI page printing a label
+    @ui.page("/bench/page-probe")
+    def page_probe():
+        ui.label('{"status": "healthy"}')
+
+    app.include_router(api_router)
+    prioritize_health_routes(app)
+    app.config.add_run_config(reload=False, title="bench", viewport="", favicon=None, dark=False,
+                              language="en-US", binding_refresh_interval=0.1, reconnect_timeout=3.0,
+                              tailwind=True, prod_js=True, show_welcome_message=False)
+    nicegui.storage.set_storage_secret(settings.secret_key)
+    system_sampler.sample()
+
+    def receiver():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()  # a client that stays connected
+        return receive
+
+    async def run(path: str, target=app):
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+                 "headers": [(b"host", b"probe"), (b"user-agent", b"bench")], "client": ("127.0.0.1", 50000),
+                 "server": ("probe", 80)}
+        size = 0
+
+        async def send(message):
+            nonlocal size
+            if message["type"] == "http.response.start":
+                size = 0
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+
+        await target(dict(scope), receiver(), send)
+        clients_before = len(Client.instances)
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            await target(dict(scope), receiver(), send)
+        elapsed = time.perf_counter() - started
+        return elapsed, len(Client.instances) - clients_before, size
+
+    print(f"{args.requests:,} sequential probes through NiceGUI's app and middleware")
+    for name, path, target in (("NiceGUI page", "/bench/page-probe", app), ("GET /health", "/health", app),
+                               ("GET /health/live", "/health/live", app),
+                               ("StaticProbe alone", "/health/live", StaticProbe())):
+        elapsed, clients, size = asyncio.run(run(path, target))
+        print(f"    {name:<18} {elapsed / args.requests * 1e6:9.1f} us/probe  {size:6,} bytes  "
+              f"{clients:6,} NiceGUI clients created")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""EXPLAIN-based index advisor for the service layer.
+
+Runs every read path of the sync services against a scratch SQLite
+database, captures the SQL they issue and checks ``EXPLAIN QUERY PLAN`` for
+full scans (of a table, or of an index in index order), automatic
+(temporary) indexes and temporary B-tree sorts. The async services share
+their statement builders with the sync ones, so they are covered too.
+
+Usage::
+
+    python -m app.core.index_advisor            # exits 1 if a query scans or sorts a table
+    python -m app.core.index_advisor --verbose  # print every plan
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.order import OrderStatus
+from app.services.cart_service import CartService
+from app.services.category_service import CategoryService
+from app.services.order_service import OrderService
+from app.services.product_service import ProductService
+from app.services.user_service import UserService
+
+# Probes whose full scans or sorts are intentional, with the reason
+ALLOWED_FULL_SCANS: Dict[str, str] = {
+    "CategoryService.get_categories": "categories is a tiny lookup table",
+    "CartService.get_cart_lines": "sorts the few lines of one cart into the order they were added",
+    "OrderService.get_all_orders": "admin listing reads every order",
+    "OrderService.get_all_order_summaries": "admin listing reads every order",
+    "UserService.get_users": "admin listing reads every user",
+}
+
+# Service read paths to check, with representative arguments
+PROBES: List[Tuple[str, Callable[[Session], object]]] = [
+    ("ProductService.get_product", lambda db: ProductService(db).get_product(1)),
+    ("ProductService.get_products", lambda db: ProductService(db).get_products()),
+    ("ProductService.get_products[category]", lambda db: ProductService(db).get_products(category_id=1)),
+    ("ProductService.get_products[search]", lambda db: ProductService(db).get_products(search="eros")),
+    ("ProductService.get_featured_products", lambda db: ProductService(db).get_featured_products()),
+    ("ProductService.get_product_cards", lambda db: ProductService(db).get_product_cards(category_id=1)),
+    ("ProductService.get_featured_product_cards", lambda db: ProductService(db).get_featured_product_cards()),
+    ("ProductService.get_product_reviews", lambda db: ProductService(db).get_product_reviews(1)),
+    ("CategoryService.get_category", lambda db: CategoryService(db).get_category(1)),
+    ("CategoryService.get_categories", lambda db: CategoryService(db).get_categories()),
+    ("CartService.get_cart_items", lambda db: CartService(db).get_cart_items(1)),
+    ("CartService.get_cart_lines", lambda db: CartService(db).get_cart_lines(1)),
+    ("CartService.update_cart_item", lambda db: CartService(db).update_cart_item(1, 1, 2)),
+    ("CartService.clear_cart", lambda db: CartService(db).clear_cart(1)),
+    ("OrderService.get_order", lambda db: OrderService(db).get_order(1)),
+    ("OrderService.get_user_orders", lambda db: OrderService(db).get_user_orders(1)),
+    ("OrderService.get_all_orders", lambda db: OrderService(db).get_all_orders()),
+    ("OrderService.get_order_summary", lambda db: OrderService(db).get_order_summary(1)),
+    ("OrderService.get_user_order_summaries", lambda db: OrderService(db).get_user_order_summaries(1)),
+    ("OrderService.get_all_order_summaries", lambda db: OrderService(db).get_all_order_summaries()),
+    ("OrderService.update_order_status", lambda db: OrderService(db).update_order_status(1, OrderStatus.CONFIRMED)),
+    ("UserService.get_user", lambda db: UserService(db).get_user(1)),
+    ("UserService.get_user_by_email", lambda db: UserService(db).get_user_by_email("admin@versace.com")),
+    ("UserService.get_user_by_username", lambda db: UserService(db).get_user_by_username("admin")),
+    ("UserService.get_users", lambda db: UserService(db).get_users()),
+]
+
+@dataclass
+class QueryPlan:
+    """A captured statement and its EXPLAIN QUERY PLAN details."""
+    probe: str
+    statement: str
+    details: List[str] = field(default_factory=list)
+
+    @property
+    def full_scans(self) -> List[str]:
+        """Plan steps that read a whole table or index, build a temporary index or sort in a temp B-tree.
+
+        ``SCAN t USING INDEX i`` still visits every row, only in index order;
+        a lookup shows up as ``SEARCH``.
+        """
+        return [
+            detail for detail in self.details
+            if (detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW")
+            or "AUTOMATIC" in detail or detail.startswith("USE TEMP B-TREE")
+        ]
+
+def _capture_statements(engine) -> List[Tuple[str, str, object]]:
+    """Run every probe and collect the statements they execute."""
+    captured: List[Tuple[str, str, object]] = []
+    current = {"probe": None}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if current["probe"] and not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((current["probe"], statement, parameters))
+
+    # Probes that write (get_or_create_cart, status updates) are rolled back,
+    # so the advisor is safe to point at a real database
+    with engine.connect() as conn:
+        outer = conn.begin()
+        for name, probe in PROBES:
+            current["probe"] = name
+            with Session(bind=conn, join_transaction_mode="create_savepoint") as db:
+                probe(db)
+        current["probe"] = None
+        outer.rollback()
+    return captured
+
+def explain(engine) -> List[QueryPlan]:
+    """EXPLAIN QUERY PLAN every captured statement (deduplicated per probe)."""
+    plans: List[QueryPlan] = []
+    seen = set()
+    for probe, statement, parameters in _capture_statements(engine):
+        if (probe, statement) in seen:
+            continue
+        seen.add((probe, statement))
+
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            details = [row[-1] for row in cursor.fetchall()]
+        finally:
+            raw.close()
+        plans.append(QueryPlan(probe=probe, statement=statement, details=details))
+    return plans
+
+def check(database_url: str = "sqlite://", verbose: bool = False) -> int:
+    """Print a report and return the number of disallowed full scans."""
+    engine = create_engine(database_url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+
+    failures = 0
+    for plan in explain(engine):
+        scans = plan.full_scans
+        allowed = plan.probe in ALLOWED_FULL_SCANS
+        if scans and not allowed:
+            failures += 1
+            status = "FAIL"
+        elif scans:
+            status = "ALLOW"
+        else:
+            status = "OK"
+
+        if verbose or status != "OK":
+            print(f"[{status}] {plan.probe}")
+            if scans and allowed:
+                print(f"    reason: {ALLOWED_FULL_SCANS[plan.probe]}")
+            for detail in plan.details:
+                print(f"    {detail}")
+            if verbose:
+                print(f"    sql: {' '.join(plan.statement.split())}")
+
+    print(f"{failures} quer{'y' if failures == 1 else 'ies'} fell back to a full scan or a temporary sort")
+    return failures
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check service queries for full scans and temporary sorts")
+    parser.add_argument("--database-url", default="sqlite://",
+                        help="SQLite database to plan against (default: empty in-memory schema)")
+    parser.add_argument("--verbose", action="store_true", help="print every query plan")
+    args = parser.parse_args()
+    sys.exit(1 if check(args.database_url, args.verbose) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Durable SQLite-backed job queue with an in-process worker pool.
+
+Jobs are rows in the ``jobs`` table, so anything enqueued survives a restart.
+Worker threads claim due jobs with a conditional UPDATE, run the registered
+handler and either mark the job done or reschedule it with exponential backoff.
+Jobs left RUNNING for ``JOB_LOCK_TIMEOUT_SECONDS`` (a crashed process or a
+hung worker) are returned to the queue by the workers themselves.
+
+Work that must happen if and only if a write commits adds its rows with
+``new_job`` to the writer's own session (an outbox) and calls ``notify``
+after the commit.
+"""
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.logging import app_logger
+from app.models.job import Job, JobStatus
+
+JobHandler = Callable[[Dict[str, Any]], None]
+
+_handlers: Dict[str, JobHandler] = {}
+
+def job_handler(job_type: str):
+    """Decorator to register a handler for a job type."""
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+@dataclass
+class JobTypeMetrics:
+    """Per-job-type counters kept in memory by the worker pool."""
+    enqueued: int = 0
+    succeeded: int = 0
+    retried: int = 0
+    failed: int = 0
+    total_duration_ms: float = 0.0
+    max_duration_ms: float = 0.0
+
+    @property
+    def avg_duration_ms(self) -> float:
+        runs = self.succeeded + self.retried + self.failed
+        return round(self.total_duration_ms / runs, 2) if runs else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+            "avg_duration_ms": self.avg_duration_ms,
+            "max_duration_ms": round(self.max_duration_ms, 2),
+        }
+
+class JobQueue:
+    """SQLite-backed job queue processed by a pool of worker threads."""
+
+    def __init__(self, workers: int = 2, poll_interval: float = 1.0):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._metrics: Dict[str, JobTypeMetrics] = {}
+        self._metrics_lock = threading.Lock()
+        self._next_release = 0.0
+
+    @staticmethod
+    def new_job(job_type: str, payload: Optional[Dict[str, Any]] = None,
+                delay_seconds: float = 0, max_attempts: Optional[int] = None) -> Job:
+        """An unsaved job row, for adding to the caller's own transaction; call ``notify`` after committing it."""
+        return Job(
+            job_type=job_type,
+            payload=json.dumps(payload or {}),
+            status=JobStatus.PENDING,
+            max_attempts=max_attempts or settings.job_max_attempts,
+            run_at=datetime.utcnow() + timedelta(seconds=delay_seconds),
+        )
+
+    def enqueue(self, job_type: str, payload: Optional[Dict[str, Any]] = None,
+                delay_seconds: float = 0, max_attempts: Optional[int] = None) -> int:
+        """Persist a job and wake a worker. Returns the job ID."""
+        job = self.new_job(job_type, payload, delay_seconds, max_attempts)
+        with Session(engine) as db:
+            db.add(job)
+            db.commit()
+            job_id = job.id
+
+        self.notify([job_type])
+        return job_id
+
+    def notify(self, job_types: Iterable[str]) -> None:
+        """Count jobs committed by the caller and wake a worker for them."""
+        for job_type in job_types:
+            self._record(job_type, enqueued=1)
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        if self._threads:
+            return
+        self._stop.clear()
+        self._next_release = 0.0  # the first worker releases jobs left by a previous process
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        app_logger.info(f"Job queue started with {self.workers} workers")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Signal workers to exit and wait for in-flight jobs to finish."""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        app_logger.info("Job queue stopped")
+
+    def run_pending(self, limit: int = 100) -> int:
+        """Process due jobs on the calling thread. Returns the number run."""
+        processed = 0
+        while processed < limit and self._run_next():
+            processed += 1
+        return processed
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of per-job-type metrics and current queue depth."""
+        with self._metrics_lock:
+            per_type = {name: m.to_dict() for name, m in self._metrics.items()}
+        return {"job_types": per_type, "queue": self.queue_depth()}
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Count jobs in each status."""
+        with Session(engine) as db:
+            rows = db.execute(select(Job.status, func.count(Job.id)).group_by(Job.status)).all()
+        return {status.value: count for status, count in rows}
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= self._next_release:
+                    # Whichever worker gets here first; the UPDATE is harmless if two do
+                    self._next_release = time.monotonic() + settings.job_lock_timeout_seconds / 2
+                    self._release_stale_jobs()
+                if self._run_next():
+                    continue
+            except Exception as e:
+                app_logger.error(f"Job worker error: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim(self, db: Session) -> Optional[Job]:
+        """Atomically move the oldest due job to RUNNING."""
+        now = datetime.utcnow()
+        candidates = db.execute(
+            select(Job.id)
+            .where(Job.status == JobStatus.PENDING, Job.run_at <= now)
+            .order_by(Job.run_at)
+            .limit(5)
+        ).scalars().all()
+
+        for job_id in candidates:
+            # Another worker may have claimed it between the SELECT and here
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.PENDING)
+                .values(status=JobStatus.RUNNING, locked_at=now, attempts=Job.attempts + 1)
+            ).rowcount
+            db.commit()
+            if claimed:
+                return db.get(Job, job_id)
+        return None
+
+    def _run_next(self) -> bool:
+        with Session(engine) as db:
+            job = self._claim(db)
+            if job is None:
+                return False
+
+            handler = _handlers.get(job.job_type)
+            started = time.perf_counter()
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler registered for job type '{job.job_type}'")
+                handler(json.loads(job.payload or "{}"))
+            except Exception as e:
+                duration_ms = (time.perf_counter() - started) * 1000
+                self._handle_failure(db, job, e, duration_ms)
+                return True
+
+            duration_ms = (time.perf_counter() - started) * 1000
+            job.status = JobStatus.SUCCEEDED
+            job.duration_ms = duration_ms
+            job.locked_at = None
+            job.last_error = None
+            db.commit()
+            self._record(job.job_type, succeeded=1, duration_ms=duration_ms)
+            return True
+
+    def _handle_failure(self, db: Session, job: Job, error: Exception, duration_ms: float) -> None:
+        job.duration_ms = duration_ms
+        job.locked_at = None
+        job.last_error = f"{type(error).__name__}: {error}"
+
+        if job.attempts >= job.max_attempts:
+            job.status = JobStatus.FAILED
+            db.commit()
+            self._record(job.job_type, failed=1, duration_ms=duration_ms)
+            app_logger.error(f"Job {job.id} ({job.job_type}) failed permanently after {job.attempts} attempts: {error}")
+            return
+
+        delay = self._backoff(job.attempts)
+        job.status = JobStatus.PENDING
+        job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+        db.commit()
+        self._record(job.job_type, retried=1, duration_ms=duration_ms)
+        app_logger.warning(f"Job {job.id} ({job.job_type}) attempt {job.attempts} failed, retrying in {delay:.1f}s: {error}")
+
+    @staticmethod
+    def _backoff(attempts: int) -> float:
+        """Exponential backoff with full jitter, capped at the configured maximum."""
+        ceiling = min(settings.job_retry_max_seconds, settings.job_retry_base_seconds * (2 ** (attempts - 1)))
+        return random.uniform(0, ceiling)
+
+    def _release_stale_jobs(self) -> None:
+        """Return jobs left RUNNING by a crashed process or a hung worker to the queue.
+
+        They are retried with the usual backoff, unless their attempts are used
+        up: a job that kills or hangs its worker every time ends up FAILED.
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=settings.job_lock_timeout_seconds)
+        error = f"Lock expired after {settings.job_lock_timeout_seconds}s; worker crashed or hung"
+        outcomes = []
+        with Session(engine) as db:
+            stale = db.execute(
+                select(Job.id, Job.job_type, Job.attempts, Job.max_attempts, Job.locked_at)
+                .where(Job.status == JobStatus.RUNNING, Job.locked_at < cutoff)
+            ).all()
+            for job_id, job_type, attempts, max_attempts, locked_at in stale:
+                if attempts >= max_attempts:
+                    values = {"status": JobStatus.FAILED}
+                else:
+                    values = {"status": JobStatus.PENDING,
+                              "run_at": now + timedelta(seconds=self._backoff(attempts))}
+                # A worker that was only slow may have finished it since the SELECT
+                updated = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JobStatus.RUNNING, Job.locked_at == locked_at)
+                    .values(locked_at=None, last_error=error, **values)
+                ).rowcount
+                if updated:
+                    outcomes.append((job_type, values["status"]))
+            db.commit()
+
+        failed = 0
+        for job_type, status in outcomes:
+            if status == JobStatus.FAILED:
+                failed += 1
+                self._record(job_type, failed=1)
+            else:
+                self._record(job_type, retried=1)
+        if failed:
+            app_logger.error(f"Failed {failed} stale jobs that had used up their attempts")
+        if len(outcomes) > failed:
+            app_logger.warning(f"Released {len(outcomes) - failed} stale jobs back to the queue")
+
+    def _record(self, job_type: str, duration_ms: Optional[float] = None, **counts: int) -> None:
+        with self._metrics_lock:
+            metrics = self._metrics.setdefault(job_type, JobTypeMetrics())
+            for name, value in counts.items():
+                setattr(metrics, name, getattr(metrics, name) + value)
+            if duration_ms is not None:
+                metrics.total_duration_ms += duration_ms
+                metrics.max_duration_ms = max(metrics.max_duration_ms, duration_ms)
+
+job_queue = JobQueue(workers=settings.job_workers, poll_interval=settings.job_poll_interval)
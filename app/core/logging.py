@@ -1,21 +1,194 @@
-"""Logging configuration for the application."""
+"""Logging configuration for the application.
 
+Log calls only put the record on a queue; a ``QueueListener`` thread does
+the formatting and the file and console I/O, so logging never blocks the
+event loop on disk writes.
+
+- The file (``logs/app.log`` by default) gets one JSON object per line,
+  rotated when it reaches ``LOG_FILE_MAX_MB`` or is ``LOG_ROTATE_HOURS``
+  old, whichever comes first.
+- Records carry the ID of the request they were logged in (see
+  ``RequestIdMiddleware``), captured on the calling thread.
+- ``LOG_SAMPLE_RATES`` keeps only a share of the INFO and DEBUG records of
+  noisy loggers, e.g. ``versace_store.health=0.01``; warnings and errors
+  are always kept.
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+ROOT_LOGGER_NAME = "versace_store"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+def set_request_id(request_id: Optional[str]):
+    """Bind a request ID to the current context; returns a token for ``reset_request_id``."""
+    return _request_id.set(request_id)
+
+def reset_request_id(token) -> None:
+    _request_id.reset(token)
+
+_RESERVED_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; ``extra={...}`` fields are included as they are."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class SamplingFilter(logging.Filter):
+    """Keeps a share of the INFO-and-below records of the configured loggers and their children."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest names first so the most specific logger's rate applies
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        for name, rate in self.rates:
+            if record.name == name or record.name.startswith(name + "."):
+                return random.random() < rate
+        return True
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse ``"logger=rate,..."`` into a mapping."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with their message, traceback and request ID resolved on the calling thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            # Formatted now, while the frames' locals still hold the values of the failure
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.request_id = _request_id.get()
+        return record
+
+class SizedTimedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates when the file reaches ``maxBytes`` or has been written for ``interval`` seconds.
+
+    Both triggers share the numbered backups (``app.log.1`` is the newest).
+    """
+
+    def __init__(self, filename, maxBytes: int, backupCount: int, interval: float, encoding: str = "utf-8"):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding)
+        self.interval = interval
+        started = os.stat(filename).st_mtime if os.path.exists(filename) and os.path.getsize(filename) else time.time()
+        self.rollover_at = started + interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval and time.time() >= self.rollover_at and os.path.getsize(self.baseFilename):
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+def _log_file_path() -> Path:
+    path = Path(settings.log_file)
+    if settings.worker_id is not None:
+        # Worker processes rotating one shared file would rename it under each other
+        path = path.with_name(f"{path.stem}.worker{settings.worker_id}{path.suffix}")
+    return path
+
+def _formatter(log_format: str) -> logging.Formatter:
+    return JsonFormatter() if log_format == "json" else logging.Formatter(log_format)
+
+def _build_handlers() -> List[logging.Handler]:
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(_formatter(settings.log_console_format))
+    if not settings.log_to_file:
+        return [console_handler]
+    path = _log_file_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = SizedTimedRotatingFileHandler(
+        path,
+        maxBytes=int(settings.log_file_max_mb * 1024 * 1024),
+        backupCount=settings.log_file_backups,
+        interval=settings.log_rotate_hours * 3600,
+    )
+    file_handler.setFormatter(_formatter(settings.log_format))
+    return [file_handler, console_handler]
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging() -> None:
+    """Route the root logger through a queue to the file and console handlers. Idempotent."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    rates = parse_sample_rates(settings.log_sample_rates)
+    if rates:
+        # Dropped before they are queued, so sampled-out records cost almost nothing
+        queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.log_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    """The application logger, or a child of it such as ``versace_store.health``."""
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}" if name else ROOT_LOGGER_NAME)
+
+configure_logging()
 
-# Create logs directory
-logs_dir = Path("logs")
-logs_dir.mkdir(exist_ok=True)
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(logs_dir / "app.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-
-app_logger = logging.getLogger("versace_store")
\ No newline at end of file
+app_logger = get_logger()
@@ -0,0 +1,339 @@
+"""Exponential login throttling per account and per client IP.
+
+Checked before the user lookup and before any bcrypt work, so repeated
+failed logins cost a dictionary lookup instead of a hash. Each key gets a
+few free attempts; after that every failure doubles its lockout up to a
+maximum. Entries idle for longer than the idle timeout are reset.
+
+An attempt is counted as a failure when it is let through, and taken back
+once the password turns out right or was never checked. Counting only after
+bcrypt would let a burst of concurrent attempts all pass inside the free
+window.
+
+With the ``memory`` backend state lives in two bounded LRU maps, and the
+least recently seen entries are evicted once a map is full. With
+``LOGIN_THROTTLE_BACKEND=sqlite`` (the default when ``WORKERS`` > 1) it is
+kept in the rate limiter's SQLite file, so an attacker spread over several
+worker processes still gets one budget per account and IP. Backend errors
+let the attempt through, as they do for rate limiting.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.core.proxies import forwarded_client
+
+@dataclass
+class ThrottlePolicy:
+    """How many failures are free and how fast the lockout grows afterwards."""
+    free_attempts: int
+    base_delay: float
+    max_delay: float
+    idle_timeout: float
+
+    def delay(self, failures: int) -> float:
+        if failures <= self.free_attempts:
+            return 0.0
+        return min(self.base_delay * 2 ** (failures - self.free_attempts - 1), self.max_delay)
+
+class _Entry:
+    __slots__ = ("failures", "blocked_until", "last_seen")
+
+    def __init__(self, now: float):
+        self.failures = 0
+        self.blocked_until = 0.0
+        self.last_seen = now
+
+class _ThrottleTable:
+    """Failure counters for one kind of key, bounded in size."""
+
+    def __init__(self, policy: ThrottlePolicy, max_entries: int):
+        self.policy = policy
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def retry_after(self, key: str, now: float) -> float:
+        entry = self.entries.get(key)
+        return max(entry.blocked_until - now, 0.0) if entry else 0.0
+
+    def record_failure(self, key: str, now: float) -> None:
+        entry = self.entries.get(key)
+        if entry is None or now - entry.last_seen > self.policy.idle_timeout:
+            entry = self.entries[key] = _Entry(now)
+        self.entries.move_to_end(key)
+        entry.failures += 1
+        entry.last_seen = now
+        entry.blocked_until = now + self.policy.delay(entry.failures)
+        self._evict(now)
+
+    def reserve(self, key: str, now: float) -> float:
+        """Count a failure unless the key is locked out; returns the wait, 0 if counted."""
+        wait = self.retry_after(key, now)
+        if not wait:
+            self.record_failure(key, now)
+        return wait
+
+    def release(self, key: str, now: float) -> None:
+        """Take back a failure counted by ``reserve``."""
+        entry = self.entries.get(key)
+        if entry is not None and entry.failures:
+            entry.failures -= 1
+            entry.blocked_until = min(entry.blocked_until, entry.last_seen + self.policy.delay(entry.failures))
+
+    def _evict(self, now: float) -> None:
+        # Entries are ordered by last failure, so idle ones collect at the front
+        while self.entries:
+            oldest = next(iter(self.entries.values()))
+            idle = now - oldest.last_seen > self.policy.idle_timeout and oldest.blocked_until <= now
+            if not idle and len(self.entries) <= self.max_entries:
+                break
+            self.entries.popitem(last=False)
+
+    def reset(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+    def blocked(self, now: float) -> int:
+        return sum(1 for entry in self.entries.values() if entry.blocked_until > now)
+
+    def tracked(self) -> int:
+        return len(self.entries)
+
+class SQLiteThrottleStore:
+    """Failure counters in a WAL-mode SQLite file shared by all worker processes."""
+
+    PURGE_EVERY = 1000  # failures between deletes of idle entries
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._failures = 0
+        db = self.connection()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS login_throttle ("
+            "kind TEXT NOT NULL, key TEXT NOT NULL, failures INTEGER NOT NULL, blocked_until REAL NOT NULL, "
+            "last_seen REAL NOT NULL, PRIMARY KEY (kind, key))"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS ix_login_throttle_last_seen ON login_throttle (last_seen)")
+
+    def connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA synchronous=NORMAL")
+            # Logins wait on this on the event loop; give up quickly and let them through
+            db.execute("PRAGMA busy_timeout=200")
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """A write transaction taken up front, so a check and the update after it are atomic."""
+        db = self.connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def counted_failure(self) -> bool:
+        """Count a failure; True when it is time to purge idle entries."""
+        self._failures += 1
+        return self._failures % self.PURGE_EVERY == 0
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+class _SQLiteThrottleTable:
+    """``_ThrottleTable`` for one kind of key, kept in a ``SQLiteThrottleStore``."""
+
+    def __init__(self, store: SQLiteThrottleStore, kind: str, policy: ThrottlePolicy):
+        self.store = store
+        self.kind = kind
+        self.policy = policy
+
+    def retry_after(self, key: str, now: float) -> float:
+        row = self.store.connection().execute(
+            "SELECT blocked_until FROM login_throttle WHERE kind = ? AND key = ?", (self.kind, key)).fetchone()
+        return max(row[0] - now, 0.0) if row else 0.0
+
+    def record_failure(self, key: str, now: float) -> None:
+        db = self.store.connection()
+        # One statement, so concurrent failures from several workers are all counted
+        failures = db.execute(
+            "INSERT INTO login_throttle (kind, key, failures, blocked_until, last_seen) VALUES (?, ?, 1, 0, ?) "
+            "ON CONFLICT (kind, key) DO UPDATE SET "
+            "failures = CASE WHEN excluded.last_seen - last_seen > ? THEN 1 ELSE failures + 1 END, "
+            "last_seen = excluded.last_seen "
+            "RETURNING failures",
+            (self.kind, key, now, self.policy.idle_timeout),
+        ).fetchall()[0][0]
+        db.execute("UPDATE login_throttle SET blocked_until = MAX(blocked_until, ?) WHERE kind = ? AND key = ?",
+                   (now + self.policy.delay(failures), self.kind, key))
+        if self.store.counted_failure():
+            db.execute("DELETE FROM login_throttle WHERE kind = ? AND last_seen < ? AND blocked_until <= ?",
+                       (self.kind, now - self.policy.idle_timeout, now))
+
+    def reserve(self, key: str, now: float) -> float:
+        with self.store.transaction():
+            wait = self.retry_after(key, now)
+            if not wait:
+                self.record_failure(key, now)
+        return wait
+
+    def release(self, key: str, now: float) -> None:
+        with self.store.transaction() as db:
+            row = db.execute("SELECT failures, last_seen FROM login_throttle WHERE kind = ? AND key = ?",
+                             (self.kind, key)).fetchone()
+            if row and row[0]:
+                failures = row[0] - 1
+                db.execute("UPDATE login_throttle SET failures = ?, blocked_until = MIN(blocked_until, ?) "
+                           "WHERE kind = ? AND key = ?",
+                           (failures, row[1] + self.policy.delay(failures), self.kind, key))
+
+    def reset(self, key: str) -> None:
+        self.store.connection().execute("DELETE FROM login_throttle WHERE kind = ? AND key = ?", (self.kind, key))
+
+    def blocked(self, now: float) -> int:
+        return self.store.connection().execute(
+            "SELECT COUNT(*) FROM login_throttle WHERE kind = ? AND blocked_until > ?", (self.kind, now)).fetchone()[0]
+
+    def tracked(self) -> int:
+        return self.store.connection().execute(
+            "SELECT COUNT(*) FROM login_throttle WHERE kind = ?", (self.kind,)).fetchone()[0]
+
+class LoginThrottle:
+    """Tracks failed logins per account and per IP and decides when to refuse."""
+
+    def __init__(self, account_policy: ThrottlePolicy, ip_policy: ThrottlePolicy, max_entries: int = 100_000,
+                 store: Optional[SQLiteThrottleStore] = None):
+        if store is None:
+            self._accounts = _ThrottleTable(account_policy, max_entries)
+            self._ips = _ThrottleTable(ip_policy, max_entries)
+        else:
+            self._accounts = _SQLiteThrottleTable(store, "account", account_policy)
+            self._ips = _SQLiteThrottleTable(store, "ip", ip_policy)
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.errors = 0
+
+    @staticmethod
+    def _account_key(email: str) -> str:
+        return email.strip().lower()
+
+    def _backend_failed(self, error: sqlite3.Error) -> None:
+        self.errors += 1
+        if self.errors == 1 or self.errors % 100 == 0:
+            app_logger.warning(f"Login throttle backend failed ({self.errors} times), allowing attempt: {error}")
+
+    def reserve_attempt(self, email: str, ip: Optional[str]) -> float:
+        """Let a login attempt through, counted as a failure already; returns 0.
+
+        While the account or IP is locked out nothing is counted and the
+        seconds to wait are returned instead. Call ``record_success`` or
+        ``cancel_attempt`` afterwards if the password was right or never
+        checked.
+        """
+        # Wall clock rather than monotonic: the SQLite backend compares times across processes
+        now = time.time()
+        account = self._account_key(email)
+        try:
+            with self._lock:
+                wait = self._accounts.reserve(account, now)
+                if not wait and ip:
+                    wait = self._ips.reserve(ip, now)
+                    if wait:
+                        self._accounts.release(account, now)
+                if wait:
+                    self.rejected += 1
+                return wait
+        except sqlite3.Error as e:
+            self._backend_failed(e)
+            return 0.0
+
+    def record_success(self, email: str, ip: Optional[str]) -> None:
+        """Clear the account's failures and take back the IP's reserved one; the
+        rest of the IP's count is left to expire, as one valid account must not
+        unlock guessing against others from the same address."""
+        now = time.time()
+        try:
+            with self._lock:
+                self._accounts.reset(self._account_key(email))
+                if ip:
+                    self._ips.release(ip, now)
+        except sqlite3.Error as e:
+            self._backend_failed(e)
+
+    def cancel_attempt(self, email: str, ip: Optional[str]) -> None:
+        """Take back a reserved attempt whose password was never checked."""
+        now = time.time()
+        try:
+            with self._lock:
+                self._accounts.release(self._account_key(email), now)
+                if ip:
+                    self._ips.release(ip, now)
+        except sqlite3.Error as e:
+            self._backend_failed(e)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            return {
+                "tracked_accounts": self._accounts.tracked(),
+                "tracked_ips": self._ips.tracked(),
+                "blocked_accounts": self._accounts.blocked(now),
+                "blocked_ips": self._ips.blocked(now),
+                "rejected": self.rejected,
+                "errors": self.errors,
+            }
+
+def client_ip(request) -> Optional[str]:
+    """Client address of a Starlette request; proxy headers count only from ``TRUSTED_PROXIES``."""
+    if request is None:
+        return None
+    return forwarded_client(request.client.host if request.client else None,
+                            request.headers.get("fly-client-ip"), request.headers.get("x-forwarded-for"))
+
+def _throttle_store() -> Optional[SQLiteThrottleStore]:
+    backend = settings.login_throttle_backend or ("sqlite" if settings.workers > 1 else "memory")
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        return SQLiteThrottleStore(settings.rate_limit_database_path)
+    raise ValueError(f"Unknown login throttle backend: {backend!r}")
+
+login_throttle = LoginThrottle(
+    account_policy=ThrottlePolicy(
+        free_attempts=settings.login_account_free_attempts,
+        base_delay=settings.login_throttle_base_seconds,
+        max_delay=settings.login_throttle_max_seconds,
+        idle_timeout=settings.login_throttle_idle_seconds,
+    ),
+    ip_policy=ThrottlePolicy(
+        free_attempts=settings.login_ip_free_attempts,
+        base_delay=settings.login_throttle_base_seconds,
+        max_delay=settings.login_throttle_max_seconds,
+        idle_timeout=settings.login_throttle_idle_seconds,
+    ),
+    max_entries=settings.login_throttle_max_entries,
+    store=_throttle_store(),
+)
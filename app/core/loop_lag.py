@@ -0,0 +1,50 @@
+"""Event loop lag sampling.
+
+A task sleeps for ``interval`` seconds over and over and measures how much
+later than requested it wakes up. Anything that blocks the loop (a slow
+synchronous call, a burst of CPU work) shows up as lag, which is how long
+every other coroutine waited too.
+
+``smoothed`` is an exponentially weighted average of the samples, so one
+slow tick doesn't flip admission control (``app.core.admission``) on and off.
+"""
+
+import asyncio
+from typing import Optional
+
+from app.core.logging import app_logger
+from app.core.metrics import event_loop_lag_seconds
+
+class LoopLagMonitor:
+    """Samples the lag of the running event loop in a background task."""
+
+    def __init__(self, interval: float = 0.5, smoothing: float = 0.3):
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lag = 0.0
+        self.smoothed = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(loop.time() - expected, 0.0)
+            self.smoothed += self.smoothing * (self.lag - self.smoothed)
+            self.max_lag = max(self.max_lag, self.lag)
+            event_loop_lag_seconds.observe(self.lag)
+
+    def start(self) -> None:
+        """Start sampling on the running loop. Call from the server's startup hook."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            app_logger.info(f"Event loop lag sampled every {self.interval * 1000:.0f} ms")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,342 @@
+"""Metrics registry exposed in Prometheus text format at ``/metrics``.
+
+Two kinds of metrics are exported:
+
+- Counters, gauges and histograms updated where things happen: SQL
+  statement time, checkout latency, orders placed, event-loop lag. Each
+  thread writes only its own cell of a metric, so an update is a couple
+  of list operations with no lock; the cells are summed on scrape.
+- Collectors that read numbers other subsystems already keep (request
+  latency histograms, cache counters, NiceGUI clients, the password
+  hashing queue) at scrape time and cost nothing in between.
+
+Every worker process has its own registry; in multi-worker mode scrape
+the workers' ports directly rather than through the dispatcher.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+Sample = Tuple[str, Dict[str, str], float]  # (name suffix, labels, value)
+MetricFamily = Tuple[str, str, str, List[Sample]]  # (name, type, help, samples)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _ThreadCells:
+    """Per-thread value cells. Each thread only writes its own, so updates need no lock."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._cells: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0] * self.size
+            with self._lock:
+                self._cells.append(cell)
+            return cell
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            cells = list(self._cells)
+        return [sum(column) for column in zip(*cells)] if cells else [0] * self.size
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str):
+        """The child for one combination of label values, created on first use."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_dict(self, values: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def collect(self) -> MetricFamily:
+        samples: List[Sample] = []
+        for values, child in list(self._children.items()):
+            samples.extend(self._samples(self._label_dict(values), child))
+        return self.name, self.type, self.help, samples
+
+    def _samples(self, labels: Dict[str, str], child) -> Iterable[Sample]:
+        raise NotImplementedError
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self):
+        self._cells = _ThreadCells(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._cells.cell()[0] += amount
+
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+class Counter(_Metric):
+    """Monotonically increasing count; ``_total`` is appended to the name."""
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name if name.endswith("_total") else name + "_total", help, labelnames)
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+    def _samples(self, labels, child):
+        yield "", labels, child.value()
+
+class _GaugeChild:
+    __slots__ = ("_value",)
+
+    def __init__(self):
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        self._value = value  # a single store, atomic under the GIL
+
+    def value(self) -> float:
+        return self._value
+
+class Gauge(_Metric):
+    """A value that goes up and down, set by whoever owns it."""
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def _samples(self, labels, child):
+        yield "", labels, child.value()
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_cells")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # One count per bucket, one for +Inf, then the sum
+        self._cells = _ThreadCells(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        totals = self._cells.totals()
+        return totals[:-1], totals[-1]
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets (seconds, by default latency buckets)."""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _samples(self, labels, child):
+        counts, total = child.snapshot()
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield "_sum", labels, total
+        yield "_count", labels, cumulative
+
+class EventRate:
+    """Events in the last ``window`` seconds, scaled to a per-minute rate."""
+
+    def __init__(self, window: float = 60.0, max_events: int = 100_000):
+        self.window = window
+        self._events: deque = deque(maxlen=max_events)  # append is thread-safe
+
+    def mark(self) -> None:
+        self._events.append(time.monotonic())
+
+    def per_minute(self) -> float:
+        cutoff = time.monotonic() - self.window
+        recent = sum(1 for stamp in list(self._events) if stamp >= cutoff)
+        return recent * 60.0 / self.window
+
+class MetricsRegistry:
+    """Metrics and scrape-time collectors of one process."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """Register a function returning metric families read at scrape time."""
+        self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        families = [metric.collect() for metric in self._metrics.values()]
+        for collector in self._collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, kind, help, samples in self.collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+registry = MetricsRegistry()
+
+# Updated where the work happens
+db_statement_seconds = registry.histogram("db_statement_duration_seconds", "SQL statement execution time")
+checkout_seconds = registry.histogram("checkout_duration_seconds", "Time to place an order from the checkout page",
+                                      ["outcome"])
+orders_created = registry.counter("orders_created", "Orders placed")
+orders_rate = EventRate()
+event_loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a periodic timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+requests_shed = registry.counter("requests_shed", "Requests refused with 503 by admission control", ["priority"])
+
+def record_order() -> None:
+    """Count an order for ``orders_created_total`` and ``orders_per_minute``."""
+    orders_created.inc()
+    orders_rate.mark()
+
+# Read at scrape time
+
+def _request_latency() -> Iterable[MetricFamily]:
+    from app.core.timing import timing_monitor
+
+    samples: List[Sample] = []
+    for route, histogram in timing_monitor.histograms().items():
+        method, _, path = route.partition(" ")
+        labels = {"method": method, "route": path} if path else {"route": route}
+        for quantile in (50, 95, 99):
+            samples.append(("", {**labels, "quantile": str(quantile / 100)}, histogram.percentile(quantile) / 1000))
+        samples.append(("_sum", labels, histogram.total_ns / 1e9))
+        samples.append(("_count", labels, histogram.count))
+    yield "http_request_duration_seconds", "summary", "HTTP request latency per route", samples
+
+def _caches() -> Iterable[MetricFamily]:
+    from app.core.compression import compressed_cache
+    from app.core.response_cache import response_cache
+    from app.core.sessions import session_store
+
+    response, compressed, sessions = response_cache.stats(), compressed_cache.stats(), session_store.stats()
+    caches = {
+        "response": (response["hits"], response["misses"], response["entries"], response["bytes"]),
+        "compression": (compressed["hits"], compressed["misses"], compressed["entries"], compressed["bytes"]),
+        "session": (sessions["hits"], sessions["loads"], sessions["cached"], None),
+    }
+    for index, (name, kind, help) in enumerate((
+        ("cache_hits_total", "counter", "Cache lookups answered from memory"),
+        ("cache_misses_total", "counter", "Cache lookups that had to do the work"),
+        ("cache_entries", "gauge", "Entries held in memory"),
+        ("cache_bytes", "gauge", "Bytes held in memory"),
+    )):
+        yield name, kind, help, [("", {"cache": cache}, values[index])
+                                 for cache, values in caches.items() if values[index] is not None]
+
+def _runtime() -> Iterable[MetricFamily]:
+    from nicegui import Client
+
+    from app.core.admission import admission_controller
+    from app.core.hashing import password_hasher
+    from app.core.loop_lag import loop_lag_monitor
+    from app.core.rate_limit import rate_limiter
+
+    clients = list(Client.instances.values())
+    yield "nicegui_clients", "gauge", "NiceGUI clients in memory and with an open websocket", [
+        ("", {"state": "total"}, len(clients)),
+        ("", {"state": "connected"}, sum(1 for client in clients if client.has_socket_connection)),
+    ]
+    yield "event_loop_lag_current_seconds", "gauge", "Event loop lag at the last sample", [
+        ("", {}, loop_lag_monitor.lag),
+    ]
+    hashing = password_hasher.metrics()
+    yield "password_hash_queue_depth", "gauge", "bcrypt calls running or waiting in the hashing pool", [
+        ("", {}, hashing["queue_depth"]),
+    ]
+    yield "password_hash_rejected_total", "counter", "bcrypt calls refused because the queue was full", [
+        ("", {"operation": operation}, hashing[operation]["rejected"]) for operation in ("hash", "verify")
+    ]
+    yield "orders_per_minute", "gauge", "Orders placed in the last minute", [("", {}, orders_rate.per_minute())]
+    yield "http_requests_in_flight", "gauge", "HTTP requests being handled, as counted by admission control", [
+        ("", {}, admission_controller.in_flight),
+    ]
+    limits = rate_limiter.stats()
+    yield "rate_limit_requests_total", "counter", "Requests checked by the rate limiter", [
+        ("", {"outcome": "allowed"}, limits["allowed"]),
+        ("", {"outcome": "rejected"}, limits["rejected"]),
+    ]
+
+registry.add_collector(_request_latency)
+registry.add_collector(_caches)
+registry.add_collector(_runtime)
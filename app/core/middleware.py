@@ -1,4 +1,7 @@
+import math
+import re
 import time
+import uuid
 from typing import Dict, List, Optional, Set
 
 from fastapi import FastAPI, Request, Response
@@ -7,7 +10,8 @@ from fastapi.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.core.config import settings
-from app.core.logging import app_logger
+from app.core.logging import app_logger, reset_request_id, set_request_id
+from app.core.rate_limit import RateLimiter, client_address, rate_limiter
 
 def setup_middleware(app: FastAPI) -> None:
     """Set up global middleware for the FastAPI application."""
@@ -52,71 +56,42 @@ def setup_middleware(app: FastAPI) -> None:
 
 # Custom middleware classes
 
+DEFAULT_EXEMPT_PATHS = ("/static", "/_nicegui", "/docs", "/redoc", "/openapi.json")
+
 class RateLimitMiddleware:
-    """Simple rate limiting middleware.
-    
-    This is a basic implementation. For production, consider using a more
-    robust solution with Redis or another distributed cache.
+    """Rejects clients that exceed their route's request rate with 429.
+
+    Counting is done by a ``RateLimiter`` (see ``app.core.rate_limit``),
+    which keeps constant-size state per client and forgets idle clients.
     """
     def __init__(
         self,
         app,
-        limit: int = 100,
-        window: int = 60,
-        exempt_paths: List[str] = None,
+        limiter: Optional[RateLimiter] = None,
+        exempt_paths: Optional[List[str]] = None,
     ):
         self.app = app
-        self.limit = limit  # requests per window
-        self.window = window  # window in seconds
-        self.exempt_paths = exempt_paths or []
-        self.requests = {}
-    
+        self.limiter = limiter or rate_limiter
+        self.exempt_paths = tuple(exempt_paths or DEFAULT_EXEMPT_PATHS)
+
     async def __call__(self, scope, receive, send):
-        if scope["type"] != "http":
-            return await self.app(scope, receive, send)
-        
-        # Get client IP
-        client_ip = self._get_client_ip(scope)
-        path = scope["path"]
-        
-        # Skip rate limiting for exempt paths
-        if any(path.startswith(exempt) for exempt in self.exempt_paths):
+        # Websockets and exempt paths (static assets, NiceGUI internals) are not counted
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
             return await self.app(scope, receive, send)
-        
-        # Check rate limit
-        current_time = time.time()
-        if client_ip in self.requests:
-            requests_info = self.requests[client_ip]
-            # Clean up old requests
-            requests_info = [r for r in requests_info if current_time - r < self.window]
-            
-            if len(requests_info) >= self.limit:
-                # Rate limit exceeded
-                return await self._rate_limit_response(scope, receive, send)
-            
-            requests_info.append(current_time)
-            self.requests[client_ip] = requests_info
-        else:
-            self.requests[client_ip] = [current_time]
-        
+
+        retry_after = self.limiter.check(client_address(scope), scope["path"])
+        if retry_after:
+            return await self._rate_limit_response(send, retry_after)
         return await self.app(scope, receive, send)
-    
-    def _get_client_ip(self, scope):
-        """Extract client IP from scope."""
-        headers = dict(scope.get("headers", []))
-        forwarded = headers.get(b"x-forwarded-for", b"").decode("utf8").split(",")[0].strip()
-        if forwarded:
-            return forwarded
-        return scope.get("client", ("", 0))[0] or "unknown"
-    
-    async def _rate_limit_response(self, scope, receive, send):
+
+    async def _rate_limit_response(self, send, retry_after: float):
         """Send rate limit exceeded response."""
         await send({
             "type": "http.response.start",
             "status": 429,
             "headers": [
                 [b"content-type", b"application/json"],
-                [b"retry-after", str(self.window).encode()],
+                [b"retry-after", str(math.ceil(retry_after)).encode()],
             ],
         })
         await send({
@@ -124,20 +99,90 @@ class RateLimitMiddleware:
             "body": b'{"detail":"Rate limit exceeded. Please try again later."}',
         })
 
+_VALID_REQUEST_ID = re.compile(rb"^[A-Za-z0-9._:-]{1,128}$")
+
+class RequestIdMiddleware:
+    """Binds a request ID to every HTTP request for the log records it produces.
+
+    An ``X-Request-ID`` from the client or proxy (or Fly's ``Fly-Request-Id``)
+    is reused when it looks sane; otherwise one is generated. The ID is
+    returned in the ``X-Request-ID`` response header.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name in (b"x-request-id", b"fly-request-id") and _VALID_REQUEST_ID.match(value):
+                request_id = value.decode("ascii")
+                if name == b"x-request-id":
+                    break
+        request_id = request_id or uuid.uuid4().hex
+        header = (b"x-request-id", request_id.encode("ascii"))
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        token = set_request_id(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            reset_request_id(token)
+
+class PublicResponseMiddleware:
+    """Keeps cookies off responses marked ``Cache-Control: public``.
+
+    NiceGUI's session middleware sets the session cookie on every response.
+    A shared cache won't store a response that sets a cookie, and one told to
+    ignore it would hand the same session ID to every visitor.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_without_cookies(message):
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                if any(name == b"cache-control" and b"public" in value.lower() for name, value in headers):
+                    message = {**message, "headers": [(name, value) for name, value in headers if name != b"set-cookie"]}
+            await send(message)
+
+        await self.app(scope, receive, send_without_cookies)
+
+def add_session_middleware(app: FastAPI, secret_key: str) -> None:
+    """Add the session middleware ``ui.run`` would add, with ``PublicResponseMiddleware`` outside it.
+
+    Seeing it installed, NiceGUI only appends its request tracking middleware
+    (``nicegui.storage.set_storage_secret``), so the session ID cookie is
+    still signed with ``secret_key``.
+    """
+    app.add_middleware(SessionMiddleware, secret_key=secret_key)
+    app.add_middleware(PublicResponseMiddleware)
+
+def add_request_id(app: FastAPI) -> None:
+    """Add ``RequestIdMiddleware`` outside every middleware added so far."""
+    app.add_middleware(RequestIdMiddleware)
+
 # Helper function to add rate limiting
-def add_rate_limiting(app: FastAPI, limit: int = 100, window: int = 60, exempt_paths: List[str] = None) -> None:
+def add_rate_limiting(app: FastAPI, limiter: Optional[RateLimiter] = None, exempt_paths: List[str] = None) -> None:
     """Add rate limiting middleware to the application.
     
     Args:
         app: The FastAPI application
-        limit: Maximum number of requests per window
-        window: Time window in seconds
+        limiter: Limiter to apply; defaults to the one configured by the ``rate_limit_*`` settings
         exempt_paths: List of path prefixes to exempt from rate limiting
     """
-    app.add_middleware(
-        RateLimitMiddleware,
-        limit=limit,
-        window=window,
-        exempt_paths=exempt_paths or ["/static", "/docs", "/redoc", "/openapi.json"],
-    )
-    app_logger.info(f"Rate limiting configured: {limit} requests per {window} seconds")
\ No newline at end of file
+    limiter = limiter or rate_limiter
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, exempt_paths=exempt_paths)
+    policy = limiter.default_policy
+    app_logger.info(f"Rate limiting configured: {policy.limit} requests per {policy.window:g} seconds, "
+                    f"{len(limiter.route_policies)} route policies")
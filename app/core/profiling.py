@@ -0,0 +1,282 @@
+"""On-demand profiling, driven from the admin Profiling tab.
+
+Two tools, both off until an admin starts them:
+
+- ``StackSampler``: a thread that snapshots every thread's Python stack
+  (``sys._current_frames``) every few milliseconds for N seconds and counts
+  identical stacks, skipping threads that used no CPU since the previous
+  tick or are parked in a wait. The result is in the collapsed format read by flamegraph.pl,
+  speedscope and inferno (``frame;frame;frame count``). It costs one stack
+  walk per thread per tick and nothing for the code being observed.
+- ``RouteProfiler``: runs the next requests to one route under
+  ``cProfile`` and produces a ``.prof`` file (``pstats``, snakeviz) plus a
+  text report. The profiler sees everything on the event loop thread while
+  a request is in flight, so coroutines of concurrent requests show up in
+  it too; one request is profiled at a time.
+
+Each worker process profiles only itself.
+"""
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import app_logger
+
+def _thread_cpu_time(ident: int) -> Optional[float]:
+    """CPU seconds used by a thread so far, or None where per-thread clocks aren't available."""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None
+
+# Leaf frames of threads that are waiting rather than working
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("selectors.py", "select"),
+    ("queue.py", "get"), ("thread.py", "_worker"), ("connection.py", "poll"), ("connection.py", "_poll"),
+}
+
+_PATH_PREFIXES = sorted({os.getcwd() + os.sep, *(path + os.sep for path in sys.path if path)}, key=len, reverse=True)
+
+@dataclass
+class Profile:
+    """A finished profile, ready to download."""
+    kind: str  # "stacks" or "cprofile"
+    title: str
+    filename: str
+    data: bytes
+    media_type: str
+    created_at: float = field(default_factory=time.time)
+    summary: List[str] = field(default_factory=list)
+    report: Optional[str] = None  # cProfile text report
+
+class StackSampler:
+    """Samples the stacks of all threads from a background thread."""
+
+    def __init__(self):
+        self._labels: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            for prefix in _PATH_PREFIXES:
+                if filename.startswith(prefix):
+                    filename = filename[len(prefix):]
+                    break
+            label = self._labels[code] = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+        return label
+
+    def collect(self, seconds: float, interval: float, include_idle: bool = False) -> Counter:
+        """Sample for ``seconds``, every ``interval`` seconds, on the calling thread."""
+        stacks: Counter = Counter()
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        cpu_times: Dict[int, Optional[float]] = {}
+        deadline = time.monotonic() + seconds
+        next_names = 0.0
+        while time.monotonic() < deadline:
+            now = time.monotonic()
+            if now >= next_names:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                next_names = now + 1.0
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if not include_idle:
+                    # A thread that used no CPU since the last tick is blocked, even inside C code
+                    cpu_time = _thread_cpu_time(ident)
+                    previous = cpu_times.get(ident)
+                    cpu_times[ident] = cpu_time
+                    if cpu_time is not None and (previous is None or cpu_time - previous < interval * 0.05):
+                        continue
+                    if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_LEAVES:
+                        continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(interval)
+        return stacks
+
+    def start(self, seconds: float, interval: float, on_done, include_idle: bool = False) -> None:
+        """Sample in a new thread and call ``on_done(profile)`` from it when finished."""
+        seconds = min(seconds, settings.profiling_max_seconds)
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A stack sampling run is already in progress")
+            self._thread = threading.Thread(target=self._run, args=(seconds, interval, include_idle, on_done),
+                                            name="stack-sampler", daemon=True)
+            self._thread.start()
+        app_logger.info(f"Stack sampling started for {seconds:g} s every {interval * 1000:g} ms")
+
+    def _run(self, seconds: float, interval: float, include_idle: bool, on_done) -> None:
+        started = time.time()
+        stacks = self.collect(seconds, interval, include_idle)
+        collapsed = "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+        total = sum(stacks.values())
+        # Self time per leaf frame, for a quick look without a flamegraph viewer
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        summary = [f"{count / total:6.1%}  {leaf}" for leaf, count in leaves.most_common(15)] if total else []
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started))
+        on_done(Profile(
+            kind="stacks",
+            title=f"Stacks, {seconds:g} s at {interval * 1000:g} ms: {total:,} samples",
+            filename=f"stacks-{stamp}.collapsed.txt",
+            data=collapsed.encode(),
+            media_type="text/plain",
+            created_at=started,
+            summary=summary,
+        ))
+        app_logger.info(f"Stack sampling finished: {total:,} samples, {len(stacks):,} distinct stacks")
+
+class RouteProfiler:
+    """Profiles the next requests to one route with cProfile."""
+
+    def __init__(self):
+        self.route: Optional[str] = None
+        self.remaining = 0
+        self.captured = 0
+        self.deadline = 0.0
+        self._profile: Optional[cProfile.Profile] = None
+        self._busy = False
+        self._on_done = None
+
+    @property
+    def armed(self) -> bool:
+        return self.route is not None
+
+    def arm(self, route: str, requests: int, seconds: float, on_done) -> None:
+        """Profile up to ``requests`` requests to ``route`` (e.g. ``/products`` or ``GET /product/{id}``)."""
+        if self.armed:
+            raise RuntimeError(f"Already profiling {self.route}")
+        self._profile = cProfile.Profile()
+        self.remaining = requests
+        self.captured = 0
+        self.deadline = time.monotonic() + min(seconds, settings.profiling_max_seconds)
+        self._on_done = on_done
+        self.route = route.strip()
+        app_logger.info(f"cProfile armed for {requests} requests to {self.route}")
+
+    def matches(self, method: str, route: str) -> bool:
+        return self.route in (route, f"{method} {route}")
+
+    def should_profile(self, method: str, route: str) -> bool:
+        """Whether this request should run under the profiler; only called from the event loop."""
+        if not self.armed or self._busy:
+            return False
+        if time.monotonic() >= self.deadline:
+            self.finish()
+            return False
+        return self.matches(method, route)
+
+    def poll(self) -> None:
+        """Finish once the deadline has passed, even if no request came in since."""
+        if self.armed and not self._busy and time.monotonic() >= self.deadline:
+            self.finish()
+
+    def enable(self) -> None:
+        self._busy = True
+        self._profile.enable()
+
+    def disable(self) -> None:
+        self._profile.disable()
+        self._busy = False
+        self.captured += 1
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.finish()
+
+    def finish(self) -> None:
+        """Stop capturing and hand over the result, if any request was profiled."""
+        if not self.armed:
+            return
+        if self._busy:
+            self.remaining = 0  # finished by ``disable`` when the request in flight completes
+            return
+        route, profile, on_done = self.route, self._profile, self._on_done
+        self.route, self._profile, self._on_done = None, None, None
+        if not self.captured:
+            app_logger.info(f"cProfile for {route} ended without a matching request")
+            return
+        stats = pstats.Stats(profile)
+        report = io.StringIO()
+        stats.stream = report
+        stats.sort_stats("cumulative").print_stats(40)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        slug = "".join(char if char.isalnum() else "-" for char in route).strip("-") or "root"
+        on_done(Profile(
+            kind="cprofile",
+            title=f"cProfile of {route}: {self.captured} requests",
+            filename=f"cprofile-{slug}-{stamp}.prof",
+            data=marshal.dumps(stats.stats),  # the format pstats.Stats.dump_stats writes
+            media_type="application/octet-stream",
+            report=report.getvalue(),
+        ))
+        app_logger.info(f"cProfile for {route} finished after {self.captured} requests")
+
+class Profiler:
+    """The sampler, the route profiler and the most recent results."""
+
+    def __init__(self, keep: int = 10):
+        self.sampler = StackSampler()
+        self.route_profiler = RouteProfiler()
+        self.results: Deque[Profile] = deque(maxlen=keep)
+
+    def sample_stacks(self, seconds: float, interval_ms: float = None, include_idle: bool = False) -> None:
+        interval = (interval_ms or settings.profiling_interval_ms) / 1000
+        self.sampler.start(seconds, interval, self.results.appendleft, include_idle)
+
+    def profile_route(self, route: str, requests: int = 20, seconds: float = 60.0) -> None:
+        self.route_profiler.arm(route, requests, seconds, self.results.appendleft)
+
+profiler = Profiler()
+
+class ProfilingMiddleware:
+    """Raw ASGI middleware running requests to the armed route under cProfile."""
+
+    def __init__(self, app, route_profiler: RouteProfiler = profiler.route_profiler):
+        self.app = app
+        self.route_profiler = route_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.route_profiler.armed:
+            await self.app(scope, receive, send)
+            return
+
+        from app.core.timing import route_key
+
+        if not self.route_profiler.should_profile(scope["method"], route_key(scope["path"])):
+            await self.app(scope, receive, send)
+            return
+
+        self.route_profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.route_profiler.disable()
+
+def setup_profiling(app) -> None:
+    """Add ``ProfilingMiddleware``; it does nothing until a route is armed from the admin page."""
+    app.add_middleware(ProfilingMiddleware)
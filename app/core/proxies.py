@@ -0,0 +1,53 @@
+"""The client address of a request that may have come through a proxy.
+
+``Fly-Client-IP`` and ``X-Forwarded-For`` are believed only when the
+connection comes from a peer listed in ``TRUSTED_PROXIES`` (addresses or
+networks, or ``*``). Anyone else could put a fresh address in them on every
+request and get a new rate limit and login throttling budget each time. The
+default trusts loopback only, which covers the multi-worker dispatcher
+(``app.core.cluster``); on Fly every connection comes through Fly's proxy,
+so ``fly.toml`` sets ``*``.
+"""
+
+import ipaddress
+from functools import lru_cache
+from typing import List, Optional, Union
+
+from app.core.config import settings
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+def parse_trusted_proxies(spec: str) -> Optional[List[Network]]:
+    """Parse ``"addr,network/bits,..."``; None means every peer is trusted (``*``)."""
+    networks = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        if item == "*":
+            return None
+        networks.append(ipaddress.ip_network(item, strict=False))
+    return networks
+
+_trusted_networks = parse_trusted_proxies(settings.trusted_proxies)
+
+@lru_cache(maxsize=1024)
+def is_trusted_proxy(peer: Optional[str]) -> bool:
+    if _trusted_networks is None:
+        return True
+    try:
+        address = ipaddress.ip_address(peer)
+    except ValueError:
+        return False  # no peer, or a unix socket path
+    return any(address in network for network in _trusted_networks)
+
+def forwarded_client(peer: Optional[str], fly_client_ip: Optional[str], forwarded_for: Optional[str]) -> Optional[str]:
+    """The client behind a trusted proxy, otherwise the peer itself.
+
+    Fly-Client-IP, or the hop the proxy appended last to X-Forwarded-For,
+    is the real client. Earlier X-Forwarded-For entries are client-supplied
+    and not trusted.
+    """
+    if is_trusted_proxy(peer):
+        if fly_client_ip and fly_client_ip.strip():
+            return fly_client_ip.strip()
+        if forwarded_for and forwarded_for.strip():
+            return forwarded_for.rsplit(",", 1)[-1].strip()
+    return peer
@@ -0,0 +1,222 @@
+"""Per-request SQL instrumentation with N+1 detection.
+
+SQLAlchemy cursor events on the sync and async engines record every
+statement against the ``QueryStats`` of the current request or page
+handler, found through a contextvar. When a scope finishes, its numbers are
+folded into per-route aggregates shown on the admin diagnostics tab. DB
+time is also added to the request's ``db`` phase in ``app.core.timing``.
+"""
+
+import functools
+import inspect
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.database import engine, async_engine
+from app.core.logging import app_logger
+from app.core.metrics import db_statement_seconds
+from app.core.timing import record_phase, route_key
+from app.core.tracing import tracer
+
+_SLOWEST_KEPT = 5
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """Normalise a SQL statement so repeated executions compare equal."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PARAM_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+@dataclass
+class QueryStats:
+    """Statements executed within one request or handler invocation."""
+    route: str
+    parent: Optional["QueryStats"] = field(default=None, repr=False)
+    statements: int = 0
+    total_ms: float = 0.0
+    shapes: Dict[str, int] = field(default_factory=dict)
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.statements += 1
+        self.total_ms += duration_ms
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        if len(self.slowest) < _SLOWEST_KEPT or duration_ms > self.slowest[-1][0]:
+            self.slowest.append((duration_ms, shape))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[_SLOWEST_KEPT:]
+
+    def repeated_shapes(self, threshold: int) -> Dict[str, int]:
+        """Statement shapes executed more than ``threshold`` times (likely N+1)."""
+        return {shape: count for shape, count in self.shapes.items() if count > threshold}
+
+@dataclass
+class RouteQueryStats:
+    """Aggregated query statistics for one route."""
+    requests: int = 0
+    statements: int = 0
+    total_ms: float = 0.0
+    max_statements: int = 0
+    n_plus_one: int = 0
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+    suspect_shapes: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "statements": self.statements,
+            "avg_statements": round(self.statements / self.requests, 1) if self.requests else 0,
+            "max_statements": self.max_statements,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.requests, 2) if self.requests else 0,
+            "n_plus_one": self.n_plus_one,
+            "slowest": [{"ms": round(ms, 2), "sql": sql} for ms, sql in self.slowest],
+            "suspect_shapes": dict(self.suspect_shapes),
+        }
+
+class QueryMonitor:
+    """Collects SQL statement statistics per request and per route."""
+
+    def __init__(self, n_plus_one_threshold: int = 10, slow_query_ms: float = 100.0):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_query_ms = slow_query_ms
+        self._routes: Dict[str, RouteQueryStats] = {}
+        self._lock = threading.Lock()
+        self._instrumented: List[Engine] = []
+
+    def instrument(self, engine: Engine) -> None:
+        """Attach cursor execution hooks to a (sync) engine."""
+        if engine in self._instrumented:
+            return
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+        self._instrumented.append(engine)
+
+    @contextmanager
+    def track(self, route: str):
+        """Attribute statements executed inside the block to ``route``."""
+        # Nested scopes (a handler called during a page request) also count towards the outer one
+        stats = QueryStats(route=route, parent=_current_stats.get())
+        token = _current_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            _current_stats.reset(token)
+            self.finish(stats)
+
+    def finish(self, stats: QueryStats) -> None:
+        """Fold a finished scope into the route aggregates and flag N+1 patterns."""
+        if not stats.statements:
+            return
+        suspects = stats.repeated_shapes(self.n_plus_one_threshold)
+        with self._lock:
+            route = self._routes.setdefault(stats.route, RouteQueryStats())
+            route.requests += 1
+            route.statements += stats.statements
+            route.total_ms += stats.total_ms
+            route.max_statements = max(route.max_statements, stats.statements)
+            if suspects:
+                route.n_plus_one += 1
+                route.suspect_shapes.update(suspects)
+            route.slowest = sorted(route.slowest + stats.slowest, key=lambda item: item[0], reverse=True)[:_SLOWEST_KEPT]
+
+        for shape, count in suspects.items():
+            app_logger.warning(f"Possible N+1 on {stats.route}: statement repeated {count} times: {shape[:200]}")
+
+    def route_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of per-route aggregates, busiest routes first."""
+        with self._lock:
+            items = sorted(self._routes.items(), key=lambda item: item[1].total_ms, reverse=True)
+            return {route: stats.to_dict() for route, stats in items}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter_ns())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration_ns = time.perf_counter_ns() - conn.info["query_start_time"].pop()
+        duration_ms = duration_ns / 1e6
+        record_phase("db", duration_ns)
+        db_statement_seconds.observe(duration_ns / 1e9)
+
+        if duration_ms > self.slow_query_ms:
+            app_logger.warning(f"Slow query ({duration_ms:.1f} ms): {statement_shape(statement)[:200]}")
+
+        stats = _current_stats.get()
+        while stats is not None:
+            stats.record(statement, duration_ms)
+            stats = stats.parent
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its start time
+        start_times = exception_context.connection.info.get("query_start_time") if exception_context.connection else None
+        if start_times:
+            start_times.pop()
+
+query_monitor = QueryMonitor(
+    n_plus_one_threshold=settings.query_n_plus_one_threshold,
+    slow_query_ms=settings.query_slow_ms,
+)
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Stats for the active request or handler, if any."""
+    return _current_stats.get()
+
+def track_queries(route: str):
+    """Decorator attributing a page handler's statements to ``route`` and tracing each call."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(route), query_monitor.track(route):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(route), query_monitor.track(route):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class QueryStatsMiddleware:
+    """ASGI middleware that tracks statements per HTTP request."""
+
+    def __init__(self, app, exempt_paths: List[str] = None):
+        self.app = app
+        self.exempt_paths = exempt_paths or ["/static", "/_nicegui"]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(tuple(self.exempt_paths)):
+            return await self.app(scope, receive, send)
+
+        with query_monitor.track(route_key(scope["path"])):
+            await self.app(scope, receive, send)
+
+def setup_query_instrumentation(app) -> None:
+    """Instrument both database engines and add the per-request middleware."""
+    query_monitor.instrument(engine)
+    query_monitor.instrument(async_engine.sync_engine)
+    app.add_middleware(QueryStatsMiddleware)
+    app_logger.info("SQL query instrumentation enabled")
@@ -0,0 +1,212 @@
+"""In-memory ASGI response cache with surrogate-key purging.
+
+``ResponseCacheMiddleware`` stores successful GET responses for the path
+prefixes in ``settings.response_cache_paths``. Entries are keyed on path,
+query string and the caller's Authorization header, and are evicted
+least-recently-used once their total size exceeds
+``response_cache_max_mb``. Only list prefixes whose responses don't depend
+on the session cookie (the public catalog); per-user routes would need a key
+on the resolved user instead.
+
+Handlers tag a response with the ``Surrogate-Key`` header
+(space-separated, e.g. ``catalog product:42 category:3``). Service write
+methods call ``response_cache.purge()`` with the keys they affect, so an
+edit evicts exactly the responses that showed the old data. Purges are
+broadcast to the other workers through the event broker, and an entry
+never lives longer than ``response_cache_ttl_seconds``, which bounds
+staleness from writes made outside the app (bulk loaders, SQL consoles).
+
+NiceGUI pages are not cached: every page render creates a client whose ID
+is embedded in the HTML and its websocket, so a stored copy cannot be
+served to anyone else.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from app.core.broker import event_broker
+from app.core.config import settings
+
+# Per-request values that must not be replayed from the cache
+_UNCACHED_HEADERS = {b"set-cookie", b"server-timing", b"date", b"x-cache"}
+
+class _CachedResponse:
+    __slots__ = ("status", "headers", "body", "keys", "etag", "stored_at", "size")
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, keys: FrozenSet[str]):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.keys = keys
+        self.etag = next((value for name, value in headers if name == b"etag"), None)
+        self.stored_at = time.monotonic()
+        self.size = len(body) + sum(len(name) + len(value) for name, value in headers) + 200
+
+class ResponseCache:
+    """Size-bounded LRU of responses, indexed by surrogate key."""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _CachedResponse]" = OrderedDict()
+        self._by_key: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Bumped by every purge; responses rendered across a purge are not stored
+        self.generation = 0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "purged": 0}
+
+    def get(self, cache_key: str) -> Optional[_CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and time.monotonic() - entry.stored_at > self.ttl_seconds:
+                self._remove(cache_key)
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self._counters["hits"] += 1
+            return entry
+
+    def put(self, cache_key: str, entry: _CachedResponse, generation: int) -> bool:
+        """Store a response unless it is too large or a purge happened while it was rendered."""
+        if entry.size > self.max_entry_bytes:
+            return False
+        with self._lock:
+            if generation != self.generation:
+                return False
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            self._entries[cache_key] = entry
+            self._bytes += entry.size
+            for key in entry.keys:
+                self._by_key.setdefault(key, set()).add(cache_key)
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+            self._counters["stores"] += 1
+            return True
+
+    def purge(self, *keys: str, broadcast: bool = True) -> int:
+        """Drop every response tagged with any of ``keys``. Returns the number removed."""
+        with self._lock:
+            self.generation += 1
+            cache_keys = set().union(*(self._by_key.get(key, ()) for key in keys)) if keys else set()
+            for cache_key in cache_keys:
+                self._remove(cache_key)
+            self._counters["purged"] += len(cache_keys)
+        if broadcast:
+            event_broker.publish_later("response_cache", {"keys": list(keys)})
+        return len(cache_keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_key.clear()
+            self._bytes = 0
+
+    def _remove(self, cache_key: str) -> None:
+        entry = self._entries.pop(cache_key)
+        self._bytes -= entry.size
+        for key in entry.keys:
+            tagged = self._by_key.get(key)
+            if tagged is not None:
+                tagged.discard(cache_key)
+                if not tagged:
+                    del self._by_key[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                **self._counters,
+            }
+
+response_cache = ResponseCache(
+    max_bytes=int(settings.response_cache_max_mb * 1024 * 1024),
+    max_entry_bytes=settings.response_cache_max_entry_kb * 1024,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+)
+
+def _cache_key(scope) -> str:
+    authorization = next((value for name, value in scope["headers"] if name == b"authorization"), b"")
+    # Different credentials never share an entry; the raw token is not kept in memory
+    auth = hashlib.sha1(authorization).hexdigest()[:16] if authorization else "anonymous"
+    return f"{scope['path']}?{scope['query_string'].decode('latin-1')}|{auth}"
+
+def _not_modified(scope, etag: Optional[bytes]) -> bool:
+    header = next((value for name, value in scope["headers"] if name == b"if-none-match"), None)
+    if etag is None or header is None:
+        return False
+    return header.strip() == b"*" or etag in {tag.strip().removeprefix(b"W/") for tag in header.split(b",")}
+
+class ResponseCacheMiddleware:
+    """Raw ASGI middleware serving cacheable GET requests from ``response_cache``."""
+
+    def __init__(self, app, cache: ResponseCache = response_cache, paths: Tuple[str, ...] = ()):
+        self.app = app
+        self.cache = cache
+        self.paths = paths or tuple(path.strip() for path in settings.response_cache_paths.split(",") if path.strip())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        cache_key = _cache_key(scope)
+        entry = self.cache.get(cache_key)
+        if entry is not None:
+            await self._replay(scope, send, entry)
+            return
+
+        generation = self.cache.generation
+        status = 0
+        headers: List[Tuple[bytes, bytes]] = []
+        body: List[bytes] = []
+        size = 0
+
+        async def capture(message):
+            nonlocal status, headers, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                message = {**message, "headers": headers + [(b"x-cache", b"MISS")]}
+            elif message["type"] == "http.response.body" and size <= self.cache.max_entry_bytes:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                body.append(chunk)
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+        if status == 200 and size <= self.cache.max_entry_bytes:
+            surrogate = next((value for name, value in headers if name == b"surrogate-key"), b"")
+            stored_headers = [(name, value) for name, value in headers if name not in _UNCACHED_HEADERS]
+            keys = frozenset(surrogate.decode("latin-1").split())
+            self.cache.put(cache_key, _CachedResponse(status, stored_headers, b"".join(body), keys), generation)
+
+    @staticmethod
+    async def _replay(scope, send, entry: _CachedResponse) -> None:
+        if _not_modified(scope, entry.etag):
+            not_modified = [(name, value) for name, value in entry.headers
+                            if name in (b"etag", b"cache-control", b"surrogate-key")]
+            await send({"type": "http.response.start", "status": 304, "headers": not_modified + [(b"x-cache", b"HIT")]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": entry.status, "headers": entry.headers + [(b"x-cache", b"HIT")]})
+        await send({"type": "http.response.body", "body": entry.body})
+
+def setup_response_cache(app) -> None:
+    """Add the cache middleware and apply purges announced by other workers."""
+    app.add_middleware(ResponseCacheMiddleware)
+    event_broker.subscribe("response_cache", lambda event: response_cache.purge(*event["keys"], broadcast=False))
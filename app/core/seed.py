@@ -0,0 +1,26 @@
+"""Seed the database with the demo catalog and the default admin account.
+
+Run once after deploying (or set ``SEED_ON_STARTUP=true`` for local
+development)::
+
+    python -m app.core.seed
+"""
+
+from sqlalchemy.orm import Session
+from app.core.database import engine, ensure_schema, init_sample_data
+from app.core.logging import app_logger
+
+def seed_database() -> None:
+    """Create the schema if needed, then add sample data and the admin user."""
+    from app.core.catalog_version import setup_catalog_versioning
+    from app.services.user_service import UserService
+
+    ensure_schema()
+    setup_catalog_versioning()  # new sample products must change the catalog ETags
+    init_sample_data()
+    with Session(engine) as db:
+        admin = UserService(db).create_admin_user()
+        app_logger.info(f"Admin account ready: {admin.email}")
+
+if __name__ == "__main__":
+    seed_database()
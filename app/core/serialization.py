@@ -0,0 +1,135 @@
+"""Fast JSON serialization for API responses.
+
+``FastJSONResponse`` is the default response class of the API router. It
+encodes with orjson when it is installed and otherwise with the standard
+library, producing the same JSON either way. Datetimes, dates, enums such
+as ``OrderStatus``, decimals and the read-model dataclasses
+(``ProductCard``, ``OrderSummary``...) are encoded directly, so endpoints
+can return DTOs without converting them to dicts first.
+
+FastAPI runs ``jsonable_encoder`` over anything an endpoint returns that
+is not a ``Response``. Endpoints on the fast path therefore return a
+``FastJSONResponse`` themselves.
+
+Compare the encoders on synthetic product and order lists::
+
+    python -m app.core.serialization --products 20000 --orders 5000
+"""
+
+import dataclasses
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app.core.timing import timed_phase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    """Encode the types orjson handles natively but the json module doesn't."""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, (date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Exception):
+        return str(obj)  # e.g. the ctx of pydantic validation errors
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact UTF-8 JSON."""
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact UTF-8 JSON."""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def stdlib_dumps(obj: Any) -> bytes:
+    """The fallback encoder, also used by the benchmark for comparison."""
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with ``dumps``, timed as the request's ``serialize`` phase."""
+
+    def render(self, content: Any) -> bytes:
+        with timed_phase("serialize"):
+            return dumps(content)
+
+# Benchmark
+
+def _sample_data(products: int, orders: int):
+    import random
+    from app.models.order import OrderStatus
+    from app.models.read_models import OrderLine, OrderSummary, ProductCard
+
+    rng = random.Random(42)
+    cards = [
+        ProductCard(id=i, name=f"Versace Fragrance {i}", category_name=rng.choice(("Men's", "Women's", "Unisex")),
+                    price=round(rng.uniform(20, 400), 2), size=rng.choice(("50ml", "100ml")),
+                    image_url=f"/static/images/products/{i}.jpg", stock_quantity=rng.randint(0, 500))
+        for i in range(1, products + 1)
+    ]
+    statuses = list(OrderStatus)
+    summaries = [
+        OrderSummary(id=i, order_number=f"VRS-{i:08d}", status=rng.choice(statuses),
+                     total_amount=round(rng.uniform(20, 900), 2), created_at=datetime(2025, 1, 1, rng.randint(0, 23)),
+                     user_id=rng.randint(1, 1000), customer=f"customer{i}", shipping_name="A Customer",
+                     shipping_address="1 Via Gesù, Milano",
+                     items=tuple(OrderLine(product_id=rng.randint(1, products), name="Versace Eros",
+                                           quantity=rng.randint(1, 3), price=89.99)
+                                 for _ in range(rng.randint(1, 5))))
+        for i in range(1, orders + 1)
+    ]
+    return cards, summaries
+
+def main() -> None:
+    import argparse
+    import statistics
+    import timeit
+
+    from fastapi.encoders import jsonable_encoder
+
+    parser = argparse.ArgumentParser(description="Compare JSON encoders on product and order lists")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cards, summaries = _sample_data(args.products, args.orders)
+    encoders = {
+        "jsonable_encoder + json": lambda data: json.dumps(jsonable_encoder(data)).encode("utf-8"),
+        "stdlib json (fallback)": stdlib_dumps,
+    }
+    if orjson is not None:
+        encoders["orjson"] = dumps
+    else:
+        print("orjson is not installed; only the fallback paths are measured")
+
+    for label, data in ((f"{len(cards):,} product cards", cards), (f"{len(summaries):,} order summaries", summaries)):
+        print(label)
+        baseline = None
+        for name, encode in encoders.items():
+            size = len(encode(data))
+            timings = timeit.repeat(lambda: encode(data), number=1, repeat=args.repeat)
+            best, median = min(timings), statistics.median(timings)
+            baseline = baseline or best
+            print(f"    {name:<26} best {best * 1000:8.1f}ms  median {median * 1000:8.1f}ms  "
+                  f"{size / best / 1e6:7.1f} MB/s  {baseline / best:5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""Server-side session storage for the login state kept by ``AuthManager``.
+
+NiceGUI's ``app.storage.user`` writes one JSON file per session, per
+process, on every change, so sessions are lost when a request lands on
+another worker. ``SessionStore`` keeps the same per-browser dictionaries
+behind a pluggable ``SessionBackend``:
+
+- ``SQLiteSessionBackend`` stores sessions in a WAL-mode SQLite file that
+  every worker process on the machine shares.
+- ``MemorySessionBackend`` keeps them in the process, for development.
+
+Sessions are cached in memory and reloaded from the backend after
+``session_cache_seconds``; in multi-worker mode, sessions written by another
+worker are also dropped from the cache as soon as the event broker reports
+them, so a login or logout is seen everywhere within a poll interval. Changes
+are collected and written by a background thread in one transaction every
+``session_flush_interval`` seconds; sessions not seen for
+``session_idle_days`` are purged.
+
+Sessions are keyed by the ID NiceGUI keeps in the signed session cookie,
+which requires ``storage_secret`` to be passed to ``ui.run``.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from app.core.broker import event_broker
+from app.core.config import settings
+from app.core.logging import app_logger
+
+TOUCH_INTERVAL = 60.0  # last-seen times are written at most this often per session
+PURGE_INTERVAL = 600.0
+
+class SessionBackend(ABC):
+    """Where sessions are persisted. Implementations must be thread-safe."""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored session data, or None if there is none."""
+
+    @abstractmethod
+    def save(self, sessions: Dict[str, Dict[str, Any]], now: float) -> None:
+        """Insert or replace several sessions at once."""
+
+    @abstractmethod
+    def touch(self, session_ids: Iterable[str], now: float) -> None:
+        """Record that sessions were used without changing their data."""
+
+    @abstractmethod
+    def purge(self, last_seen_before: float) -> int:
+        """Delete sessions idle since before the given time. Returns the number deleted."""
+
+    def close(self) -> None:
+        pass
+
+class MemorySessionBackend(SessionBackend):
+    """Sessions kept in this process only; lost on restart and not shared between workers."""
+
+    def __init__(self):
+        self._sessions: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            stored = self._sessions.get(session_id)
+        return json.loads(stored[0]) if stored else None
+
+    def save(self, sessions: Dict[str, Dict[str, Any]], now: float) -> None:
+        with self._lock:
+            for session_id, data in sessions.items():
+                self._sessions[session_id] = (json.dumps(data), now)
+
+    def touch(self, session_ids: Iterable[str], now: float) -> None:
+        with self._lock:
+            for session_id in session_ids:
+                if session_id in self._sessions:
+                    self._sessions[session_id] = (self._sessions[session_id][0], now)
+
+    def purge(self, last_seen_before: float) -> int:
+        with self._lock:
+            expired = [sid for sid, (_, last_seen) in self._sessions.items() if last_seen < last_seen_before]
+            for session_id in expired:
+                del self._sessions[session_id]
+        return len(expired)
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions in a WAL-mode SQLite file shared by all worker processes.
+
+    Each thread gets its own connection so reads on the event loop are not
+    held up by the flusher's write transaction.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        db = self._connection()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, last_seen REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS ix_sessions_last_seen ON sessions (last_seen)")
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Autocommit mode; writes use explicit transactions
+            db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=5000")
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, sessions: Dict[str, Dict[str, Any]], now: float) -> None:
+        self._write(
+            "INSERT INTO sessions (id, data, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET data = excluded.data, last_seen = excluded.last_seen",
+            [(session_id, json.dumps(data), now) for session_id, data in sessions.items()],
+        )
+
+    def touch(self, session_ids: Iterable[str], now: float) -> None:
+        self._write("UPDATE sessions SET last_seen = ? WHERE id = ?",
+                    [(now, session_id) for session_id in session_ids])
+
+    def purge(self, last_seen_before: float) -> int:
+        return self._connection().execute("DELETE FROM sessions WHERE last_seen < ?", (last_seen_before,)).rowcount
+
+    def _write(self, statement: str, rows: List[tuple]) -> None:
+        if not rows:
+            return
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(statement, rows)
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+class SessionData(dict):
+    """A session's key/value data; reports every change to its store."""
+
+    def __init__(self, data: Dict[str, Any], on_change: Callable[[], None]):
+        super().__init__(data)
+        self._on_change = on_change
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._on_change()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._on_change()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._on_change()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._on_change()
+        return value
+
+    def clear(self):
+        super().clear()
+        self._on_change()
+
+class _CachedSession:
+    __slots__ = ("data", "loaded_at", "persisted_seen")
+
+    def __init__(self, data: SessionData, now: float):
+        self.data = data
+        self.loaded_at = now
+        self.persisted_seen = now
+
+class SessionStore:
+    """In-memory session cache with batched write-behind to a ``SessionBackend``."""
+
+    def __init__(self, backend: SessionBackend, flush_interval: float = 0.5, cache_seconds: float = 5.0,
+                 cache_size: int = 10_000, idle_seconds: float = 14 * 86400):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.cache_seconds = cache_seconds
+        self.cache_size = cache_size
+        self.idle_seconds = idle_seconds
+        self._cache: "OrderedDict[str, _CachedSession]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        self._touched: Set[str] = set()
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._counters = {"hits": 0, "loads": 0, "flushes": 0, "written": 0, "purged": 0}
+
+    def get(self, session_id: str) -> SessionData:
+        """The session's data, from the cache unless it is missing or due for a reload."""
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached is not None and (session_id in self._dirty or now - cached.loaded_at < self.cache_seconds):
+                self._counters["hits"] += 1
+                self._cache.move_to_end(session_id)
+                if now - cached.persisted_seen > TOUCH_INTERVAL:
+                    self._touched.add(session_id)
+                return cached.data
+
+            self._counters["loads"] += 1
+
+        # Loaded without the lock so a slow backend doesn't hold up other sessions
+        stored = self.backend.load(session_id) or {}
+        with self._lock:
+            cached = self._cache.get(session_id)
+            # Keep a copy another caller loaded meanwhile, or one with unsaved changes
+            if cached is None or (session_id not in self._dirty and cached.loaded_at < now):
+                cached = _CachedSession(SessionData(stored, lambda: self._mark_dirty(session_id)), now)
+                self._cache[session_id] = cached
+            self._cache.move_to_end(session_id)
+            self._evict()
+            return cached.data
+
+    def current(self) -> SessionData:
+        """The session of the browser behind the current page or event."""
+        from nicegui.storage import request_contextvar
+
+        request = request_contextvar.get()
+        if request is None:
+            raise RuntimeError("Sessions can only be used within a UI context")
+        return self.get(request.session["id"])
+
+    def _mark_dirty(self, session_id: str) -> None:
+        with self._lock:
+            self._dirty.add(session_id)
+
+    def _evict(self) -> None:
+        # Oldest first, without copying the cache. Unsaved sessions go to the
+        # back until the next flush has written them, and the session just
+        # loaded (last in order, so never reached) is about to be used
+        overflow = len(self._cache) - self.cache_size
+        remaining = len(self._cache) - 1
+        while overflow > 0 and remaining > 0:
+            session_id = next(iter(self._cache))
+            if session_id in self._dirty:
+                self._cache.move_to_end(session_id)
+            else:
+                del self._cache[session_id]
+                self._touched.discard(session_id)
+                overflow -= 1
+            remaining -= 1
+
+    def flush_soon(self) -> None:
+        """Wake the flusher so changes such as a logout reach other workers promptly."""
+        self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write changed sessions and last-seen times in one batch. Returns the number written."""
+        now = time.time()
+        with self._lock:
+            changed = {sid: dict(self._cache[sid].data) for sid in self._dirty if sid in self._cache}
+            touched = [sid for sid in self._touched if sid not in changed]
+            self._dirty.clear()
+            self._touched.clear()
+        if not changed and not touched:
+            return 0
+
+        try:
+            self.backend.save(changed, now)
+            self.backend.touch(touched, now)
+        except Exception as e:
+            app_logger.error(f"Session flush failed: {e}")
+            with self._lock:
+                self._dirty.update(changed)
+            return 0
+
+        with self._lock:
+            for session_id in (*changed, *touched):
+                cached = self._cache.get(session_id)
+                if cached is not None:
+                    cached.persisted_seen = now
+            self._counters["flushes"] += 1
+            self._counters["written"] += len(changed)
+        if changed:
+            event_broker.publish("sessions", {"ids": list(changed)})
+        return len(changed)
+
+    def invalidate(self, session_ids: Iterable[str]) -> None:
+        """Drop cached copies so the next access reloads them; unsaved local changes are kept."""
+        with self._lock:
+            for session_id in session_ids:
+                if session_id not in self._dirty:
+                    self._cache.pop(session_id, None)
+                    self._touched.discard(session_id)
+
+    def purge_expired(self) -> int:
+        """Delete sessions idle for longer than ``idle_seconds``."""
+        purged = self.backend.purge(time.time() - self.idle_seconds)
+        with self._lock:
+            self._counters["purged"] += purged
+        if purged:
+            app_logger.info(f"Purged {purged} idle sessions")
+        return purged
+
+    def start(self) -> None:
+        """Start the background flusher thread."""
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+        self._thread.start()
+        app_logger.info(f"Session store started ({type(self.backend).__name__})")
+
+    def stop(self) -> None:
+        """Stop the flusher, write what is pending and close the backend."""
+        # Takes no arguments: NiceGUI passes a client to shutdown handlers that accept one
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(5.0)
+            self._thread = None
+        self.flush()
+        self.backend.close()
+
+    def _flush_loop(self) -> None:
+        next_purge = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.flush()
+                if time.monotonic() >= next_purge:
+                    self.purge_expired()
+                    next_purge = time.monotonic() + PURGE_INTERVAL
+            except Exception as e:
+                app_logger.error(f"Session flusher error: {e}")
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "cached": len(self._cache),
+                "pending": len(self._dirty),
+                **self._counters,
+            }
+
+def create_session_backend() -> SessionBackend:
+    """Backend selected by ``settings.session_backend``."""
+    if settings.session_backend == "memory":
+        return MemorySessionBackend()
+    if settings.session_backend == "sqlite":
+        return SQLiteSessionBackend(settings.session_database_path)
+    raise ValueError(f"Unknown session backend: {settings.session_backend!r}")
+
+session_store = SessionStore(
+    create_session_backend(),
+    flush_interval=settings.session_flush_interval,
+    cache_seconds=settings.session_cache_seconds,
+    cache_size=settings.session_cache_size,
+    idle_seconds=settings.session_idle_days * 86400,
+)
@@ -0,0 +1,147 @@
+"""Startup profiling and the cold-start benchmark.
+
+``startup_profiler`` is imported first by ``main.py`` and times the import
+groups and each phase of ``setup_app``; the breakdown is logged once the
+server is ready to accept requests.
+
+The benchmark boots the app in fresh subprocesses against a scratch
+database and reports import and setup times for a first boot (schema
+created, sample data seeded) and for warm boots that find the schema stamp,
+plus the slowest imports from ``python -X importtime``::
+
+    python -m app.core.startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+class StartupProfiler:
+    """Records how long each startup phase takes."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_ms: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the block as one named startup phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - started) * 1000))
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def report(self) -> Dict[str, Any]:
+        total_ms = self.ready_ms if self.ready_ms is not None else self.elapsed_ms()
+        return {
+            "total_ms": round(total_ms, 1),
+            "phases": {name: round(duration_ms, 1) for name, duration_ms in self.phases},
+            "unaccounted_ms": round(total_ms - sum(duration_ms for _, duration_ms in self.phases), 1),
+        }
+
+    def finish(self) -> None:
+        """Mark the server as ready and log the phase breakdown."""
+        from app.core.logging import app_logger
+
+        self.ready_ms = self.elapsed_ms()
+        report = self.report()
+        phases = ", ".join(f"{name} {duration_ms:.0f}ms" for name, duration_ms in report["phases"].items())
+        app_logger.info(f"Startup took {report['total_ms']:.0f}ms ({phases})")
+
+startup_profiler = StartupProfiler()
+
+_BOOT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.setup_app()
+ready = time.perf_counter()
+from app.core.startup import startup_profiler
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "setup_ms": (ready - imported) * 1000,
+    "phases": startup_profiler.report()["phases"],
+}))
+"""
+
+def _boot(env: Dict[str, str]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", _BOOT_SCRIPT], cwd=PROJECT_ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"Boot failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - started) * 1000
+    return timings
+
+def slowest_imports(env: Dict[str, str], top: int) -> List[Tuple[str, float]]:
+    """Import time of main.py per top-level package (summed self time), from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=PROJECT_ROOT,
+                            env=env, capture_output=True, text=True, check=True)
+    # importtime lists a module's imports before the module itself, so
+    # everything since the previous top-level entry belongs to main
+    pending: List[Tuple[str, float]] = []
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        pending.append((name.strip().split(".")[0], int(self_us) / 1000))
+        if not name.startswith("  "):
+            if name.strip() == "main":
+                for package, duration_ms in pending:
+                    packages[package] = packages.get(package, 0.0) + duration_ms
+            pending = []
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+def _summary(label: str, boots: List[Dict[str, Any]]) -> None:
+    def median(key: str) -> float:
+        return statistics.median(boot[key] for boot in boots)
+
+    print(f"{label}: process {median('process_ms'):.0f}ms, imports {median('import_ms'):.0f}ms, "
+          f"setup_app {median('setup_ms'):.0f}ms (median of {len(boots)})")
+    for phase in boots[0]["phases"]:
+        print(f"    {phase:<20} {statistics.median(boot['phases'].get(phase, 0.0) for boot in boots):>8.1f}ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure application cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="warm boots to measure")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{scratch}/startup.db",
+            "DEBUG": "false",
+            "SEED_ON_STARTUP": "false",
+        }
+
+        # First boot on an empty database: creates and stamps the schema, then seeds
+        _summary("first boot (empty database, seeding)", [_boot({**env, "SEED_ON_STARTUP": "true"})])
+        _summary("warm boot (stamped schema, no seeding)", [_boot(env) for _ in range(args.runs)])
+        _summary("warm boot (stamped schema, seeding check)",
+                 [_boot({**env, "SEED_ON_STARTUP": "true"}) for _ in range(args.runs)])
+
+        print("import time by package (self time):")
+        for package, duration_ms in slowest_imports(env, args.top):
+            print(f"    {package:<20} {duration_ms:>8.1f}ms")
+
+if __name__ == "__main__":
+    main()
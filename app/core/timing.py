@@ -0,0 +1,229 @@
+"""Request timing: Server-Timing phases and per-route latency histograms.
+
+``TimingMiddleware`` times every HTTP request with ``perf_counter_ns`` and
+splits the time until the response headers into phases, sent back in a
+``Server-Timing`` header (visible in the browser's network panel):
+
+- ``mw``: the middleware stack (compression, response cache, ...)
+- ``db``: SQL statements, recorded by ``app.core.query_stats``
+- ``serialize``: JSON encoding in ``FastJSONResponse``
+- ``render``: the rest of the handler (page building, business logic)
+- ``total``
+
+The full duration of each request, body included, is recorded in a
+log-linear histogram per route (HDR-style: a fixed number of buckets per
+power of two, so every percentile is within ~3% of the true value at any
+scale). ``timing_monitor.route_latencies()`` reports p50/p95/p99.
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from starlette.middleware import Middleware
+
+from app.core.logging import app_logger
+
+_SUB_BUCKET_BITS = 5  # 32 buckets per power of two
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_MAX_MICROS = 120_000_000  # slower requests are counted as two minutes
+MAX_ROUTES = 500  # further routes share one "other" histogram
+
+_current_timing: ContextVar[Optional["RequestTiming"]] = ContextVar("request_timing", default=None)
+
+_NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def route_key(path: str) -> str:
+    """Collapse numeric path segments so /product/42 and /product/7 share a route."""
+    return _NUMERIC_SEGMENT.sub("/{id}", path)
+
+def _bucket_index(micros: int) -> int:
+    if micros < 2 * _SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - _SUB_BUCKET_BITS - 1
+    return 2 * _SUB_BUCKETS + (shift - 1) * _SUB_BUCKETS + (micros >> shift) - _SUB_BUCKETS
+
+def _bucket_value(index: int) -> float:
+    """Midpoint of a bucket, in microseconds."""
+    if index < 2 * _SUB_BUCKETS:
+        return float(index)
+    shift = (index - 2 * _SUB_BUCKETS) // _SUB_BUCKETS + 1
+    top = (index - 2 * _SUB_BUCKETS) % _SUB_BUCKETS + _SUB_BUCKETS
+    return ((top << shift) + ((top + 1) << shift) - 1) / 2
+
+class LatencyHistogram:
+    """Log-linear latency histogram with microsecond resolution. Not thread-safe on its own."""
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (_bucket_index(_MAX_MICROS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns: int) -> None:
+        self.counts[_bucket_index(min(duration_ns // 1000, _MAX_MICROS))] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+
+    def percentile(self, percent: float) -> float:
+        """Latency in milliseconds below which ``percent`` of requests fall."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_value(index) * 1000, self.max_ns) / 1e6
+        return self.max_ns / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.count,
+            "avg_ms": round(self.total_ns / self.count / 1e6, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            "max_ms": round(self.max_ns / 1e6, 2),
+        }
+
+class RequestTiming:
+    """Phase durations of one request, in nanoseconds."""
+    __slots__ = ("phases", "counts", "app_ns")
+
+    def __init__(self):
+        self.phases: Dict[str, int] = {}
+        self.counts: Dict[str, int] = {}
+        self.app_ns: Optional[int] = None
+
+    def add(self, phase: str, duration_ns: int) -> None:
+        self.phases[phase] = self.phases.get(phase, 0) + duration_ns
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def server_timing(self, total_ns: int) -> str:
+        db_ns = self.phases.get("db", 0)
+        serialize_ns = self.phases.get("serialize", 0)
+        # None when the response came from a middleware (cache hit, 304) without reaching a handler
+        app_ns = self.app_ns or 0
+        entries = [
+            ("mw", total_ns - app_ns, None),
+            ("db", db_ns, f"{self.counts.get('db', 0)} queries"),
+            ("serialize", serialize_ns, None),
+            ("render", max(app_ns - db_ns - serialize_ns, 0), None),
+            ("total", total_ns, None),
+        ]
+        return ", ".join(
+            f"{name};dur={duration_ns / 1e6:.2f}" + (f';desc="{desc}"' if desc else "")
+            for name, duration_ns, desc in entries
+            if duration_ns or name == "total"
+        )
+
+def record_phase(phase: str, duration_ns: int) -> None:
+    """Add time to a phase of the current request, if there is one."""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.add(phase, duration_ns)
+
+@contextmanager
+def timed_phase(phase: str):
+    """Attribute the time spent in the block to ``phase`` of the current request."""
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter_ns() - started)
+
+class TimingMonitor:
+    """Latency histograms per route."""
+
+    def __init__(self, max_routes: int = MAX_ROUTES):
+        self.max_routes = max_routes
+        self._routes: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route: str, duration_ns: int) -> None:
+        with self._lock:
+            histogram = self._routes.get(route)
+            if histogram is None:
+                if len(self._routes) >= self.max_routes:
+                    route = "other"
+                histogram = self._routes.setdefault(route, LatencyHistogram())
+            histogram.record(duration_ns)
+
+    def route_latencies(self) -> Dict[str, Dict[str, Any]]:
+        """Latency summary per route, busiest routes first."""
+        with self._lock:
+            items = sorted(self._routes.items(), key=lambda item: item[1].count, reverse=True)
+            return {route: histogram.to_dict() for route, histogram in items}
+
+    def histograms(self) -> Dict[str, LatencyHistogram]:
+        """The live histograms, for exporters that need the buckets."""
+        with self._lock:
+            return dict(self._routes)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+timing_monitor = TimingMonitor()
+
+class TimingMiddleware:
+    """Raw ASGI middleware adding ``Server-Timing`` and recording per-route latency."""
+
+    def __init__(self, app, monitor: TimingMonitor = timing_monitor, exempt_paths: List[str] = None):
+        self.app = app
+        self.monitor = monitor
+        self.exempt_paths = tuple(exempt_paths or ["/static", "/_nicegui"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter_ns()
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                server_timing = timing.server_timing(time.perf_counter_ns() - started)
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"server-timing", server_timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timing.reset(token)
+            self.monitor.observe(f"{scope['method']} {route_key(scope['path'])}", time.perf_counter_ns() - started)
+
+class HandlerTimingMiddleware:
+    """Innermost marker: time from entering the router until the response headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        timing = _current_timing.get()
+        if timing is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter_ns()
+
+        async def send_marking(message):
+            if message["type"] == "http.response.start" and timing.app_ns is None:
+                timing.app_ns = time.perf_counter_ns() - started
+            await send(message)
+
+        await self.app(scope, receive, send_marking)
+
+def setup_timing(app) -> None:
+    """Add the timing middleware, plus the handler marker inside every other middleware."""
+    app.user_middleware.append(Middleware(HandlerTimingMiddleware))
+    app.add_middleware(TimingMiddleware)
+    app_logger.info("Request timing enabled")
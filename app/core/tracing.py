@@ -0,0 +1,396 @@
+"""Lightweight in-process tracing.
+
+A trace is the tree of spans for one HTTP request or one NiceGUI event
+handler. The current span lives in a contextvar, so spans started in
+services, SQL statements and tasks spawned from a handler nest under it
+without being passed around.
+
+Spans come from:
+
+- ``TracingMiddleware``: a root span per HTTP request (page renders, API calls)
+- ``track_queries``: a span per NiceGUI page or event handler it decorates
+- ``@traced_methods``: a span per public service method call
+- ``instrument_engine``: a span per SQL statement
+
+Sampling is either ``head`` (decide when the trace starts; unsampled
+traces record nothing) or ``tail`` (record every trace, then keep the slow
+and failed ones plus a random share of the rest). Kept traces are written
+by a background thread, one per line, as OTLP/JSON ``resourceSpans`` to a
+size-rotated file, and the slowest are kept in memory for the admin
+Traces tab.
+"""
+
+import functools
+import heapq
+import inspect
+import itertools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import app_logger, current_request_id
+
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+MAX_SPANS_PER_TRACE = 1000
+SLOWEST_KEPT = 20
+
+class _TraceRecord:
+    """Spans of one trace as they finish."""
+    __slots__ = ("trace_id", "spans", "dropped", "error")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+        self.dropped = 0
+        self.error = False
+
+class Span:
+    __slots__ = ("record", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes",
+                 "status", "message")
+
+    def __init__(self, record: _TraceRecord, parent_id: str, name: str, kind: int,
+                 attributes: Optional[Dict[str, Any]]):
+        self.record = record
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.status = STATUS_OK
+        self.message = ""
+
+    @property
+    def trace_id(self) -> str:
+        return self.record.trace_id
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.message = f"{type(error).__name__}: {error}"
+        self.record.error = True
+
+    def to_otlp(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.record.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status, "message": self.message} if self.message else {"code": self.status},
+        }
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+# Set as the current span in traces head sampling decided not to record
+_NOT_RECORDING = object()
+
+_current_span: ContextVar[Optional[Any]] = ContextVar("current_span", default=None)
+
+class TraceFileExporter:
+    """Writes kept traces as OTLP/JSON lines from a background thread, rotating by size."""
+
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": settings.app_name}},
+                {"key": "service.instance.id", "value": {"stringValue": str(os.getpid())}},
+            ]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp() for span in spans]}],
+        }]}, separators=(",", ":"))
+        self._start()
+        self._queue.put(line)
+
+    def _start(self) -> None:
+        # Started on first export so boot doesn't pay for it
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file = open(self.path, "a", encoding="utf-8")
+        try:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    break
+                file.write(line + "\n")
+                self.written += 1
+                if self._queue.empty():
+                    file.flush()
+                    if file.tell() >= self.max_bytes:
+                        file.close()
+                        self._rotate()
+                        file = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            app_logger.error(f"Trace export stopped: {e}")
+        finally:
+            file.close()
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+class Tracer:
+    """Starts spans, applies the sampling policy and hands kept traces to the exporter."""
+
+    def __init__(self, exporter: TraceFileExporter, enabled: bool = True, sampler: str = "tail",
+                 sample_rate: float = 0.01, slow_ms: float = 500.0):
+        if sampler not in ("head", "tail"):
+            raise ValueError(f"Unknown trace sampler: {sampler!r}")
+        self.exporter = exporter
+        self.enabled = enabled
+        self.sampler = sampler
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._slowest: List[tuple] = []  # min-heap of (duration, sequence, spans)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._counters = {"started": 0, "kept": 0}
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        """Run the block in a new span, the root of a new trace if there is no current one."""
+        parent = _current_span.get()
+        if not self.enabled or parent is _NOT_RECORDING:
+            yield None
+            return
+        if parent is None:
+            self._counters["started"] += 1
+            if self.sampler == "head" and random.random() >= self.sample_rate:
+                token = _current_span.set(_NOT_RECORDING)
+                try:
+                    yield None
+                finally:
+                    _current_span.reset(token)
+                return
+            record, parent_id = _TraceRecord(f"{random.getrandbits(128):032x}"), ""
+        else:
+            record, parent_id = parent.record, parent.span_id
+
+        span = Span(record, parent_id, name, kind, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end(span, root=parent is None)
+
+    def start_span(self, name: str, kind: int = SPAN_KIND_INTERNAL,
+                   attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """A child of the current span that is not made current; finish it with ``end``.
+
+        For leaf spans opened and closed in different callbacks (SQL
+        statements). Returns None outside a recorded trace.
+        """
+        parent = _current_span.get()
+        if parent is None or parent is _NOT_RECORDING:
+            return None
+        return Span(parent.record, parent.span_id, name, kind, attributes)
+
+    def end(self, span: Span, root: bool = False) -> None:
+        span.end_ns = time.time_ns()
+        record = span.record
+        if len(record.spans) < MAX_SPANS_PER_TRACE:
+            record.spans.append(span)
+        else:
+            record.dropped += 1
+        if root:
+            self._finish_trace(span)
+
+    def _finish_trace(self, root: Span) -> None:
+        record = root.record
+        duration_ms = root.duration_ms
+        if self.sampler == "tail" and not (
+            record.error or duration_ms >= self.slow_ms or random.random() < self.sample_rate
+        ):
+            return
+        if record.dropped:
+            root.set_attribute("trace.dropped_spans", record.dropped)
+        spans = sorted(record.spans, key=lambda span: span.start_ns)
+        with self._lock:
+            self._counters["kept"] += 1
+            entry = (duration_ms, next(self._sequence), spans)
+            if len(self._slowest) < SLOWEST_KEPT:
+                heapq.heappush(self._slowest, entry)
+            elif duration_ms > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+        self.exporter.export(spans)
+
+    def slowest_traces(self) -> List[List[Span]]:
+        """Kept traces with the longest root spans, slowest first; spans ordered by start."""
+        with self._lock:
+            return [spans for _, _, spans in sorted(self._slowest, reverse=True)]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._slowest.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sampler": self.sampler, "written": self.exporter.written, **self._counters}
+
+    def shutdown(self) -> None:
+        self.exporter.stop()
+
+tracer = Tracer(
+    TraceFileExporter(settings.tracing_file, int(settings.tracing_file_max_mb * 1024 * 1024),
+                      settings.tracing_file_backups),
+    enabled=settings.tracing_enabled,
+    sampler=settings.tracing_sampler,
+    sample_rate=settings.tracing_sample_rate,
+    slow_ms=settings.tracing_slow_ms,
+)
+
+def current_span() -> Optional[Span]:
+    span = _current_span.get()
+    return None if span is _NOT_RECORDING else span
+
+def traced(name: Optional[str] = None):
+    """Decorator running each call of a function in a span (named after it by default)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def traced_methods(cls):
+    """Class decorator tracing every public method defined on the class."""
+    for attribute, value in list(vars(cls).items()):
+        if not attribute.startswith("_") and inspect.isfunction(value):
+            setattr(cls, attribute, traced(f"{cls.__name__}.{attribute}")(value))
+    return cls
+
+def instrument_engine(engine) -> None:
+    """Record a client span for every SQL statement run inside a trace."""
+    from sqlalchemy import event
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span("db.query", SPAN_KIND_CLIENT, {
+            "db.system": engine.dialect.name,
+            "db.statement": statement[:1000],
+        })
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info["trace_spans"].pop()
+        if span is not None:
+            if cursor.rowcount >= 0:
+                span.set_attribute("db.rows", cursor.rowcount)
+            tracer.end(span)
+
+    def handle_error(exception_context):
+        spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+        if spans:
+            span = spans.pop()
+            if span is not None:
+                span.record_error(exception_context.original_exception)
+                tracer.end(span)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+class TracingMiddleware:
+    """Raw ASGI middleware opening a root span per HTTP request."""
+
+    def __init__(self, app, exempt_paths: List[str] = None):
+        self.app = app
+        self.exempt_paths = tuple(exempt_paths or ["/static", "/_nicegui"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        from app.core.timing import route_key
+
+        route = route_key(scope["path"])
+        with tracer.span(f"{scope['method']} {route}", SPAN_KIND_SERVER,
+                         {"http.method": scope["method"], "http.route": route, "http.target": scope["path"],
+                          "http.request_id": current_request_id() or ""}) as span:
+            async def send_with_trace(message):
+                if span is not None and message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = STATUS_ERROR
+                        span.record.error = True
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-trace-id", span.trace_id.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
+
+def setup_tracing(app) -> None:
+    """Instrument both database engines and add the request middleware."""
+    if not tracer.enabled:
+        return
+    from app.core.database import async_engine, engine
+
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    app.add_middleware(TracingMiddleware)
+    app_logger.info(f"Tracing enabled ({tracer.sampler} sampling, rate {tracer.sample_rate:g}, "
+                    f"writing to {tracer.exporter.path})")
@@ -3,6 +3,7 @@
 from nicegui import ui
 from app.core.auth import AuthManager
 from app.core.config import settings
+from app.core.query_stats import track_queries
 
 def create_header():
     """Create the main header with navigation."""
@@ -63,8 +64,8 @@ def create_footer():
                     ui.icon('instagram').classes('text-2xl text-gray-300 cursor-pointer hover:text-white')
                     ui.icon('twitter').classes('text-2xl text-gray-300 cursor-pointer hover:text-white')
 
-def page_layout(content_func, title: str = "Versace Perfumes"):
-    """Standard page layout wrapper."""
+async def page_layout(content_func, title: str = "Versace Perfumes"):
+    """Standard page layout wrapper; awaits the async page content."""
     ui.page_title = title
     
     # Add custom CSS for luxury styling
@@ -105,12 +106,12 @@ def page_layout(content_func, title: str = "Versace Perfumes"):
     create_header()
     
     with ui.column().classes('min-h-screen bg-gray-100'):
-        content_func()
+        await content_func()
     
     create_footer()
 
 def product_card(product, show_add_to_cart=True):
-    """Reusable product card component."""
+    """Reusable product card component for a ``ProductCard`` read model."""
     with ui.card().classes('product-card w-80 bg-white'):
         # Product image
         if product.image_url:
@@ -122,7 +123,7 @@ def product_card(product, show_add_to_cart=True):
         with ui.card_section():
             # Product name and category
             ui.label(product.name).classes('text-lg font-semibold text-gray-800')
-            ui.label(product.category.name).classes('text-sm text-gray-500')
+            ui.label(product.category_name).classes('text-sm text-gray-500')
             
             # Price
             ui.label(f'${product.price:.2f}').classes('price-tag mt-2')
@@ -145,10 +146,11 @@ def product_card(product, show_add_to_cart=True):
                     ui.button('Add to Cart', 
                              on_click=lambda p=product: add_to_cart_action(p.id)).classes('luxury-button flex-1 ml-2')
 
-def add_to_cart_action(product_id: int):
+@track_queries('add_to_cart_action')
+async def add_to_cart_action(product_id: int):
     """Add product to cart action."""
-    from app.services.cart_service import CartService
-    from app.core.database import Session, engine
+    from app.services.cart_service import AsyncCartService
+    from app.core.database import AsyncSessionLocal
     
     if not AuthManager.is_authenticated():
         ui.notify('Please login to add items to cart', type='warning')
@@ -156,9 +158,9 @@ def add_to_cart_action(product_id: int):
         return
     
     try:
-        with Session(engine) as db:
-            cart_service = CartService(db)
-            cart_service.add_to_cart(AuthManager.get_current_user_id(), product_id, 1)
-            ui.notify('Product added to cart!', type='positive')
+        async with AsyncSessionLocal() as db:
+            cart_service = AsyncCartService(db)
+            await cart_service.add_to_cart(AuthManager.get_current_user_id(), product_id, 1)
+        ui.notify('Product added to cart!', type='positive')
     except Exception as e:
         ui.notify(f'Error adding to cart: {str(e)}', type='negative')
\ No newline at end of file
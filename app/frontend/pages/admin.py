@@ -1,21 +1,36 @@
 """Admin panel for store management."""
 
+import asyncio
+from datetime import datetime
 from nicegui import ui
 from app.frontend.components.layout import page_layout
-from app.services.product_service import ProductService
-from app.services.category_service import CategoryService
-from app.services.order_service import OrderService
-from app.services.user_service import UserService
-from app.core.database import Session, engine
+from app.services.product_service import AsyncProductService
+from app.services.category_service import AsyncCategoryService
+from app.services.order_service import AsyncOrderService
+from app.services.user_service import AsyncUserService
+from app.core.database import AsyncSessionLocal
 from app.core.auth import AuthManager, require_admin
 from app.models.order import OrderStatus
+from app.core.jobs import job_queue
+from app.core.hashing import password_hasher
+from app.core.login_throttle import login_throttle
+from app.core.sessions import session_store
+from app.core.response_cache import response_cache
+from app.core.rate_limit import rate_limiter
+from app.core.compression import compressed_cache
+from app.core.query_stats import query_monitor, track_queries
+from app.core.timing import timing_monitor
+from app.core.tracing import tracer, STATUS_ERROR
+from app.core.admission import admission_controller
+from app.core.profiling import profiler
+from app.core.config import settings
 
 @ui.page('/admin')
 @require_admin
-def admin_page():
+async def admin_page():
     """Admin dashboard."""
     
-    def admin_content():
+    async def admin_content():
         ui.label('Admin Dashboard').classes('text-3xl font-bold mb-8 text-center')
         
         # Admin navigation tabs
@@ -24,25 +39,40 @@ def admin_page():
             orders_tab = ui.tab('Orders')
             users_tab = ui.tab('Users')
             analytics_tab = ui.tab('Analytics')
+            diagnostics_tab = ui.tab('Diagnostics')
+            traces_tab = ui.tab('Traces')
+            profiling_tab = ui.tab('Profiling')
         
         with ui.tab_panels(tabs, value=products_tab).classes('w-full'):
             # Products management
             with ui.tab_panel(products_tab):
-                products_management()
+                await products_management()
             
             # Orders management
             with ui.tab_panel(orders_tab):
-                orders_management()
+                await orders_management()
             
             # Users management
             with ui.tab_panel(users_tab):
-                users_management()
+                await users_management()
             
             # Analytics
             with ui.tab_panel(analytics_tab):
-                analytics_dashboard()
+                await analytics_dashboard()
+            
+            # Query diagnostics
+            with ui.tab_panel(diagnostics_tab):
+                diagnostics_panel()
+            
+            # Slowest sampled traces
+            with ui.tab_panel(traces_tab):
+                traces_panel()
+            
+            # On-demand stack sampling and cProfile
+            with ui.tab_panel(profiling_tab):
+                profiling_panel()
     
-    def products_management():
+    async def products_management():
         """Products management interface."""
         ui.label('Products Management').classes('text-2xl font-bold mb-6')
         
@@ -52,45 +82,45 @@ def admin_page():
         
         products_container = ui.column().classes('w-full')
         
-        def load_products():
+        async def load_products():
             """Load and display products."""
-            products_container.clear()
-            
             try:
-                with Session(engine) as db:
-                    product_service = ProductService(db)
-                    products = product_service.get_products(limit=100)
-                    
-                    with products_container:
-                        if products:
-                            with ui.table(columns=[
-                                {'name': 'id', 'label': 'ID', 'field': 'id'},
-                                {'name': 'name', 'label': 'Name', 'field': 'name'},
-                                {'name': 'category', 'label': 'Category', 'field': 'category'},
-                                {'name': 'price', 'label': 'Price', 'field': 'price'},
-                                {'name': 'stock', 'label': 'Stock', 'field': 'stock'},
-                                {'name': 'status', 'label': 'Status', 'field': 'status'},
-                                {'name': 'actions', 'label': 'Actions', 'field': 'actions'}
-                            ]).classes('w-full') as table:
-                                
-                                for product in products:
-                                    table.add_row({
-                                        'id': product.id,
-                                        'name': product.name,
-                                        'category': product.category.name,
-                                        'price': f'${product.price:.2f}',
-                                        'stock': product.stock_quantity,
-                                        'status': 'Active' if product.is_active else 'Inactive',
-                                        'actions': f'Edit | Delete'
-                                    })
-                        else:
-                            ui.label('No products found').classes('text-gray-500')
-            
+                async with AsyncSessionLocal() as db:
+                    product_service = AsyncProductService(db)
+                    products = await product_service.get_products(limit=100)
+                
+                products_container.clear()
+                with products_container:
+                    if products:
+                        with ui.table(columns=[
+                            {'name': 'id', 'label': 'ID', 'field': 'id'},
+                            {'name': 'name', 'label': 'Name', 'field': 'name'},
+                            {'name': 'category', 'label': 'Category', 'field': 'category'},
+                            {'name': 'price', 'label': 'Price', 'field': 'price'},
+                            {'name': 'stock', 'label': 'Stock', 'field': 'stock'},
+                            {'name': 'status', 'label': 'Status', 'field': 'status'},
+                            {'name': 'actions', 'label': 'Actions', 'field': 'actions'}
+                        ]).classes('w-full') as table:
+                            
+                            for product in products:
+                                table.add_row({
+                                    'id': product.id,
+                                    'name': product.name,
+                                    'category': product.category.name,
+                                    'price': f'${product.price:.2f}',
+                                    'stock': product.stock_quantity,
+                                    'status': 'Active' if product.is_active else 'Inactive',
+                                    'actions': f'Edit | Delete'
+                                })
+                    else:
+                        ui.label('No products found').classes('text-gray-500')
+        
             except Exception as e:
+                products_container.clear()
                 with products_container:
                     ui.label(f'Error loading products: {str(e)}').classes('text-red-500')
         
-        def show_add_product_dialog():
+        async def show_add_product_dialog():
             """Show add product dialog."""
             with ui.dialog() as dialog, ui.card().classes('w-96'):
                 ui.label('Add New Product').classes('text-xl font-bold mb-4')
@@ -106,11 +136,11 @@ def admin_page():
                 
                 # Load categories
                 try:
-                    with Session(engine) as db:
-                        category_service = CategoryService(db)
-                        categories = category_service.get_categories()
-                        category_options = {str(cat.id): cat.name for cat in categories}
-                        category_select.options = category_options
+                    async with AsyncSessionLocal() as db:
+                        category_service = AsyncCategoryService(db)
+                        categories = await category_service.get_categories()
+                    category_options = {str(cat.id): cat.name for cat in categories}
+                    category_select.options = category_options
                 except Exception:
                     pass
                 
@@ -118,15 +148,15 @@ def admin_page():
                     ui.button('Cancel', on_click=dialog.close)
                     ui.button('Add Product', on_click=lambda: add_product()).classes('luxury-button')
                 
-                def add_product():
+                async def add_product():
                     """Add new product."""
                     if not all([name_input.value, price_input.value, category_select.value]):
                         ui.notify('Please fill in required fields', type='warning')
                         return
                     
                     try:
-                        with Session(engine) as db:
-                            product_service = ProductService(db)
+                        async with AsyncSessionLocal() as db:
+                            product_service = AsyncProductService(db)
                             product_data = {
                                 'name': name_input.value,
                                 'description': description_input.value,
@@ -136,10 +166,10 @@ def admin_page():
                                 'category_id': int(category_select.value)
                             }
                             
-                            product_service.create_product(product_data)
-                            ui.notify('Product added successfully!', type='positive')
-                            dialog.close()
-                            load_products()
+                            await product_service.create_product(product_data)
+                        ui.notify('Product added successfully!', type='positive')
+                        dialog.close()
+                        await load_products()
                     
                     except Exception as e:
                         ui.notify(f'Error adding product: {str(e)}', type='negative')
@@ -147,121 +177,119 @@ def admin_page():
             dialog.open()
         
         # Initial load
-        load_products()
+        await load_products()
     
-    def orders_management():
+    async def orders_management():
         """Orders management interface."""
         ui.label('Orders Management').classes('text-2xl font-bold mb-6')
         
         orders_container = ui.column().classes('w-full')
         
-        def load_orders():
+        @track_queries('/admin:load_orders')
+        async def load_orders():
             """Load and display orders."""
-            orders_container.clear()
-            
             try:
-                with Session(engine) as db:
-                    order_service = OrderService(db)
-                    orders = order_service.get_all_orders()
-                    
-                    with orders_container:
-                        if orders:
-                            for order in orders:
-                                with ui.card().classes('w-full mb-4'):
-                                    with ui.card_section():
-                                        with ui.row().classes('justify-between items-center mb-2'):
-                                            ui.label(f'Order #{order.order_number}').classes('text-lg font-bold')
-                                            
-                                            # Status selector
-                                            status_select = ui.select(
-                                                options={status.value: status.value.title() for status in OrderStatus},
-                                                value=order.status.value,
-                                                on_change=lambda e, o=order: update_order_status(o.id, e.value)
-                                            ).classes('w-32')
-                                        
-                                        with ui.row().classes('justify-between mb-2'):
-                                            ui.label(f'Customer: {order.user.username}')
-                                            ui.label(f'Total: ${order.total_amount:.2f}').classes('font-bold text-yellow-600')
+                async with AsyncSessionLocal() as db:
+                    order_service = AsyncOrderService(db)
+                    orders = await order_service.get_all_order_summaries()
+                
+                orders_container.clear()
+                with orders_container:
+                    if orders:
+                        for order in orders:
+                            with ui.card().classes('w-full mb-4'):
+                                with ui.card_section():
+                                    with ui.row().classes('justify-between items-center mb-2'):
+                                        ui.label(f'Order #{order.order_number}').classes('text-lg font-bold')
                                         
-                                        ui.label(f'Date: {order.created_at.strftime("%B %d, %Y %I:%M %p")}').classes('text-sm text-gray-600')
-                                        ui.label(f'Items: {len(order.items)}').classes('text-sm text-gray-600')
-                        else:
-                            ui.label('No orders found').classes('text-gray-500')
-            
+                                        # Status selector
+                                        status_select = ui.select(
+                                            options={status.value: status.value.title() for status in OrderStatus},
+                                            value=order.status.value,
+                                            on_change=lambda e, o=order: update_order_status(o.id, e.value)
+                                        ).classes('w-32')
+                                    
+                                    with ui.row().classes('justify-between mb-2'):
+                                        ui.label(f'Customer: {order.customer}')
+                                        ui.label(f'Total: ${order.total_amount:.2f}').classes('font-bold text-yellow-600')
+                                    
+                                    ui.label(f'Date: {order.created_at.strftime("%B %d, %Y %I:%M %p")}').classes('text-sm text-gray-600')
+                                    ui.label(f'Items: {len(order.items)}').classes('text-sm text-gray-600')
+                    else:
+                        ui.label('No orders found').classes('text-gray-500')
+        
             except Exception as e:
+                orders_container.clear()
                 with orders_container:
                     ui.label(f'Error loading orders: {str(e)}').classes('text-red-500')
         
-        def update_order_status(order_id: int, new_status: str):
+        async def update_order_status(order_id: int, new_status: str):
             """Update order status."""
             try:
-                with Session(engine) as db:
-                    order_service = OrderService(db)
-                    order_service.update_order_status(order_id, OrderStatus(new_status))
-                    ui.notify('Order status updated', type='positive')
+                async with AsyncSessionLocal() as db:
+                    order_service = AsyncOrderService(db)
+                    await order_service.update_order_status(order_id, OrderStatus(new_status))
+                ui.notify('Order status updated', type='positive')
             except Exception as e:
                 ui.notify(f'Error updating status: {str(e)}', type='negative')
         
         # Initial load
-        load_orders()
+        await load_orders()
     
-    def users_management():
+    async def users_management():
         """Users management interface."""
         ui.label('Users Management').classes('text-2xl font-bold mb-6')
         
         users_container = ui.column().classes('w-full')
         
-        def load_users():
+        async def load_users():
             """Load and display users."""
-            users_container.clear()
-            
             try:
-                with Session(engine) as db:
+                async with AsyncSessionLocal() as db:
                     # Simple query to get all users (you might want to add pagination)
-                    from sqlalchemy import select
-                    from app.models.user import User
-                    
-                    stmt = select(User).order_by(User.created_at.desc())
-                    users = db.execute(stmt).scalars().all()
-                    
-                    with users_container:
-                        if users:
-                            with ui.table(columns=[
-                                {'name': 'id', 'label': 'ID', 'field': 'id'},
-                                {'name': 'username', 'label': 'Username', 'field': 'username'},
-                                {'name': 'email', 'label': 'Email', 'field': 'email'},
-                                {'name': 'full_name', 'label': 'Full Name', 'field': 'full_name'},
-                                {'name': 'status', 'label': 'Status', 'field': 'status'},
-                                {'name': 'admin', 'label': 'Admin', 'field': 'admin'},
-                                {'name': 'created', 'label': 'Created', 'field': 'created'}
-                            ]).classes('w-full') as table:
-                                
-                                for user in users:
-                                    table.add_row({
-                                        'id': user.id,
-                                        'username': user.username,
-                                        'email': user.email,
-                                        'full_name': user.full_name or 'N/A',
-                                        'status': 'Active' if user.is_active else 'Inactive',
-                                        'admin': 'Yes' if user.is_admin else 'No',
-                                        'created': user.created_at.strftime('%Y-%m-%d')
-                                    })
-                        else:
-                            ui.label('No users found').classes('text-gray-500')
-            
+                    user_service = AsyncUserService(db)
+                    users = await user_service.get_users()
+                
+                users_container.clear()
+                with users_container:
+                    if users:
+                        with ui.table(columns=[
+                            {'name': 'id', 'label': 'ID', 'field': 'id'},
+                            {'name': 'username', 'label': 'Username', 'field': 'username'},
+                            {'name': 'email', 'label': 'Email', 'field': 'email'},
+                            {'name': 'full_name', 'label': 'Full Name', 'field': 'full_name'},
+                            {'name': 'status', 'label': 'Status', 'field': 'status'},
+                            {'name': 'admin', 'label': 'Admin', 'field': 'admin'},
+                            {'name': 'created', 'label': 'Created', 'field': 'created'}
+                        ]).classes('w-full') as table:
+                            
+                            for user in users:
+                                table.add_row({
+                                    'id': user.id,
+                                    'username': user.username,
+                                    'email': user.email,
+                                    'full_name': user.full_name or 'N/A',
+                                    'status': 'Active' if user.is_active else 'Inactive',
+                                    'admin': 'Yes' if user.is_admin else 'No',
+                                    'created': user.created_at.strftime('%Y-%m-%d')
+                                })
+                    else:
+                        ui.label('No users found').classes('text-gray-500')
+        
             except Exception as e:
+                users_container.clear()
                 with users_container:
                     ui.label(f'Error loading users: {str(e)}').classes('text-red-500')
         
         # Initial load
-        load_users()
+        await load_users()
     
-    def analytics_dashboard():
+    async def analytics_dashboard():
         """Analytics dashboard."""
         ui.label('Analytics Dashboard').classes('text-2xl font-bold mb-6')
         
         try:
-            with Session(engine) as db:
+            async with AsyncSessionLocal() as db:
                 # Get basic statistics
                 from sqlalchemy import select, func
                 from app.models.user import User
@@ -269,32 +297,298 @@ def admin_page():
                 from app.models.order import Order
                 
                 # Count statistics
-                total_users = db.execute(select(func.count(User.id))).scalar()
-                total_products = db.execute(select(func.count(Product.id))).scalar()
-                total_orders = db.execute(select(func.count(Order.id))).scalar()
-                total_revenue = db.execute(select(func.sum(Order.total_amount))).scalar() or 0
+                total_users = (await db.execute(select(func.count(User.id)))).scalar()
+                total_products = (await db.execute(select(func.count(Product.id)))).scalar()
+                total_orders = (await db.execute(select(func.count(Order.id)))).scalar()
+                total_revenue = (await db.execute(select(func.sum(Order.total_amount)))).scalar() or 0
+            
+            # Display statistics
+            with ui.row().classes('gap-6 mb-8'):
+                with ui.card().classes('p-6 text-center'):
+                    ui.label(str(total_users)).classes('text-3xl font-bold text-blue-600')
+                    ui.label('Total Users').classes('text-gray-600')
                 
-                # Display statistics
-                with ui.row().classes('gap-6 mb-8'):
-                    with ui.card().classes('p-6 text-center'):
-                        ui.label(str(total_users)).classes('text-3xl font-bold text-blue-600')
-                        ui.label('Total Users').classes('text-gray-600')
-                    
-                    with ui.card().classes('p-6 text-center'):
-                        ui.label(str(total_products)).classes('text-3xl font-bold text-green-600')
-                        ui.label('Total Products').classes('text-gray-600')
-                    
-                    with ui.card().classes('p-6 text-center'):
-                        ui.label(str(total_orders)).classes('text-3xl font-bold text-yellow-600')
-                        ui.label('Total Orders').classes('text-gray-600')
-                    
-                    with ui.card().classes('p-6 text-center'):
-                        ui.label(f'${total_revenue:.2f}').classes('text-3xl font-bold text-purple-600')
-                        ui.label('Total Revenue').classes('text-gray-600')
+                with ui.card().classes('p-6 text-center'):
+                    ui.label(str(total_products)).classes('text-3xl font-bold text-green-600')
+                    ui.label('Total Products').classes('text-gray-600')
                 
-                ui.label('More detailed analytics coming soon...').classes('text-gray-600 text-center')
-        
+                with ui.card().classes('p-6 text-center'):
+                    ui.label(str(total_orders)).classes('text-3xl font-bold text-yellow-600')
+                    ui.label('Total Orders').classes('text-gray-600')
+                
+                with ui.card().classes('p-6 text-center'):
+                    ui.label(f'${total_revenue:.2f}').classes('text-3xl font-bold text-purple-600')
+                    ui.label('Total Revenue').classes('text-gray-600')
+
+            # Background job queue
+            job_metrics = await asyncio.to_thread(job_queue.metrics)
+            ui.label('Background Jobs').classes('text-xl font-bold mb-4')
+            ui.label(', '.join(f'{status}: {count}' for status, count in job_metrics['queue'].items()) or 'Queue empty').classes('text-gray-600 mb-2')
+            if job_metrics['job_types']:
+                with ui.table(columns=[
+                    {'name': 'job_type', 'label': 'Job Type', 'field': 'job_type'},
+                    {'name': 'enqueued', 'label': 'Enqueued', 'field': 'enqueued'},
+                    {'name': 'succeeded', 'label': 'Succeeded', 'field': 'succeeded'},
+                    {'name': 'retried', 'label': 'Retried', 'field': 'retried'},
+                    {'name': 'failed', 'label': 'Failed', 'field': 'failed'},
+                    {'name': 'avg_ms', 'label': 'Avg ms', 'field': 'avg_duration_ms'},
+                    {'name': 'max_ms', 'label': 'Max ms', 'field': 'max_duration_ms'}
+                ]).classes('w-full mb-8') as table:
+                    for job_type, stats in job_metrics['job_types'].items():
+                        table.add_row({'job_type': job_type, **stats})
+
+            # Password hashing pool
+            hash_metrics = password_hasher.metrics()
+            ui.label('Password Hashing').classes('text-xl font-bold mb-4')
+            ui.label(f"bcrypt cost {hash_metrics['rounds']}, {hash_metrics['workers']} workers, "
+                     f"queue depth {hash_metrics['queue_depth']}/{hash_metrics['max_queue']}").classes('text-gray-600 mb-2')
+            with ui.table(columns=[
+                {'name': 'operation', 'label': 'Operation', 'field': 'operation'},
+                {'name': 'count', 'label': 'Calls', 'field': 'count'},
+                {'name': 'rejected', 'label': 'Rejected', 'field': 'rejected'},
+                {'name': 'avg_latency_ms', 'label': 'Avg ms', 'field': 'avg_latency_ms'},
+                {'name': 'max_latency_ms', 'label': 'Max ms', 'field': 'max_latency_ms'},
+                {'name': 'avg_wait_ms', 'label': 'Avg Wait ms', 'field': 'avg_wait_ms'},
+                {'name': 'max_wait_ms', 'label': 'Max Wait ms', 'field': 'max_wait_ms'}
+            ]).classes('w-full mb-8') as table:
+                for operation in ('hash', 'verify'):
+                    table.add_row({'operation': operation, **hash_metrics[operation]})
+
+            throttle_stats = login_throttle.stats()
+            ui.label('Login Throttling').classes('text-xl font-bold mb-4')
+            ui.label(f"{throttle_stats['blocked_accounts']} of {throttle_stats['tracked_accounts']} accounts and "
+                     f"{throttle_stats['blocked_ips']} of {throttle_stats['tracked_ips']} IPs locked out, "
+                     f"{throttle_stats['rejected']} attempts refused before hashing").classes('text-gray-600 mb-8')
+
+            limit_stats = rate_limiter.stats()
+            ui.label('Rate Limiting').classes('text-xl font-bold mb-4')
+            ui.label(f"{limit_stats['allowed']} requests allowed, {limit_stats['rejected']} rejected, "
+                     f"{limit_stats['clients']} clients tracked, "
+                     f"{limit_stats['errors']} backend errors").classes('text-gray-600 mb-8')
+
+            admission_stats = admission_controller.stats()
+            ui.label('Admission Control').classes('text-xl font-bold mb-4')
+            ui.label(f"{admission_stats['in_flight']} requests in flight, event loop lag {admission_stats['lag_ms']} ms, "
+                     f"{admission_stats['admitted']} admitted, {admission_stats['shed_low']} low-priority and "
+                     f"{admission_stats['shed_normal']} normal requests shed").classes('text-gray-600 mb-8')
+
+            session_stats = session_store.stats()
+            ui.label('Sessions').classes('text-xl font-bold mb-4')
+            ui.label(f"{session_stats['backend']}: {session_stats['cached']} cached, {session_stats['pending']} pending, "
+                     f"{session_stats['hits']} cache hits, {session_stats['loads']} loads, "
+                     f"{session_stats['written']} written in {session_stats['flushes']} flushes, "
+                     f"{session_stats['purged']} purged").classes('text-gray-600 mb-8')
+
+            cache_stats = response_cache.stats()
+            ui.label('Response Cache').classes('text-xl font-bold mb-4')
+            ui.label(f"{cache_stats['entries']} entries, {cache_stats['bytes'] / 1024:.0f} of "
+                     f"{cache_stats['max_bytes'] / 1024:.0f} KB, hit rate {cache_stats['hit_rate']:.1%} "
+                     f"({cache_stats['hits']} hits, {cache_stats['misses']} misses), "
+                     f"{cache_stats['evictions']} evicted, {cache_stats['purged']} purged").classes('text-gray-600 mb-8')
+
+            compression_stats = compressed_cache.stats()
+            ui.label('Compression').classes('text-xl font-bold mb-4')
+            ui.label(f"{compression_stats['entries']} compressed bodies cached "
+                     f"({compression_stats['bytes'] / 1024:.0f} KB), hit rate {compression_stats['hit_rate']:.1%}, "
+                     f"compressed to {compression_stats['ratio']:.1%} of original size").classes('text-gray-600 mb-8')
+
+            ui.label('More detailed analytics coming soon...').classes('text-gray-600 text-center')
+    
         except Exception as e:
             ui.label(f'Error loading analytics: {str(e)}').classes('text-red-500')
     
-    page_layout(admin_content, "Admin Dashboard - Versace Perfumes")
\ No newline at end of file
+    def diagnostics_panel():
+        """Per-route SQL statement statistics and N+1 warnings."""
+        ui.label('Query Diagnostics').classes('text-2xl font-bold mb-6')
+        
+        with ui.row().classes('w-full justify-between mb-6'):
+            ui.label(f'Routes running the same statement more than {query_monitor.n_plus_one_threshold} times per request are flagged as N+1').classes('text-gray-600')
+            with ui.row().classes('gap-2'):
+                ui.button('Refresh', on_click=lambda: load_diagnostics()).classes('border border-gray-400')
+                ui.button('Reset', on_click=lambda: reset_diagnostics()).classes('border border-gray-400')
+        
+        diagnostics_container = ui.column().classes('w-full')
+        
+        def load_diagnostics():
+            """Render the current per-route aggregates."""
+            diagnostics_container.clear()
+            route_stats = query_monitor.route_stats()
+            route_latencies = timing_monitor.route_latencies()
+            
+            with diagnostics_container:
+                if route_latencies:
+                    ui.label('Request Latency').classes('text-xl font-bold mb-2')
+                    with ui.table(columns=[
+                        {'name': 'route', 'label': 'Route', 'field': 'route', 'align': 'left'},
+                        {'name': 'requests', 'label': 'Requests', 'field': 'requests'},
+                        {'name': 'avg_ms', 'label': 'Avg ms', 'field': 'avg_ms'},
+                        {'name': 'p50_ms', 'label': 'p50 ms', 'field': 'p50_ms'},
+                        {'name': 'p95_ms', 'label': 'p95 ms', 'field': 'p95_ms'},
+                        {'name': 'p99_ms', 'label': 'p99 ms', 'field': 'p99_ms'},
+                        {'name': 'max_ms', 'label': 'Max ms', 'field': 'max_ms'}
+                    ]).classes('w-full mb-6') as latency_table:
+                        for route, latency in route_latencies.items():
+                            latency_table.add_row({'route': route, **latency})
+                
+                if not route_stats:
+                    ui.label('No queries recorded yet').classes('text-gray-500')
+                    return
+                
+                with ui.table(columns=[
+                    {'name': 'route', 'label': 'Route', 'field': 'route', 'align': 'left'},
+                    {'name': 'requests', 'label': 'Requests', 'field': 'requests'},
+                    {'name': 'avg_statements', 'label': 'Avg Queries', 'field': 'avg_statements'},
+                    {'name': 'max_statements', 'label': 'Max Queries', 'field': 'max_statements'},
+                    {'name': 'avg_ms', 'label': 'Avg DB ms', 'field': 'avg_ms'},
+                    {'name': 'total_ms', 'label': 'Total DB ms', 'field': 'total_ms'},
+                    {'name': 'n_plus_one', 'label': 'N+1 Hits', 'field': 'n_plus_one'}
+                ]).classes('w-full mb-6') as table:
+                    for route, stats in route_stats.items():
+                        table.add_row({'route': route, **{k: v for k, v in stats.items() if not isinstance(v, (list, dict))}})
+                
+                for route, stats in route_stats.items():
+                    with ui.expansion(f'{route} - slowest statements', icon='warning' if stats['n_plus_one'] else 'storage').classes('w-full'):
+                        for shape, count in stats['suspect_shapes'].items():
+                            ui.label(f'N+1 suspect ({count}x): {shape}').classes('text-sm text-red-600 font-mono')
+                        for slow in stats['slowest']:
+                            ui.label(f'{slow["ms"]:.2f} ms: {slow["sql"]}').classes('text-sm text-gray-700 font-mono')
+        
+        def reset_diagnostics():
+            query_monitor.reset()
+            timing_monitor.reset()
+            load_diagnostics()
+        
+        # Initial load
+        load_diagnostics()
+    
+    def traces_panel():
+        """Waterfalls of the slowest traces kept by the sampler."""
+        ui.label('Slowest Traces').classes('text-2xl font-bold mb-6')
+        
+        with ui.row().classes('w-full justify-between mb-6'):
+            stats = tracer.stats()
+            ui.label(f'{stats["sampler"].title()} sampling: {stats["kept"]} of {stats["started"]} traces kept, '
+                     f'{stats["written"]} written to {tracer.exporter.path}').classes('text-gray-600')
+            with ui.row().classes('gap-2'):
+                ui.button('Refresh', on_click=lambda: load_traces()).classes('border border-gray-400')
+                ui.button('Reset', on_click=lambda: reset_traces()).classes('border border-gray-400')
+        
+        traces_container = ui.column().classes('w-full')
+        
+        def load_traces():
+            """Render one waterfall per trace: a bar per span, indented by nesting depth."""
+            traces_container.clear()
+            traces = tracer.slowest_traces()
+            
+            with traces_container:
+                if not traces:
+                    ui.label('No traces kept yet').classes('text-gray-500')
+                    return
+                
+                for spans in traces:
+                    root = next((span for span in spans if not span.parent_id), spans[0])
+                    total_ns = max(root.end_ns - root.start_ns, 1)
+                    depths = {root.span_id: 0}
+                    title = f'{root.duration_ms:.1f} ms - {root.name} ({len(spans)} spans)'
+                    with ui.expansion(title, icon='error' if root.record.error else 'timeline').classes('w-full'):
+                        ui.label(f'Trace {root.trace_id}').classes('text-xs text-gray-500 font-mono')
+                        for span in spans:
+                            depth = depths[span.span_id] = depths.get(span.parent_id, -1) + 1
+                            offset = (span.start_ns - root.start_ns) / total_ns * 100
+                            width = max((span.end_ns - span.start_ns) / total_ns * 100, 0.3)
+                            color = '#dc2626' if span.status == STATUS_ERROR else '#6b7280' if span.name == 'db.query' else '#2563eb'
+                            label = span.attributes.get('db.statement', span.name) if span.name == 'db.query' else span.name
+                            with ui.row().classes('w-full items-center no-wrap gap-2'):
+                                ui.label(label).classes('text-xs font-mono truncate').style(
+                                    f'width: 35%; padding-left: {depth * 12}px').tooltip(str(label))
+                                with ui.element('div').classes('relative h-3').style('width: 50%'):
+                                    ui.element('div').classes('absolute h-3 rounded').style(
+                                        f'left: {offset:.2f}%; width: {width:.2f}%; background: {color}')
+                                ui.label(f'{span.duration_ms:.2f} ms').classes('text-xs text-gray-600')
+        
+        def reset_traces():
+            tracer.reset()
+            load_traces()
+        
+        # Initial load
+        load_traces()
+    
+    def profiling_panel():
+        """Start stack sampling or a cProfile capture and download the results."""
+        ui.label('Profiling').classes('text-2xl font-bold mb-6')
+        ui.label('Profiles cover this worker process only. Stack samples are in collapsed format for '
+                 'flamegraph.pl or speedscope; .prof files open with pstats or snakeviz.').classes('text-gray-600 mb-6')
+        
+        with ui.row().classes('w-full gap-6 mb-6'):
+            with ui.card().classes('p-4'):
+                ui.label('Stack Sampler').classes('text-xl font-bold mb-2')
+                seconds_input = ui.number('Seconds', value=10, min=1, max=settings.profiling_max_seconds)
+                interval_input = ui.number('Interval (ms)', value=settings.profiling_interval_ms, min=1, max=1000)
+                idle_checkbox = ui.checkbox('Include idle threads')
+                ui.button('Sample', on_click=lambda: start_sampling()).classes('luxury-button mt-2')
+            
+            with ui.card().classes('p-4'):
+                ui.label('cProfile a Route').classes('text-xl font-bold mb-2')
+                route_input = ui.input('Route', placeholder='/products or GET /api/v1/products/{id}').classes('w-72')
+                requests_input = ui.number('Requests', value=20, min=1, max=1000)
+                with ui.row().classes('gap-2 mt-2'):
+                    ui.button('Profile', on_click=lambda: start_route_profile()).classes('luxury-button')
+                    ui.button('Stop', on_click=lambda: profiler.route_profiler.finish()).classes('border border-gray-400')
+        
+        status_label = ui.label().classes('text-gray-600 mb-4')
+        results_container = ui.column().classes('w-full')
+        shown = {'results': None}
+        
+        def start_sampling():
+            try:
+                profiler.sample_stacks(float(seconds_input.value or 10), float(interval_input.value or 0),
+                                       include_idle=idle_checkbox.value)
+                ui.notify(f'Sampling stacks for {seconds_input.value:g} seconds', type='info')
+            except RuntimeError as e:
+                ui.notify(str(e), type='warning')
+        
+        def start_route_profile():
+            if not route_input.value:
+                ui.notify('Enter a route to profile', type='warning')
+                return
+            try:
+                profiler.profile_route(route_input.value, int(requests_input.value or 20), settings.profiling_max_seconds)
+                ui.notify(f'Profiling the next {int(requests_input.value or 20)} requests to {route_input.value}', type='info')
+            except RuntimeError as e:
+                ui.notify(str(e), type='warning')
+        
+        def refresh_profiling():
+            route_profiler = profiler.route_profiler
+            route_profiler.poll()
+            status = []
+            if profiler.sampler.running:
+                status.append('Stack sampling in progress')
+            if route_profiler.armed:
+                status.append(f'cProfile of {route_profiler.route}: {route_profiler.captured} captured, '
+                              f'{route_profiler.remaining} to go')
+            status_label.set_text(', '.join(status) or 'Idle')
+            
+            results = list(profiler.results)
+            if results == shown['results']:
+                return
+            shown['results'] = results
+            results_container.clear()
+            with results_container:
+                if not results:
+                    ui.label('No profiles yet').classes('text-gray-500')
+                for result in results:
+                    with ui.expansion(f"{datetime.fromtimestamp(result.created_at):%H:%M:%S} - {result.title}",
+                                      icon='local_fire_department' if result.kind == 'stacks' else 'speed').classes('w-full'):
+                        ui.button(f'Download {result.filename}',
+                                  on_click=lambda r=result: ui.download(r.data, r.filename, r.media_type)).classes('mb-2')
+                        if result.summary:
+                            ui.label('Self time by frame').classes('font-bold')
+                            for line in result.summary:
+                                ui.label(line).classes('text-xs font-mono whitespace-pre')
+                        if result.report:
+                            ui.label(result.report).classes('text-xs font-mono whitespace-pre overflow-x-auto w-full')
+        
+        refresh_profiling()
+        ui.timer(1.0, refresh_profiling)
+    
+    await page_layout(admin_content, "Admin Dashboard - Versace Perfumes")
\ No newline at end of file
@@ -2,16 +2,19 @@
 
 from nicegui import ui
 from app.frontend.components.layout import page_layout
-from app.services.user_service import UserService
-from app.core.database import Session, engine
+from app.services.user_service import AsyncUserService
+from app.core.database import AsyncSessionLocal
 from app.core.auth import AuthManager
+from app.core.exceptions import ServiceUnavailableError
+from app.core.login_throttle import client_ip, login_throttle
+import math
 import re
 
 @ui.page('/login')
-def login_page():
+async def login_page():
     """User login page."""
     
-    def login_content():
+    async def login_content():
         with ui.column().classes('items-center justify-center min-h-screen'):
             with ui.card().classes('w-full max-w-md p-8'):
                 ui.label('Login to Your Account').classes('text-2xl font-bold text-center mb-6')
@@ -25,34 +28,48 @@ def login_page():
                     ui.label("Don't have an account?")
                     ui.link('Register here', '/register').classes('text-yellow-600 hover:underline')
         
-        def handle_login():
+        async def handle_login():
             """Handle user login."""
             if not email_input.value or not password_input.value:
                 ui.notify('Please fill in all fields', type='warning')
                 return
             
+            # Refuse throttled accounts/IPs before touching the database or bcrypt; the
+            # attempt counts as failed until the password is known to be right
+            email = email_input.value
+            ip = client_ip(ui.context.client.request)
+            retry_after = login_throttle.reserve_attempt(email, ip)
+            if retry_after:
+                ui.notify(f'Too many failed attempts. Try again in {math.ceil(retry_after)} s', type='warning')
+                return
+            
             try:
-                with Session(engine) as db:
-                    user_service = UserService(db)
-                    user = user_service.authenticate_user(email_input.value, password_input.value)
-                    
-                    if user:
-                        AuthManager.login_user(user.id, user.username, user.is_admin)
-                        ui.notify(f'Welcome back, {user.username}!', type='positive')
-                        ui.navigate.to('/')
-                    else:
-                        ui.notify('Invalid email or password', type='negative')
+                async with AsyncSessionLocal() as db:
+                    user_service = AsyncUserService(db)
+                    user = await user_service.authenticate_user(email, password_input.value)
+                
+                if user:
+                    login_throttle.record_success(email, ip)
+                    AuthManager.login_user(user.id, user.username, user.is_admin)
+                    ui.notify(f'Welcome back, {user.username}!', type='positive')
+                    ui.navigate.to('/')
+                else:
+                    ui.notify('Invalid email or password', type='negative')
             
+            except ServiceUnavailableError as e:
+                # Shed by the hashing pool: the password was never checked
+                login_throttle.cancel_attempt(email, ip)
+                ui.notify(e.detail, type='warning')
             except Exception as e:
                 ui.notify(f'Login error: {str(e)}', type='negative')
     
-    page_layout(login_content, "Login - Versace Perfumes")
+    await page_layout(login_content, "Login - Versace Perfumes")
 
 @ui.page('/register')
-def register_page():
+async def register_page():
     """User registration page."""
     
-    def register_content():
+    async def register_content():
         with ui.column().classes('items-center justify-center min-h-screen'):
             with ui.card().classes('w-full max-w-md p-8'):
                 ui.label('Create Your Account').classes('text-2xl font-bold text-center mb-6')
@@ -70,7 +87,7 @@ def register_page():
                     ui.label("Already have an account?")
                     ui.link('Login here', '/login').classes('text-yellow-600 hover:underline')
         
-        def handle_register():
+        async def handle_register():
             """Handle user registration."""
             # Validation
             if not all([username_input.value, email_input.value, full_name_input.value, 
@@ -93,15 +110,15 @@ def register_page():
                 return
             
             try:
-                with Session(engine) as db:
-                    user_service = UserService(db)
+                async with AsyncSessionLocal() as db:
+                    user_service = AsyncUserService(db)
                     
                     # Check if user already exists
-                    if user_service.get_user_by_email(email_input.value):
+                    if await user_service.get_user_by_email(email_input.value):
                         ui.notify('Email already registered', type='warning')
                         return
                     
-                    if user_service.get_user_by_username(username_input.value):
+                    if await user_service.get_user_by_username(username_input.value):
                         ui.notify('Username already taken', type='warning')
                         return
                     
@@ -114,17 +131,19 @@ def register_page():
                         'password': password_input.value
                     }
                     
-                    user = user_service.create_user(user_data)
-                    
-                    # Auto-login after registration
-                    AuthManager.login_user(user.id, user.username, user.is_admin)
-                    ui.notify(f'Welcome to Versace Perfumes, {user.username}!', type='positive')
-                    ui.navigate.to('/')
+                    user = await user_service.create_user(user_data)
+                
+                # Auto-login after registration
+                AuthManager.login_user(user.id, user.username, user.is_admin)
+                ui.notify(f'Welcome to Versace Perfumes, {user.username}!', type='positive')
+                ui.navigate.to('/')
             
+            except ServiceUnavailableError as e:
+                ui.notify(e.detail, type='warning')
             except Exception as e:
                 ui.notify(f'Registration error: {str(e)}', type='negative')
     
-    page_layout(register_content, "Register - Versace Perfumes")
+    await page_layout(register_content, "Register - Versace Perfumes")
 
 @ui.page('/logout')
 def logout_page():
@@ -1,34 +1,38 @@
 """Checkout and order pages."""
 
+import time
 from nicegui import ui
 from app.frontend.components.layout import page_layout
-from app.services.cart_service import CartService
-from app.services.order_service import OrderService
-from app.services.user_service import UserService
-from app.core.database import Session, engine
+from app.services.cart_service import AsyncCartService
+from app.services.order_service import AsyncOrderService
+from app.services.user_service import AsyncUserService
+from app.services.order_processing import ORDER_FOLLOWUP_JOBS
+from app.core.database import AsyncSessionLocal
 from app.core.auth import AuthManager, require_auth
 from app.core.config import settings
+from app.core.query_stats import track_queries
+from app.core.metrics import checkout_seconds
 
 @ui.page('/checkout')
 @require_auth
-def checkout_page():
+async def checkout_page():
     """Checkout page for order completion."""
     
-    def checkout_content():
+    async def checkout_content():
         ui.label('Checkout').classes('text-3xl font-bold mb-8 text-center')
         
         # Check if cart has items
         try:
-            with Session(engine) as db:
-                cart_service = CartService(db)
-                cart_items = cart_service.get_cart_items(AuthManager.get_current_user_id())
-                
-                if not cart_items:
-                    with ui.column().classes('items-center text-center py-20'):
-                        ui.label('Your cart is empty').classes('text-xl text-gray-600 mb-4')
-                        ui.button('Continue Shopping', 
-                                 on_click=lambda: ui.navigate.to('/products')).classes('luxury-button px-8 py-3')
-                    return
+            async with AsyncSessionLocal() as db:
+                cart_service = AsyncCartService(db)
+                cart_items = await cart_service.get_cart_lines(AuthManager.get_current_user_id())
+            
+            if not cart_items:
+                with ui.column().classes('items-center text-center py-20'):
+                    ui.label('Your cart is empty').classes('text-xl text-gray-600 mb-4')
+                    ui.button('Continue Shopping', 
+                             on_click=lambda: ui.navigate.to('/products')).classes('luxury-button px-8 py-3')
+                return
         except Exception as e:
             ui.label(f'Error loading cart: {str(e)}').classes('text-red-500')
             return
@@ -43,15 +47,15 @@ def checkout_page():
                         # Pre-fill with user data if available
                         user_data = {}
                         try:
-                            with Session(engine) as db:
-                                user_service = UserService(db)
-                                user = user_service.get_user(AuthManager.get_current_user_id())
-                                if user:
-                                    user_data = {
-                                        'full_name': user.full_name or '',
-                                        'phone': user.phone or '',
-                                        'address': user.address or ''
-                                    }
+                            async with AsyncSessionLocal() as db:
+                                user_service = AsyncUserService(db)
+                                user = await user_service.get_user(AuthManager.get_current_user_id())
+                            if user:
+                                user_data = {
+                                    'full_name': user.full_name or '',
+                                    'phone': user.phone or '',
+                                    'address': user.address or ''
+                                }
                         except Exception:
                             pass
                         
@@ -81,15 +85,15 @@ def checkout_page():
                         
                         # Cart items summary
                         try:
-                            subtotal = sum(item.product.price * item.quantity for item in cart_items)
+                            subtotal = sum(item.line_total for item in cart_items)
                             tax_amount = subtotal * settings.tax_rate
                             shipping_cost = 0.0 if subtotal >= settings.free_shipping_threshold else settings.shipping_cost
                             total = subtotal + tax_amount + shipping_cost
                             
                             for item in cart_items:
                                 with ui.row().classes('justify-between mb-2'):
-                                    ui.label(f'{item.product.name} x{item.quantity}').classes('text-sm')
-                                    ui.label(f'${item.product.price * item.quantity:.2f}').classes('text-sm')
+                                    ui.label(f'{item.name} x{item.quantity}').classes('text-sm')
+                                    ui.label(f'${item.line_total:.2f}').classes('text-sm')
                             
                             ui.separator()
                             
@@ -120,20 +124,22 @@ def checkout_page():
                         except Exception as e:
                             ui.label(f'Error calculating total: {str(e)}').classes('text-red-500')
         
-        def place_order():
+        @track_queries('/checkout:place_order')
+        async def place_order():
             """Process the order."""
             # Validate form
             if not name_input.value or not address_input.value:
                 ui.notify('Please fill in all required fields', type='warning')
                 return
             
+            started = time.perf_counter()
             try:
-                with Session(engine) as db:
-                    cart_service = CartService(db)
-                    order_service = OrderService(db)
+                async with AsyncSessionLocal() as db:
+                    cart_service = AsyncCartService(db)
+                    order_service = AsyncOrderService(db)
                     
                     # Get current cart items
-                    cart_items = cart_service.get_cart_items(AuthManager.get_current_user_id())
+                    cart_items = await cart_service.get_cart_items(AuthManager.get_current_user_id())
                     
                     if not cart_items:
                         ui.notify('Cart is empty', type='warning')
@@ -147,143 +153,144 @@ def checkout_page():
                         'payment_method': payment_method.value
                     }
                     
-                    # Create order
-                    order = order_service.create_order_from_cart(
+                    # Create order, empty the cart and queue receipts and notifications in one transaction
+                    order = await order_service.create_order_from_cart(
                         AuthManager.get_current_user_id(),
                         cart_items,
-                        shipping_info
+                        shipping_info,
+                        followup_jobs=ORDER_FOLLOWUP_JOBS
                     )
-                    
-                    # Clear cart
-                    cart_service.clear_cart(AuthManager.get_current_user_id())
-                    
-                    ui.notify('Order placed successfully!', type='positive')
-                    ui.navigate.to(f'/order-confirmation/{order.id}')
+                
+                checkout_seconds.labels('placed').observe(time.perf_counter() - started)
+                
+                ui.notify('Order placed successfully!', type='positive')
+                ui.navigate.to(f'/order-confirmation/{order.id}')
             
             except Exception as e:
+                checkout_seconds.labels('failed').observe(time.perf_counter() - started)
                 ui.notify(f'Error placing order: {str(e)}', type='negative')
     
-    page_layout(checkout_content, "Checkout - Versace Perfumes")
+    await page_layout(checkout_content, "Checkout - Versace Perfumes")
 
 @ui.page('/order-confirmation/{order_id}')
 @require_auth
-def order_confirmation_page(order_id: int):
+async def order_confirmation_page(order_id: int):
     """Order confirmation page."""
     
-    def confirmation_content():
+    async def confirmation_content():
         try:
-            with Session(engine) as db:
-                order_service = OrderService(db)
-                order = order_service.get_order(order_id)
+            async with AsyncSessionLocal() as db:
+                order_service = AsyncOrderService(db)
+                order = await order_service.get_order_summary(order_id)
+            
+            if not order or order.user_id != AuthManager.get_current_user_id():
+                ui.label('Order not found').classes('text-2xl text-center text-red-500 mt-20')
+                return
+            
+            with ui.column().classes('items-center text-center max-w-2xl mx-auto'):
+                ui.icon('check_circle', size='4rem').classes('text-green-500 mb-4')
+                ui.label('Order Confirmed!').classes('text-3xl font-bold text-green-600 mb-2')
+                ui.label(f'Order #{order.order_number}').classes('text-xl text-gray-600 mb-8')
                 
-                if not order or order.user_id != AuthManager.get_current_user_id():
-                    ui.label('Order not found').classes('text-2xl text-center text-red-500 mt-20')
-                    return
+                with ui.card().classes('w-full text-left'):
+                    with ui.card_section():
+                        ui.label('Order Details').classes('text-xl font-bold mb-4')
+                        
+                        with ui.row().classes('justify-between mb-2'):
+                            ui.label('Order Date:')
+                            ui.label(order.created_at.strftime('%B %d, %Y'))
+                        
+                        with ui.row().classes('justify-between mb-2'):
+                            ui.label('Status:')
+                            ui.label(order.status.value.title()).classes('text-blue-600 font-semibold')
+                        
+                        with ui.row().classes('justify-between mb-4'):
+                            ui.label('Total:')
+                            ui.label(f'${order.total_amount:.2f}').classes('text-lg font-bold text-yellow-600')
+                        
+                        ui.separator()
+                        
+                        ui.label('Items Ordered:').classes('font-semibold mt-4 mb-2')
+                        for item in order.items:
+                            with ui.row().classes('justify-between mb-1'):
+                                ui.label(f'{item.name} x{item.quantity}')
+                                ui.label(f'${item.line_total:.2f}')
+                        
+                        ui.separator()
+                        
+                        ui.label('Shipping Address:').classes('font-semibold mt-4 mb-2')
+                        ui.label(order.shipping_name)
+                        ui.label(order.shipping_address).classes('whitespace-pre-line')
                 
-                with ui.column().classes('items-center text-center max-w-2xl mx-auto'):
-                    ui.icon('check_circle', size='4rem').classes('text-green-500 mb-4')
-                    ui.label('Order Confirmed!').classes('text-3xl font-bold text-green-600 mb-2')
-                    ui.label(f'Order #{order.order_number}').classes('text-xl text-gray-600 mb-8')
-                    
-                    with ui.card().classes('w-full text-left'):
-                        with ui.card_section():
-                            ui.label('Order Details').classes('text-xl font-bold mb-4')
-                            
-                            with ui.row().classes('justify-between mb-2'):
-                                ui.label('Order Date:')
-                                ui.label(order.created_at.strftime('%B %d, %Y'))
-                            
-                            with ui.row().classes('justify-between mb-2'):
-                                ui.label('Status:')
-                                ui.label(order.status.value.title()).classes('text-blue-600 font-semibold')
-                            
-                            with ui.row().classes('justify-between mb-4'):
-                                ui.label('Total:')
-                                ui.label(f'${order.total_amount:.2f}').classes('text-lg font-bold text-yellow-600')
-                            
-                            ui.separator()
-                            
-                            ui.label('Items Ordered:').classes('font-semibold mt-4 mb-2')
-                            for item in order.items:
-                                with ui.row().classes('justify-between mb-1'):
-                                    ui.label(f'{item.product.name} x{item.quantity}')
-                                    ui.label(f'${item.price * item.quantity:.2f}')
-                            
-                            ui.separator()
-                            
-                            ui.label('Shipping Address:').classes('font-semibold mt-4 mb-2')
-                            ui.label(order.shipping_name)
-                            ui.label(order.shipping_address).classes('whitespace-pre-line')
-                    
-                    with ui.row().classes('gap-4 mt-8'):
-                        ui.button('Continue Shopping', 
-                                 on_click=lambda: ui.navigate.to('/products')).classes('px-8 py-3')
-                        ui.button('View Orders', 
-                                 on_click=lambda: ui.navigate.to('/orders')).classes('luxury-button px-8 py-3')
-        
+                with ui.row().classes('gap-4 mt-8'):
+                    ui.button('Continue Shopping', 
+                             on_click=lambda: ui.navigate.to('/products')).classes('px-8 py-3')
+                    ui.button('View Orders', 
+                             on_click=lambda: ui.navigate.to('/orders')).classes('luxury-button px-8 py-3')
+    
         except Exception as e:
             ui.label(f'Error loading order: {str(e)}').classes('text-red-500 text-center mt-20')
     
-    page_layout(confirmation_content, "Order Confirmation - Versace Perfumes")
+    await page_layout(confirmation_content, "Order Confirmation - Versace Perfumes")
 
 @ui.page('/orders')
 @require_auth
-def orders_page():
+async def orders_page():
     """User orders history page."""
     
-    def orders_content():
+    async def orders_content():
         ui.label('My Orders').classes('text-3xl font-bold mb-8 text-center')
         
         try:
-            with Session(engine) as db:
-                order_service = OrderService(db)
-                orders = order_service.get_user_orders(AuthManager.get_current_user_id())
-                
-                if not orders:
-                    with ui.column().classes('items-center text-center py-20'):
-                        ui.icon('receipt_long', size='4rem').classes('text-gray-400 mb-4')
-                        ui.label('No orders found').classes('text-xl text-gray-600 mb-4')
-                        ui.button('Start Shopping', 
-                                 on_click=lambda: ui.navigate.to('/products')).classes('luxury-button px-8 py-3')
-                    return
-                
-                for order in orders:
-                    with ui.card().classes('w-full max-w-4xl mx-auto mb-6'):
-                        with ui.card_section():
-                            with ui.row().classes('justify-between items-center mb-4'):
-                                ui.label(f'Order #{order.order_number}').classes('text-lg font-bold')
-                                ui.label(order.status.value.title()).classes('px-3 py-1 rounded-full bg-blue-100 text-blue-800 text-sm font-semibold')
-                            
-                            with ui.row().classes('justify-between mb-4'):
-                                ui.label(f'Date: {order.created_at.strftime("%B %d, %Y")}')
-                                ui.label(f'Total: ${order.total_amount:.2f}').classes('text-lg font-bold text-yellow-600')
-                            
-                            # Order items
-                            ui.label('Items:').classes('font-semibold mb-2')
-                            for item in order.items:
-                                with ui.row().classes('justify-between mb-1'):
-                                    ui.label(f'{item.product.name} x{item.quantity}')
-                                    ui.label(f'${item.price * item.quantity:.2f}')
-                            
-                            with ui.row().classes('gap-4 mt-4'):
-                                ui.button('View Details', 
-                                         on_click=lambda o=order: ui.navigate.to(f'/order-confirmation/{o.id}'))
-                                if order.status.value in ['pending', 'confirmed']:
-                                    ui.button('Cancel Order', 
-                                             on_click=lambda o=order: cancel_order(o.id)).classes('text-red-600')
-        
+            async with AsyncSessionLocal() as db:
+                order_service = AsyncOrderService(db)
+                orders = await order_service.get_user_order_summaries(AuthManager.get_current_user_id())
+            
+            if not orders:
+                with ui.column().classes('items-center text-center py-20'):
+                    ui.icon('receipt_long', size='4rem').classes('text-gray-400 mb-4')
+                    ui.label('No orders found').classes('text-xl text-gray-600 mb-4')
+                    ui.button('Start Shopping', 
+                             on_click=lambda: ui.navigate.to('/products')).classes('luxury-button px-8 py-3')
+                return
+            
+            for order in orders:
+                with ui.card().classes('w-full max-w-4xl mx-auto mb-6'):
+                    with ui.card_section():
+                        with ui.row().classes('justify-between items-center mb-4'):
+                            ui.label(f'Order #{order.order_number}').classes('text-lg font-bold')
+                            ui.label(order.status.value.title()).classes('px-3 py-1 rounded-full bg-blue-100 text-blue-800 text-sm font-semibold')
+                        
+                        with ui.row().classes('justify-between mb-4'):
+                            ui.label(f'Date: {order.created_at.strftime("%B %d, %Y")}')
+                            ui.label(f'Total: ${order.total_amount:.2f}').classes('text-lg font-bold text-yellow-600')
+                        
+                        # Order items
+                        ui.label('Items:').classes('font-semibold mb-2')
+                        for item in order.items:
+                            with ui.row().classes('justify-between mb-1'):
+                                ui.label(f'{item.name} x{item.quantity}')
+                                ui.label(f'${item.line_total:.2f}')
+                        
+                        with ui.row().classes('gap-4 mt-4'):
+                            ui.button('View Details', 
+                                     on_click=lambda o=order: ui.navigate.to(f'/order-confirmation/{o.id}'))
+                            if order.status.value in ['pending', 'confirmed']:
+                                ui.button('Cancel Order', 
+                                         on_click=lambda o=order: cancel_order(o.id)).classes('text-red-600')
+    
         except Exception as e:
             ui.label(f'Error loading orders: {str(e)}').classes('text-red-500 text-center')
         
-        def cancel_order(order_id: int):
+        async def cancel_order(order_id: int):
             """Cancel an order."""
             try:
-                with Session(engine) as db:
-                    order_service = OrderService(db)
-                    order_service.cancel_order(order_id)
-                    ui.notify('Order cancelled successfully', type='info')
-                    ui.navigate.reload()
+                async with AsyncSessionLocal() as db:
+                    order_service = AsyncOrderService(db)
+                    await order_service.cancel_order(order_id)
+                ui.notify('Order cancelled successfully', type='info')
+                ui.navigate.reload()
             except Exception as e:
                 ui.notify(f'Error cancelling order: {str(e)}', type='negative')
     
-    page_layout(orders_content, "My Orders - Versace Perfumes")
\ No newline at end of file
+    await page_layout(orders_content, "My Orders - Versace Perfumes")
\ No newline at end of file
@@ -2,15 +2,15 @@
 
 from nicegui import ui
 from app.frontend.components.layout import page_layout, product_card
-from app.services.product_service import ProductService
-from app.services.category_service import CategoryService
-from app.core.database import Session, engine
+from app.services.product_service import AsyncProductService
+from app.services.category_service import AsyncCategoryService
+from app.core.database import AsyncSessionLocal
 
 @ui.page('/')
-def home_page():
+async def home_page():
     """Home page with hero section and featured products."""
     
-    def home_content():
+    async def home_content():
         # Hero section
         with ui.element('div').classes('bg-black text-white py-20 px-8 text-center'):
             ui.label('VERSACE').classes('text-6xl font-bold tracking-widest text-yellow-400')
@@ -27,23 +27,23 @@ def home_page():
             
             with ui.row().classes('justify-center gap-8 flex-wrap'):
                 try:
-                    with Session(engine) as db:
-                        category_service = CategoryService(db)
-                        categories = category_service.get_categories()
-                        
-                        for category in categories:
-                            with ui.card().classes('w-80 cursor-pointer hover:shadow-xl transition-all duration-300'):
-                                if category.image_url:
-                                    ui.image(category.image_url).classes('w-full h-48 object-cover')
-                                else:
-                                    with ui.element('div').classes('w-full h-48 bg-gradient-to-br from-gray-800 to-black flex items-center justify-center'):
-                                        ui.icon('category', size='4rem').classes('text-yellow-400')
-                                
-                                with ui.card_section():
-                                    ui.label(category.name).classes('text-xl font-semibold text-gray-800')
-                                    ui.label(category.description or 'Explore our collection').classes('text-gray-600 mt-2')
-                                    ui.button('Browse', 
-                                             on_click=lambda c=category: ui.navigate.to(f'/products?category={c.id}')).classes('luxury-button mt-4 w-full')
+                    async with AsyncSessionLocal() as db:
+                        category_service = AsyncCategoryService(db)
+                        categories = await category_service.get_categories()
+                    
+                    for category in categories:
+                        with ui.card().classes('w-80 cursor-pointer hover:shadow-xl transition-all duration-300'):
+                            if category.image_url:
+                                ui.image(category.image_url).classes('w-full h-48 object-cover')
+                            else:
+                                with ui.element('div').classes('w-full h-48 bg-gradient-to-br from-gray-800 to-black flex items-center justify-center'):
+                                    ui.icon('category', size='4rem').classes('text-yellow-400')
+                            
+                            with ui.card_section():
+                                ui.label(category.name).classes('text-xl font-semibold text-gray-800')
+                                ui.label(category.description or 'Explore our collection').classes('text-gray-600 mt-2')
+                                ui.button('Browse', 
+                                         on_click=lambda c=category: ui.navigate.to(f'/products?category={c.id}')).classes('luxury-button mt-4 w-full')
                 
                 except Exception as e:
                     ui.label(f'Error loading categories: {str(e)}').classes('text-red-500')
@@ -54,12 +54,12 @@ def home_page():
             
             with ui.row().classes('justify-center gap-8 flex-wrap'):
                 try:
-                    with Session(engine) as db:
-                        product_service = ProductService(db)
-                        featured_products = product_service.get_featured_products(6)
-                        
-                        for product in featured_products:
-                            product_card(product)
+                    async with AsyncSessionLocal() as db:
+                        product_service = AsyncProductService(db)
+                        featured_products = await product_service.get_featured_product_cards(6)
+                    
+                    for product in featured_products:
+                        product_card(product)
                 
                 except Exception as e:
                     ui.label(f'Error loading products: {str(e)}').classes('text-red-500')
@@ -82,4 +82,4 @@ def home_page():
                         ui.label(feature['title']).classes('text-xl font-semibold mb-2')
                         ui.label(feature['desc']).classes('text-gray-300')
     
-    page_layout(home_content, "Versace Perfumes - Luxury Fragrances")
\ No newline at end of file
+    await page_layout(home_content, "Versace Perfumes - Luxury Fragrances")
\ No newline at end of file
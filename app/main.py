@@ -61,12 +61,8 @@ def about_page():
 
 
 
-# Define a health check page for Fly.io
-@ui.page('/health')
-def health_check_page():
-    # Fly.io health checks typically look for a 200 OK status.
-    # This page will return 200 OK. Content can be simple.
-    ui.label('{"status": "healthy"}')
+# Health checks are plain HTTP routes (app.api.router), not pages: a page
+# would build a NiceGUI client for every probe.
 
 
 
@@ -1,7 +1,7 @@
 """Shopping cart models."""
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import DateTime, Integer, ForeignKey, func
+from sqlalchemy import DateTime, Integer, ForeignKey, Index, func
 from datetime import datetime
 from typing import List
 from app.core.database import Base
@@ -22,8 +22,22 @@ class Cart(Base):
     def __repr__(self) -> str:
         return f"<Cart(id={self.id}, user_id={self.user_id})>"
 
+# Run by upgrade_schema before the unique index replaces the old plain one:
+# duplicate lines are merged into the oldest, with their quantities summed
+_MERGE_DUPLICATE_CART_ITEMS = (
+    "UPDATE cart_items SET quantity = (SELECT SUM(dup.quantity) FROM cart_items AS dup "
+    "WHERE dup.cart_id = cart_items.cart_id AND dup.product_id = cart_items.product_id) "
+    "WHERE id IN (SELECT MIN(id) FROM cart_items GROUP BY cart_id, product_id HAVING COUNT(*) > 1)",
+    "DELETE FROM cart_items WHERE id NOT IN (SELECT MIN(id) FROM cart_items GROUP BY cart_id, product_id)",
+)
+
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # One line per product, so concurrent adds can upsert instead of racing to insert
+        Index("ix_cart_items_cart_id_product_id", "cart_id", "product_id", unique=True,
+              info={"deduplicate": _MERGE_DUPLICATE_CART_ITEMS}),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     quantity: Mapped[int] = mapped_column(Integer, default=1)
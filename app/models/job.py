@@ -0,0 +1,39 @@
+"""Background job model for the durable post-processing queue."""
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, DateTime, Integer, Float, Text, Index, func, Enum
+from datetime import datetime
+from typing import Optional
+from enum import Enum as PyEnum
+from app.core.database import Base
+
+class JobStatus(PyEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest due job, so status + run_at is the hot path
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    job_type: Mapped[str] = mapped_column(String(100), index=True)
+    payload: Mapped[str] = mapped_column(Text, default="{}")  # JSON encoded
+
+    status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), default=JobStatus.PENDING)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=5)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    duration_ms: Mapped[Optional[float]] = mapped_column(Float)
+
+    run_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    locked_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
+
+    def __repr__(self) -> str:
+        return f"<Job(id={self.id}, job_type='{self.job_type}', status={self.status.value})>"
@@ -1,7 +1,7 @@
 """Order and order item models."""
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime, Integer, Float, Text, ForeignKey, func, Enum
+from sqlalchemy import String, DateTime, Integer, Float, Text, ForeignKey, Index, func, Enum
 from datetime import datetime
 from typing import Optional, List
 from enum import Enum as PyEnum
@@ -17,6 +17,9 @@ class OrderStatus(PyEnum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     order_number: Mapped[str] = mapped_column(String(50), unique=True, index=True)
@@ -56,7 +59,7 @@ class OrderItem(Base):
     quantity: Mapped[int] = mapped_column(Integer)
     price: Mapped[float] = mapped_column(Float)  # Price at time of order
     
-    order_id: Mapped[int] = mapped_column(Integer, ForeignKey("orders.id"))
+    order_id: Mapped[int] = mapped_column(Integer, ForeignKey("orders.id"), index=True)
     product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id"))
     
     # Relationships
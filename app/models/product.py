@@ -1,7 +1,7 @@
 """Product and category models for the e-commerce store."""
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Boolean, DateTime, Integer, Float, Text, ForeignKey, func
+from sqlalchemy import String, Boolean, DateTime, Integer, Float, Text, ForeignKey, Index, func
 from datetime import datetime
 from typing import Optional, List
 from app.core.database import Base
@@ -25,6 +25,10 @@ class Category(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_is_active_category_id", "is_active", "category_id"),
+        Index("ix_products_is_active_created_at", "is_active", "created_at"),  # featured products
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(200), index=True)
@@ -51,6 +55,9 @@ class Product(Base):
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("ix_reviews_product_id_created_at", "product_id", "created_at"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     rating: Mapped[int] = mapped_column(Integer)  # 1-5 stars
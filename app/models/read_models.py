@@ -0,0 +1,76 @@
+"""Read-only projections used by listing pages.
+
+These are plain frozen ``__slots__`` dataclasses filled from column
+projections rather than ORM entities, so they carry no session or
+instrumentation state, can be rendered after the session is closed and are
+safe to cache and share between requests.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+from app.models.order import OrderStatus
+
+@dataclass(frozen=True, slots=True)
+class ProductCard:
+    """What the product card component shows for one product."""
+    id: int
+    name: str
+    category_name: str
+    price: float
+    size: Optional[str]
+    image_url: Optional[str]
+    stock_quantity: int
+
+@dataclass(frozen=True, slots=True)
+class CartLine:
+    """One product line in a user's cart."""
+    product_id: int
+    quantity: int
+    name: str
+    category_name: str
+    price: float
+    size: Optional[str]
+    image_url: Optional[str]
+
+    @property
+    def line_total(self) -> float:
+        return self.price * self.quantity
+
+@dataclass(frozen=True, slots=True)
+class CartSummary:
+    """A user's cart lines with their totals."""
+    lines: Tuple[CartLine, ...]
+    item_count: int
+    subtotal: float
+
+    @classmethod
+    def from_lines(cls, lines) -> "CartSummary":
+        lines = tuple(lines)
+        return cls(lines, sum(line.quantity for line in lines), round(sum(line.line_total for line in lines), 2))
+
+@dataclass(frozen=True, slots=True)
+class OrderLine:
+    """One item of an order, priced at the time of purchase."""
+    product_id: int
+    name: str
+    quantity: int
+    price: float
+
+    @property
+    def line_total(self) -> float:
+        return self.price * self.quantity
+
+@dataclass(frozen=True, slots=True)
+class OrderSummary:
+    """An order with its lines, as shown on the order and admin pages."""
+    id: int
+    order_number: str
+    status: OrderStatus
+    total_amount: float
+    created_at: datetime
+    user_id: int
+    customer: Optional[str]
+    shipping_name: str
+    shipping_address: str
+    items: Tuple[OrderLine, ...] = ()
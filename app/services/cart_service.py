@@ -1,11 +1,111 @@
 """Shopping cart service."""
 
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, delete, update
+from sqlalchemy.dialects.sqlite import insert
+from app.core.exceptions import ValidationError
 from app.models.cart import Cart, CartItem
-from app.models.product import Product
-from typing import Optional, List
+from app.models.product import Product, Category
+from app.models.read_models import CartLine, CartSummary
+from app.core.tracing import traced_methods
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Iterable, Tuple
 
+def _cart_stmt(user_id: int):
+    return select(Cart).where(Cart.user_id == user_id)
+
+def _cart_items_stmt(cart_id: int):
+    return (select(CartItem)
+            .options(joinedload(CartItem.product).joinedload(Product.category))
+            .where(CartItem.cart_id == cart_id))
+
+def _cart_lines_stmt(user_id: int):
+    return (select(CartItem.product_id, CartItem.quantity, Product.name, Category.name.label("category_name"),
+                   Product.price, Product.size, Product.image_url)
+            .join(Cart, CartItem.cart_id == Cart.id)
+            .join(Product, CartItem.product_id == Product.id)
+            .join(Category, Product.category_id == Category.id)
+            .where(Cart.user_id == user_id)
+            .order_by(CartItem.id))
+
+def _cart_item_stmt(cart_id: int, product_id: int):
+    return select(CartItem).where(
+        and_(CartItem.cart_id == cart_id, CartItem.product_id == product_id)
+    )
+
+def _upsert_cart_items_stmt(add: bool):
+    """INSERT a cart line, or on an existing one add to (``add``) or replace its quantity.
+    
+    One statement, so concurrent requests can't both insert the same product.
+    """
+    stmt = insert(CartItem)
+    quantity = CartItem.quantity + stmt.excluded.quantity if add else stmt.excluded.quantity
+    return stmt.on_conflict_do_update(index_elements=[CartItem.cart_id, CartItem.product_id],
+                                      set_={"quantity": quantity})
+
+def _add_to_cart_stmt(cart_id: int, product_id: int, quantity: int):
+    return (_upsert_cart_items_stmt(add=True)
+            .values(cart_id=cart_id, product_id=product_id, quantity=quantity)
+            .returning(CartItem.id))
+
+CART_OPERATIONS = ("add", "set", "remove")
+
+@dataclass(frozen=True)
+class CartOperation:
+    """One step of a batch cart change: add to, set or remove a product's quantity."""
+    op: str
+    product_id: int
+    quantity: int = 0
+
+def _cart_quantities_stmt(cart_id: int, product_ids: Iterable[int]):
+    return (select(CartItem.product_id, CartItem.id, CartItem.quantity)
+            .where(CartItem.cart_id == cart_id, CartItem.product_id.in_(product_ids)))
+
+def _active_product_ids_stmt(product_ids: Iterable[int]):
+    return select(Product.id).where(Product.id.in_(product_ids), Product.is_active == True)
+
+def _plan_cart_batch(operations: List[CartOperation], existing: Dict[int, Tuple[int, int]]):
+    """Fold the operations, in order, into one final quantity per product.
+    
+    ``existing`` maps product ID to (cart item ID, quantity). Returns the
+    product IDs to delete, the item updates and the new products to insert,
+    split into those whose quantity adds to a line inserted concurrently
+    (only "add" operations) and those whose quantity replaces it.
+    """
+    quantities = {product_id: quantity for product_id, (_, quantity) in existing.items()}
+    absolute = set()
+    for operation in operations:
+        current = quantities.get(operation.product_id, 0)
+        if operation.op == "add":
+            quantities[operation.product_id] = current + operation.quantity
+        elif operation.op == "set":
+            quantities[operation.product_id] = operation.quantity
+            absolute.add(operation.product_id)
+        else:
+            quantities[operation.product_id] = 0
+            absolute.add(operation.product_id)
+    
+    deletes, updates, added, replaced = [], [], [], []
+    for product_id, quantity in quantities.items():
+        item_id, old_quantity = existing.get(product_id, (None, 0))
+        if quantity <= 0:
+            if item_id is not None:
+                deletes.append(product_id)
+        elif item_id is None:
+            (replaced if product_id in absolute else added).append({"product_id": product_id, "quantity": quantity})
+        elif quantity != old_quantity:
+            updates.append({"id": item_id, "quantity": quantity})
+    return deletes, updates, (added, replaced)
+
+def _validate_cart_batch(operations: List[CartOperation]) -> None:
+    for operation in operations:
+        if operation.op not in CART_OPERATIONS:
+            raise ValidationError(f"Unknown cart operation: {operation.op}")
+        if operation.op != "remove" and operation.quantity < (1 if operation.op == "add" else 0):
+            raise ValidationError(f"Invalid quantity for product {operation.product_id}")
+
+@traced_methods
 class CartService:
     """Service layer for shopping cart operations."""
     
@@ -14,8 +114,7 @@ class CartService:
     
     def get_or_create_cart(self, user_id: int) -> Cart:
         """Get user's cart or create if doesn't exist."""
-        stmt = select(Cart).where(Cart.user_id == user_id)
-        cart = self.db.execute(stmt).scalar_one_or_none()
+        cart = self.db.execute(_cart_stmt(user_id)).scalar_one_or_none()
         
         if not cart:
             cart = Cart(user_id=user_id)
@@ -28,44 +127,27 @@ class CartService:
     def get_cart_items(self, user_id: int) -> List[CartItem]:
         """Get all items in user's cart."""
         cart = self.get_or_create_cart(user_id)
-        stmt = (select(CartItem)
-                .options(joinedload(CartItem.product))
-                .where(CartItem.cart_id == cart.id))
-        result = self.db.execute(stmt)
+        result = self.db.execute(_cart_items_stmt(cart.id))
         return result.scalars().all()
     
+    def get_cart_lines(self, user_id: int) -> List[CartLine]:
+        """Get the user's cart as read-only lines (does not create a cart)."""
+        result = self.db.execute(_cart_lines_stmt(user_id))
+        return [CartLine(**row._mapping) for row in result]
+    
     def add_to_cart(self, user_id: int, product_id: int, quantity: int = 1) -> CartItem:
         """Add item to cart or update quantity if exists."""
         cart = self.get_or_create_cart(user_id)
         
-        # Check if item already in cart
-        stmt = select(CartItem).where(
-            and_(CartItem.cart_id == cart.id, CartItem.product_id == product_id)
-        )
-        existing_item = self.db.execute(stmt).scalar_one_or_none()
-        
-        if existing_item:
-            existing_item.quantity += quantity
-            self.db.commit()
-            self.db.refresh(existing_item)
-            return existing_item
-        else:
-            cart_item = CartItem(
-                cart_id=cart.id,
-                product_id=product_id,
-                quantity=quantity
-            )
-            self.db.add(cart_item)
-            self.db.commit()
-            self.db.refresh(cart_item)
-            return cart_item
+        # Insert, or add to the existing line, in one statement
+        item_id = self.db.execute(_add_to_cart_stmt(cart.id, product_id, quantity)).scalar_one()
+        self.db.commit()
+        return self.db.get(CartItem, item_id, populate_existing=True)
     
     def update_cart_item(self, user_id: int, product_id: int, quantity: int) -> Optional[CartItem]:
         """Update cart item quantity."""
         cart = self.get_or_create_cart(user_id)
-        stmt = select(CartItem).where(
-            and_(CartItem.cart_id == cart.id, CartItem.product_id == product_id)
-        )
+        stmt = _cart_item_stmt(cart.id, product_id)
         cart_item = self.db.execute(stmt).scalar_one_or_none()
         
         if cart_item:
@@ -81,9 +163,7 @@ class CartService:
     def remove_from_cart(self, user_id: int, product_id: int) -> bool:
         """Remove item from cart."""
         cart = self.get_or_create_cart(user_id)
-        stmt = select(CartItem).where(
-            and_(CartItem.cart_id == cart.id, CartItem.product_id == product_id)
-        )
+        stmt = _cart_item_stmt(cart.id, product_id)
         cart_item = self.db.execute(stmt).scalar_one_or_none()
         
         if cart_item:
@@ -105,6 +185,41 @@ class CartService:
         self.db.commit()
         return True
     
+    def apply_cart_batch(self, user_id: int, operations: List[CartOperation]) -> CartSummary:
+        """Apply many add/set/remove operations in one transaction.
+        
+        Current quantities are read with one query, the operations are folded
+        in memory, and the result is written with at most one DELETE, one
+        executemany UPDATE and two executemany upserts before a single commit.
+        """
+        _validate_cart_batch(operations)
+        product_ids = {operation.product_id for operation in operations}
+        if product_ids:
+            active = set(self.db.execute(_active_product_ids_stmt(product_ids)).scalars())
+            unknown = sorted({operation.product_id for operation in operations if operation.op != "remove"} - active)
+            if unknown:
+                raise ValidationError(f"Unknown or unavailable products: {unknown}")
+            
+            cart = self.db.execute(_cart_stmt(user_id)).scalar_one_or_none()
+            if cart is None:
+                cart = Cart(user_id=user_id)
+                self.db.add(cart)
+                self.db.flush()
+            existing = {row.product_id: (row.id, row.quantity)
+                        for row in self.db.execute(_cart_quantities_stmt(cart.id, product_ids))}
+            deletes, updates, inserts = _plan_cart_batch(operations, existing)
+            
+            if deletes:
+                self.db.execute(delete(CartItem).where(CartItem.cart_id == cart.id, CartItem.product_id.in_(deletes)))
+            if updates:
+                self.db.execute(update(CartItem), updates)
+            for add, rows in zip((True, False), inserts):
+                if rows:
+                    self.db.execute(_upsert_cart_items_stmt(add), [{"cart_id": cart.id, **row} for row in rows])
+            self.db.commit()
+        
+        return CartSummary.from_lines(self.get_cart_lines(user_id))
+    
     def get_cart_total(self, user_id: int) -> float:
         """Calculate cart total."""
         cart_items = self.get_cart_items(user_id)
@@ -114,4 +229,120 @@ class CartService:
     def get_cart_count(self, user_id: int) -> int:
         """Get total number of items in cart."""
         cart_items = self.get_cart_items(user_id)
-        return sum(item.quantity for item in cart_items)
\ No newline at end of file
+        return sum(item.quantity for item in cart_items)
+
+@traced_methods
+class AsyncCartService:
+    """Async variant of CartService for use in NiceGUI handlers."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_or_create_cart(self, user_id: int) -> Cart:
+        """Get user's cart or create if doesn't exist."""
+        cart = (await self.db.execute(_cart_stmt(user_id))).scalar_one_or_none()
+        
+        if not cart:
+            cart = Cart(user_id=user_id)
+            self.db.add(cart)
+            await self.db.commit()
+            await self.db.refresh(cart)
+        
+        return cart
+    
+    async def get_cart_items(self, user_id: int) -> List[CartItem]:
+        """Get all items in user's cart."""
+        cart = await self.get_or_create_cart(user_id)
+        result = await self.db.execute(_cart_items_stmt(cart.id))
+        return result.scalars().all()
+    
+    async def get_cart_lines(self, user_id: int) -> List[CartLine]:
+        """Get the user's cart as read-only lines (does not create a cart)."""
+        result = await self.db.execute(_cart_lines_stmt(user_id))
+        return [CartLine(**row._mapping) for row in result]
+    
+    async def add_to_cart(self, user_id: int, product_id: int, quantity: int = 1) -> CartItem:
+        """Add item to cart or update quantity if exists."""
+        cart = await self.get_or_create_cart(user_id)
+        item_id = (await self.db.execute(_add_to_cart_stmt(cart.id, product_id, quantity))).scalar_one()
+        await self.db.commit()
+        return await self.db.get(CartItem, item_id, populate_existing=True)
+    
+    async def update_cart_item(self, user_id: int, product_id: int, quantity: int) -> Optional[CartItem]:
+        """Update cart item quantity."""
+        cart = await self.get_or_create_cart(user_id)
+        cart_item = (await self.db.execute(_cart_item_stmt(cart.id, product_id))).scalar_one_or_none()
+        
+        if cart_item:
+            if quantity <= 0:
+                await self.db.delete(cart_item)
+            else:
+                cart_item.quantity = quantity
+            await self.db.commit()
+            return cart_item
+        
+        return None
+    
+    async def remove_from_cart(self, user_id: int, product_id: int) -> bool:
+        """Remove item from cart."""
+        cart = await self.get_or_create_cart(user_id)
+        cart_item = (await self.db.execute(_cart_item_stmt(cart.id, product_id))).scalar_one_or_none()
+        
+        if cart_item:
+            await self.db.delete(cart_item)
+            await self.db.commit()
+            return True
+        
+        return False
+    
+    async def clear_cart(self, user_id: int) -> bool:
+        """Clear all items from cart."""
+        cart = await self.get_or_create_cart(user_id)
+        cart_items = (await self.db.execute(select(CartItem).where(CartItem.cart_id == cart.id))).scalars().all()
+        
+        for item in cart_items:
+            await self.db.delete(item)
+        
+        await self.db.commit()
+        return True
+    
+    async def apply_cart_batch(self, user_id: int, operations: List[CartOperation]) -> CartSummary:
+        """Apply many add/set/remove operations in one transaction (see CartService)."""
+        _validate_cart_batch(operations)
+        product_ids = {operation.product_id for operation in operations}
+        if product_ids:
+            active = set((await self.db.execute(_active_product_ids_stmt(product_ids))).scalars())
+            unknown = sorted({operation.product_id for operation in operations if operation.op != "remove"} - active)
+            if unknown:
+                raise ValidationError(f"Unknown or unavailable products: {unknown}")
+            
+            cart = (await self.db.execute(_cart_stmt(user_id))).scalar_one_or_none()
+            if cart is None:
+                cart = Cart(user_id=user_id)
+                self.db.add(cart)
+                await self.db.flush()
+            existing = {row.product_id: (row.id, row.quantity)
+                        for row in await self.db.execute(_cart_quantities_stmt(cart.id, product_ids))}
+            deletes, updates, inserts = _plan_cart_batch(operations, existing)
+            
+            if deletes:
+                await self.db.execute(delete(CartItem).where(CartItem.cart_id == cart.id, CartItem.product_id.in_(deletes)))
+            if updates:
+                await self.db.execute(update(CartItem), updates)
+            for add, rows in zip((True, False), inserts):
+                if rows:
+                    await self.db.execute(_upsert_cart_items_stmt(add), [{"cart_id": cart.id, **row} for row in rows])
+            await self.db.commit()
+        
+        return CartSummary.from_lines(await self.get_cart_lines(user_id))
+    
+    async def get_cart_total(self, user_id: int) -> float:
+        """Calculate cart total."""
+        cart_items = await self.get_cart_items(user_id)
+        total = sum(item.product.price * item.quantity for item in cart_items)
+        return round(total, 2)
+    
+    async def get_cart_count(self, user_id: int) -> int:
+        """Get total number of items in cart."""
+        cart_items = await self.get_cart_items(user_id)
+        return sum(item.quantity for item in cart_items)
@@ -1,10 +1,17 @@
 """Category service for category management."""
 
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from app.core.response_cache import response_cache
 from app.models.product import Category
+from app.core.tracing import traced_methods
 from typing import Optional, List
 
+def _categories_stmt():
+    return select(Category).where(Category.is_active == True).order_by(Category.name)
+
+@traced_methods
 class CategoryService:
     """Service layer for category operations."""
     
@@ -17,8 +24,7 @@ class CategoryService:
     
     def get_categories(self) -> List[Category]:
         """Get all active categories."""
-        stmt = select(Category).where(Category.is_active == True).order_by(Category.name)
-        result = self.db.execute(stmt)
+        result = self.db.execute(_categories_stmt())
         return result.scalars().all()
     
     def create_category(self, category_data: dict) -> Category:
@@ -26,6 +32,7 @@ class CategoryService:
         db_category = Category(**category_data)
         self.db.add(db_category)
         self.db.commit()
+        response_cache.purge("catalog")
         self.db.refresh(db_category)
         return db_category
     
@@ -40,5 +47,46 @@ class CategoryService:
                 setattr(db_category, field, value)
         
         self.db.commit()
+        response_cache.purge("catalog", f"category:{category_id}")
         self.db.refresh(db_category)
-        return db_category
\ No newline at end of file
+        return db_category
+
+@traced_methods
+class AsyncCategoryService:
+    """Async variant of CategoryService for use in NiceGUI handlers."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_category(self, category_id: int) -> Optional[Category]:
+        """Get category by ID."""
+        return await self.db.get(Category, category_id)
+    
+    async def get_categories(self) -> List[Category]:
+        """Get all active categories."""
+        result = await self.db.execute(_categories_stmt())
+        return result.scalars().all()
+    
+    async def create_category(self, category_data: dict) -> Category:
+        """Create new category."""
+        db_category = Category(**category_data)
+        self.db.add(db_category)
+        await self.db.commit()
+        response_cache.purge("catalog")
+        await self.db.refresh(db_category)
+        return db_category
+    
+    async def update_category(self, category_id: int, category_data: dict) -> Optional[Category]:
+        """Update category."""
+        db_category = await self.get_category(category_id)
+        if not db_category:
+            return None
+        
+        for field, value in category_data.items():
+            if hasattr(db_category, field) and value is not None:
+                setattr(db_category, field, value)
+        
+        await self.db.commit()
+        response_cache.purge("catalog", f"category:{category_id}")
+        await self.db.refresh(db_category)
+        return db_category
@@ -0,0 +1,40 @@
+"""Email delivery service.
+
+Messages are written to a local outbox directory as ``.eml`` files, which
+stands in for an SMTP provider during development and demos.
+"""
+
+from email.message import EmailMessage
+from pathlib import Path
+from datetime import datetime
+import uuid
+from app.core.config import settings
+from app.core.logging import app_logger
+
+class FileEmailSink:
+    """Email sink that writes RFC 5322 messages to a directory."""
+
+    def __init__(self, outbox_directory: str = None):
+        self.outbox = Path(outbox_directory or settings.email_outbox_directory)
+        self.outbox.mkdir(parents=True, exist_ok=True)
+
+    def send(self, to_address: str, subject: str, body: str) -> Path:
+        """Write a message to the outbox and return its path."""
+        message = EmailMessage()
+        message['From'] = settings.email_from_address
+        message['To'] = to_address
+        message['Subject'] = subject
+        message['Date'] = datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S +0000')
+        message.set_content(body)
+
+        filename = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.eml"
+        path = self.outbox / filename
+        # Write to a temp name first so readers never see a partial message
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_bytes(bytes(message))
+        tmp_path.replace(path)
+
+        app_logger.info(f"Email '{subject}' to {to_address} written to {path}")
+        return path
+
+email_sink = FileEmailSink()
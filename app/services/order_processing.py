@@ -0,0 +1,62 @@
+"""Background post-processing for placed orders.
+
+Checkout queues one job of each type in ``ORDER_FOLLOWUP_JOBS`` in the
+transaction that creates the order; the worker pool in ``app.core.jobs`` runs
+them off the UI event loop. Add new follow-up work by registering a handler
+and listing its job type in ``ORDER_FOLLOWUP_JOBS``.
+"""
+
+from typing import Any, Dict
+from sqlalchemy.orm import Session
+from app.core.database import engine
+from app.core.jobs import job_handler
+from app.services.order_service import OrderService
+from app.services.user_service import UserService
+from app.services.email_service import email_sink
+
+ADMIN_EMAIL = "admin@versace.com"
+
+ORDER_FOLLOWUP_JOBS = (
+    "order.receipt_email",
+    "order.admin_notification",
+)
+
+@job_handler("order.receipt_email")
+def send_receipt_email(payload: Dict[str, Any]) -> None:
+    """Email an itemised receipt to the customer."""
+    with Session(engine) as db:
+        order = OrderService(db).get_order(payload["order_id"])
+        if not order:
+            raise LookupError(f"Order {payload['order_id']} not found")
+        user = UserService(db).get_user(order.user_id)
+
+        lines = [f"{item.product.name} x{item.quantity}  ${item.price * item.quantity:.2f}" for item in order.items]
+        body = "\n".join([
+            f"Thank you for your order, {order.shipping_name}!",
+            "",
+            f"Order #{order.order_number}",
+            "",
+            *lines,
+            "",
+            f"Subtotal: ${order.subtotal:.2f}",
+            f"Tax: ${order.tax_amount:.2f}",
+            f"Shipping: ${order.shipping_cost:.2f}",
+            f"Total: ${order.total_amount:.2f}",
+            "",
+            "Ship to:",
+            order.shipping_name,
+            order.shipping_address,
+        ])
+        email_sink.send(user.email, f"Your Versace Perfumes receipt - Order #{order.order_number}", body)
+
+@job_handler("order.admin_notification")
+def send_admin_notification(payload: Dict[str, Any]) -> None:
+    """Notify the store admin about a new order."""
+    with Session(engine) as db:
+        order = OrderService(db).get_order(payload["order_id"])
+        if not order:
+            raise LookupError(f"Order {payload['order_id']} not found")
+
+        body = (f"New order #{order.order_number} placed for ${order.total_amount:.2f} "
+                f"({len(order.items)} line items, payment: {order.payment_method}).")
+        email_sink.send(ADMIN_EMAIL, f"New order #{order.order_number}", body)
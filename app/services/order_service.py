@@ -1,14 +1,116 @@
 """Order service for order management."""
 
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select
 from app.models.order import Order, OrderItem, OrderStatus
 from app.models.cart import CartItem
+from app.models.product import Product
+from app.models.user import User
+from app.models.read_models import OrderLine, OrderSummary
 from app.core.config import settings
-from typing import Optional, List
+from app.core.jobs import job_queue
+from app.core.metrics import record_order
+from app.core.tracing import traced_methods
+from typing import Optional, List, Dict, Sequence
 import uuid
 from datetime import datetime
 
+def _order_totals(cart_items: List[CartItem]) -> dict:
+    """Calculate subtotal, tax, shipping and total for cart items."""
+    subtotal = sum(item.product.price * item.quantity for item in cart_items)
+    tax_amount = round(subtotal * settings.tax_rate, 2)
+    
+    # Calculate shipping
+    shipping_cost = 0.0 if subtotal >= settings.free_shipping_threshold else settings.shipping_cost
+    
+    total_amount = round(subtotal + tax_amount + shipping_cost, 2)
+    return {
+        'subtotal': subtotal,
+        'tax_amount': tax_amount,
+        'shipping_cost': shipping_cost,
+        'total_amount': total_amount
+    }
+
+def _build_order(user_id: int, cart_items: List[CartItem], shipping_info: dict) -> Order:
+    """Build an unsaved order from cart items."""
+    # Generate order number
+    order_number = f"VER-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+    
+    return Order(
+        order_number=order_number,
+        user_id=user_id,
+        **_order_totals(cart_items),
+        shipping_name=shipping_info['name'],
+        shipping_address=shipping_info['address'],
+        shipping_phone=shipping_info.get('phone'),
+        payment_method=shipping_info.get('payment_method', 'Credit Card'),
+        status=OrderStatus.PENDING
+    )
+
+def _order_items(order: Order, cart_items: List[CartItem]) -> List[OrderItem]:
+    return [
+        OrderItem(
+            order_id=order.id,
+            product_id=cart_item.product_id,
+            quantity=cart_item.quantity,
+            price=cart_item.product.price
+        )
+        for cart_item in cart_items
+    ]
+
+def _ordered_cart_items_stmt(cart_items: List[CartItem]):
+    return delete(CartItem).where(CartItem.id.in_([item.id for item in cart_items]))
+
+def _followup_jobs(order: Order, job_types: Sequence[str]) -> list:
+    return [job_queue.new_job(job_type, {"order_id": order.id}) for job_type in job_types]
+
+def _order_stmt(order_id: int):
+    return (select(Order)
+            .options(joinedload(Order.items).joinedload(OrderItem.product))
+            .where(Order.id == order_id))
+
+def _user_orders_stmt(user_id: int):
+    return (select(Order)
+            .options(joinedload(Order.items).joinedload(OrderItem.product))
+            .where(Order.user_id == user_id)
+            .order_by(Order.created_at.desc()))
+
+def _all_orders_stmt():
+    return (select(Order)
+            .options(joinedload(Order.user), joinedload(Order.items).joinedload(OrderItem.product))
+            .order_by(Order.created_at.desc()))
+
+def _order_criteria(order_id: Optional[int] = None, user_id: Optional[int] = None) -> list:
+    criteria = []
+    if order_id is not None:
+        criteria.append(Order.id == order_id)
+    if user_id is not None:
+        criteria.append(Order.user_id == user_id)
+    return criteria
+
+def _order_summaries_stmt(criteria: list):
+    return (select(Order.id, Order.order_number, Order.status, Order.total_amount, Order.created_at,
+                   Order.user_id, User.username.label("customer"), Order.shipping_name, Order.shipping_address)
+            .outerjoin(User, Order.user_id == User.id)
+            .where(*criteria)
+            .order_by(Order.created_at.desc()))
+
+def _order_lines_stmt(criteria: list):
+    return (select(OrderItem.order_id, OrderItem.product_id, Product.name, OrderItem.quantity, OrderItem.price)
+            .join(Order, OrderItem.order_id == Order.id)
+            .join(Product, OrderItem.product_id == Product.id)
+            .where(*criteria)
+            .order_by(OrderItem.id))
+
+def _order_summaries(order_rows, line_rows) -> List[OrderSummary]:
+    """Assemble summaries from the order and line projections."""
+    lines: Dict[int, List[OrderLine]] = {}
+    for order_id, *line in line_rows:
+        lines.setdefault(order_id, []).append(OrderLine(*line))
+    return [OrderSummary(**row._mapping, items=tuple(lines.get(row.id, ()))) for row in order_rows]
+
+@traced_methods
 class OrderService:
     """Service layer for order operations."""
     
@@ -16,75 +118,61 @@ class OrderService:
         self.db = db
     
     def create_order_from_cart(self, user_id: int, cart_items: List[CartItem], 
-                              shipping_info: dict) -> Order:
-        """Create order from cart items."""
-        # Calculate totals
-        subtotal = sum(item.product.price * item.quantity for item in cart_items)
-        tax_amount = round(subtotal * settings.tax_rate, 2)
-        
-        # Calculate shipping
-        shipping_cost = 0.0 if subtotal >= settings.free_shipping_threshold else settings.shipping_cost
-        
-        total_amount = round(subtotal + tax_amount + shipping_cost, 2)
-        
-        # Generate order number
-        order_number = f"VER-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+                              shipping_info: dict, followup_jobs: Sequence[str] = ()) -> Order:
+        """Create order from cart items.
         
-        # Create order
-        order = Order(
-            order_number=order_number,
-            user_id=user_id,
-            subtotal=subtotal,
-            tax_amount=tax_amount,
-            shipping_cost=shipping_cost,
-            total_amount=total_amount,
-            shipping_name=shipping_info['name'],
-            shipping_address=shipping_info['address'],
-            shipping_phone=shipping_info.get('phone'),
-            payment_method=shipping_info.get('payment_method', 'Credit Card'),
-            status=OrderStatus.PENDING
-        )
+        The ordered cart items are removed and one job of each type in
+        ``followup_jobs`` is queued in the same transaction, so a placed
+        order always has its follow-ups and never stays in the cart.
+        """
+        order = _build_order(user_id, cart_items, shipping_info)
         
         self.db.add(order)
         self.db.flush()  # Get order ID
         
         # Create order items
-        for cart_item in cart_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=cart_item.product_id,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-            self.db.add(order_item)
+        self.db.add_all(_order_items(order, cart_items))
+        self.db.execute(_ordered_cart_items_stmt(cart_items))
+        self.db.add_all(_followup_jobs(order, followup_jobs))
         
         self.db.commit()
+        job_queue.notify(followup_jobs)
+        record_order()
         self.db.refresh(order)
         return order
     
     def get_order(self, order_id: int) -> Optional[Order]:
         """Get order by ID with items loaded."""
-        stmt = (select(Order)
-                .options(joinedload(Order.items).joinedload(OrderItem.product))
-                .where(Order.id == order_id))
-        return self.db.execute(stmt).scalar_one_or_none()
+        return self.db.execute(_order_stmt(order_id)).unique().scalar_one_or_none()
     
     def get_user_orders(self, user_id: int) -> List[Order]:
         """Get all orders for a user."""
-        stmt = (select(Order)
-                .options(joinedload(Order.items).joinedload(OrderItem.product))
-                .where(Order.user_id == user_id)
-                .order_by(Order.created_at.desc()))
-        result = self.db.execute(stmt)
-        return result.scalars().all()
+        result = self.db.execute(_user_orders_stmt(user_id))
+        return result.unique().scalars().all()
     
     def get_all_orders(self) -> List[Order]:
         """Get all orders (admin function)."""
-        stmt = (select(Order)
-                .options(joinedload(Order.user), joinedload(Order.items).joinedload(OrderItem.product))
-                .order_by(Order.created_at.desc()))
-        result = self.db.execute(stmt)
-        return result.scalars().all()
+        result = self.db.execute(_all_orders_stmt())
+        return result.unique().scalars().all()
+    
+    def get_order_summary(self, order_id: int) -> Optional[OrderSummary]:
+        """Get a read-only summary of one order."""
+        summaries = self._order_summaries(_order_criteria(order_id=order_id))
+        return summaries[0] if summaries else None
+    
+    def get_user_order_summaries(self, user_id: int) -> List[OrderSummary]:
+        """Get read-only summaries of a user's orders, newest first."""
+        return self._order_summaries(_order_criteria(user_id=user_id))
+    
+    def get_all_order_summaries(self) -> List[OrderSummary]:
+        """Get read-only summaries of all orders (admin function)."""
+        return self._order_summaries(_order_criteria())
+    
+    def _order_summaries(self, criteria: list) -> List[OrderSummary]:
+        order_rows = self.db.execute(_order_summaries_stmt(criteria)).all()
+        if not order_rows:
+            return []
+        return _order_summaries(order_rows, self.db.execute(_order_lines_stmt(criteria)))
     
     def update_order_status(self, order_id: int, status: OrderStatus) -> Optional[Order]:
         """Update order status."""
@@ -97,4 +185,75 @@ class OrderService:
     
     def cancel_order(self, order_id: int) -> Optional[Order]:
         """Cancel an order."""
-        return self.update_order_status(order_id, OrderStatus.CANCELLED)
\ No newline at end of file
+        return self.update_order_status(order_id, OrderStatus.CANCELLED)
+
+@traced_methods
+class AsyncOrderService:
+    """Async variant of OrderService for use in NiceGUI handlers."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def create_order_from_cart(self, user_id: int, cart_items: List[CartItem], 
+                                     shipping_info: dict, followup_jobs: Sequence[str] = ()) -> Order:
+        """Create order from cart items (see OrderService)."""
+        order = _build_order(user_id, cart_items, shipping_info)
+        
+        self.db.add(order)
+        await self.db.flush()  # Get order ID
+        
+        self.db.add_all(_order_items(order, cart_items))
+        await self.db.execute(_ordered_cart_items_stmt(cart_items))
+        self.db.add_all(_followup_jobs(order, followup_jobs))
+        
+        await self.db.commit()
+        job_queue.notify(followup_jobs)
+        record_order()
+        await self.db.refresh(order)
+        return order
+    
+    async def get_order(self, order_id: int) -> Optional[Order]:
+        """Get order by ID with items loaded."""
+        result = await self.db.execute(_order_stmt(order_id))
+        return result.unique().scalar_one_or_none()
+    
+    async def get_user_orders(self, user_id: int) -> List[Order]:
+        """Get all orders for a user."""
+        result = await self.db.execute(_user_orders_stmt(user_id))
+        return result.unique().scalars().all()
+    
+    async def get_all_orders(self) -> List[Order]:
+        """Get all orders (admin function)."""
+        result = await self.db.execute(_all_orders_stmt())
+        return result.unique().scalars().all()
+    
+    async def get_order_summary(self, order_id: int) -> Optional[OrderSummary]:
+        """Get a read-only summary of one order."""
+        summaries = await self._order_summaries(_order_criteria(order_id=order_id))
+        return summaries[0] if summaries else None
+    
+    async def get_user_order_summaries(self, user_id: int) -> List[OrderSummary]:
+        """Get read-only summaries of a user's orders, newest first."""
+        return await self._order_summaries(_order_criteria(user_id=user_id))
+    
+    async def get_all_order_summaries(self) -> List[OrderSummary]:
+        """Get read-only summaries of all orders (admin function)."""
+        return await self._order_summaries(_order_criteria())
+    
+    async def _order_summaries(self, criteria: list) -> List[OrderSummary]:
+        order_rows = (await self.db.execute(_order_summaries_stmt(criteria))).all()
+        if not order_rows:
+            return []
+        return _order_summaries(order_rows, await self.db.execute(_order_lines_stmt(criteria)))
+    
+    async def update_order_status(self, order_id: int, status: OrderStatus) -> Optional[Order]:
+        """Update order status."""
+        order = await self.get_order(order_id)
+        if order:
+            order.status = status
+            await self.db.commit()
+        return order
+    
+    async def cancel_order(self, order_id: int) -> Optional[Order]:
+        """Cancel an order."""
+        return await self.update_order_status(order_id, OrderStatus.CANCELLED)
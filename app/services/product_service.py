@@ -1,10 +1,81 @@
 """Product service for product management."""
 
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, func
+from app.core.response_cache import response_cache
 from app.models.product import Product, Category, Review
-from typing import Optional, List
+from app.models.read_models import ProductCard
+from app.core.tracing import traced_methods
+from typing import Optional, List, Tuple
 
+def _product_stmt(product_id: int):
+    return select(Product).options(joinedload(Product.category)).where(Product.id == product_id)
+
+def _products_stmt(category_id: Optional[int], search: Optional[str], limit: int, offset: int):
+    stmt = select(Product).options(joinedload(Product.category)).where(Product.is_active == True)
+    
+    if category_id:
+        stmt = stmt.where(Product.category_id == category_id)
+    
+    if search:
+        search_term = f"%{search}%"
+        stmt = stmt.where(Product.name.ilike(search_term))
+    
+    return stmt.offset(offset).limit(limit)
+
+def _featured_products_stmt(limit: int):
+    return (select(Product)
+            .options(joinedload(Product.category))
+            .where(Product.is_active == True)
+            .order_by(Product.created_at.desc())
+            .limit(limit))
+
+def _product_cards_stmt():
+    return (select(Product.id, Product.name, Category.name.label("category_name"), Product.price,
+                   Product.size, Product.image_url, Product.stock_quantity)
+            .join(Category, Product.category_id == Category.id)
+            .where(Product.is_active == True))
+
+def _filtered_cards_stmt(category_id: Optional[int], search: Optional[str], limit: int, offset: int):
+    stmt = _product_cards_stmt()
+    
+    if category_id:
+        stmt = stmt.where(Product.category_id == category_id)
+    
+    if search:
+        stmt = stmt.where(Product.name.ilike(f"%{search}%"))
+    
+    return stmt.offset(offset).limit(limit)
+
+def _card_page_stmt(category_id: Optional[int], search: Optional[str], after_id: Optional[int], limit: int):
+    # Keyset pagination: resumes after the last ID seen, so deep pages cost the same as the first
+    stmt = _product_cards_stmt()
+    
+    if category_id:
+        stmt = stmt.where(Product.category_id == category_id)
+    
+    if search:
+        stmt = stmt.where(Product.name.ilike(f"%{search}%"))
+    
+    if after_id:
+        stmt = stmt.where(Product.id > after_id)
+    
+    return stmt.order_by(Product.id).limit(limit)
+
+def _featured_cards_stmt(limit: int):
+    return _product_cards_stmt().order_by(Product.created_at.desc()).limit(limit)
+
+def _product_rating_stmt(product_id: int):
+    return select(func.avg(Review.rating), func.count(Review.id)).where(Review.product_id == product_id)
+
+def _product_reviews_stmt(product_id: int):
+    return (select(Review)
+            .options(joinedload(Review.user))
+            .where(Review.product_id == product_id)
+            .order_by(Review.created_at.desc()))
+
+@traced_methods
 class ProductService:
     """Service layer for product operations."""
     
@@ -13,40 +84,42 @@ class ProductService:
     
     def get_product(self, product_id: int) -> Optional[Product]:
         """Get product by ID with category loaded."""
-        stmt = select(Product).options(joinedload(Product.category)).where(Product.id == product_id)
-        return self.db.execute(stmt).scalar_one_or_none()
+        return self.db.execute(_product_stmt(product_id)).scalar_one_or_none()
     
     def get_products(self, category_id: Optional[int] = None, search: Optional[str] = None, 
                     limit: int = 50, offset: int = 0) -> List[Product]:
         """Get products with optional filtering."""
-        stmt = select(Product).options(joinedload(Product.category)).where(Product.is_active == True)
-        
-        if category_id:
-            stmt = stmt.where(Product.category_id == category_id)
-        
-        if search:
-            search_term = f"%{search}%"
-            stmt = stmt.where(Product.name.ilike(search_term))
-        
-        stmt = stmt.offset(offset).limit(limit)
-        result = self.db.execute(stmt)
+        result = self.db.execute(_products_stmt(category_id, search, limit, offset))
         return result.scalars().all()
     
     def get_featured_products(self, limit: int = 6) -> List[Product]:
         """Get featured products (newest products for demo)."""
-        stmt = (select(Product)
-                .options(joinedload(Product.category))
-                .where(Product.is_active == True)
-                .order_by(Product.created_at.desc())
-                .limit(limit))
-        result = self.db.execute(stmt)
+        result = self.db.execute(_featured_products_stmt(limit))
         return result.scalars().all()
     
+    def get_product_cards(self, category_id: Optional[int] = None, search: Optional[str] = None,
+                          limit: int = 50, offset: int = 0) -> List[ProductCard]:
+        """Get product cards for listings, filtered like get_products."""
+        result = self.db.execute(_filtered_cards_stmt(category_id, search, limit, offset))
+        return [ProductCard(**row._mapping) for row in result]
+    
+    def get_product_card_page(self, category_id: Optional[int] = None, search: Optional[str] = None,
+                              after_id: Optional[int] = None, limit: int = 50) -> List[ProductCard]:
+        """Get product cards in ID order, starting after ``after_id``."""
+        result = self.db.execute(_card_page_stmt(category_id, search, after_id, limit))
+        return [ProductCard(**row._mapping) for row in result]
+    
+    def get_featured_product_cards(self, limit: int = 6) -> List[ProductCard]:
+        """Get product cards for the newest products."""
+        result = self.db.execute(_featured_cards_stmt(limit))
+        return [ProductCard(**row._mapping) for row in result]
+    
     def create_product(self, product_data: dict) -> Product:
         """Create new product."""
         db_product = Product(**product_data)
         self.db.add(db_product)
         self.db.commit()
+        response_cache.purge("catalog")
         self.db.refresh(db_product)
         return db_product
     
@@ -61,6 +134,7 @@ class ProductService:
                 setattr(db_product, field, value)
         
         self.db.commit()
+        response_cache.purge("catalog", f"product:{product_id}")
         self.db.refresh(db_product)
         return db_product
     
@@ -72,15 +146,17 @@ class ProductService:
         
         db_product.is_active = False
         self.db.commit()
+        response_cache.purge("catalog", f"product:{product_id}")
         return True
     
+    def get_product_rating(self, product_id: int) -> Tuple[Optional[float], int]:
+        """Average rating and number of reviews for a product."""
+        average, count = self.db.execute(_product_rating_stmt(product_id)).one()
+        return average, count
+    
     def get_product_reviews(self, product_id: int) -> List[Review]:
         """Get reviews for a product."""
-        stmt = (select(Review)
-                .options(joinedload(Review.user))
-                .where(Review.product_id == product_id)
-                .order_by(Review.created_at.desc()))
-        result = self.db.execute(stmt)
+        result = self.db.execute(_product_reviews_stmt(product_id))
         return result.scalars().all()
     
     def add_review(self, product_id: int, user_id: int, rating: int, comment: str) -> Review:
@@ -93,5 +169,105 @@ class ProductService:
         )
         self.db.add(review)
         self.db.commit()
+        response_cache.purge(f"product:{product_id}")
         self.db.refresh(review)
-        return review
\ No newline at end of file
+        return review
+
+@traced_methods
+class AsyncProductService:
+    """Async variant of ProductService for use in NiceGUI handlers."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_product(self, product_id: int) -> Optional[Product]:
+        """Get product by ID with category loaded."""
+        result = await self.db.execute(_product_stmt(product_id))
+        return result.scalar_one_or_none()
+    
+    async def get_products(self, category_id: Optional[int] = None, search: Optional[str] = None, 
+                           limit: int = 50, offset: int = 0) -> List[Product]:
+        """Get products with optional filtering."""
+        result = await self.db.execute(_products_stmt(category_id, search, limit, offset))
+        return result.scalars().all()
+    
+    async def get_featured_products(self, limit: int = 6) -> List[Product]:
+        """Get featured products (newest products for demo)."""
+        result = await self.db.execute(_featured_products_stmt(limit))
+        return result.scalars().all()
+    
+    async def get_product_cards(self, category_id: Optional[int] = None, search: Optional[str] = None,
+                                limit: int = 50, offset: int = 0) -> List[ProductCard]:
+        """Get product cards for listings, filtered like get_products."""
+        result = await self.db.execute(_filtered_cards_stmt(category_id, search, limit, offset))
+        return [ProductCard(**row._mapping) for row in result]
+    
+    async def get_product_card_page(self, category_id: Optional[int] = None, search: Optional[str] = None,
+                                    after_id: Optional[int] = None, limit: int = 50) -> List[ProductCard]:
+        """Get product cards in ID order, starting after ``after_id``."""
+        result = await self.db.execute(_card_page_stmt(category_id, search, after_id, limit))
+        return [ProductCard(**row._mapping) for row in result]
+    
+    async def get_featured_product_cards(self, limit: int = 6) -> List[ProductCard]:
+        """Get product cards for the newest products."""
+        result = await self.db.execute(_featured_cards_stmt(limit))
+        return [ProductCard(**row._mapping) for row in result]
+    
+    async def create_product(self, product_data: dict) -> Product:
+        """Create new product."""
+        db_product = Product(**product_data)
+        self.db.add(db_product)
+        await self.db.commit()
+        response_cache.purge("catalog")
+        await self.db.refresh(db_product)
+        return db_product
+    
+    async def update_product(self, product_id: int, product_data: dict) -> Optional[Product]:
+        """Update product."""
+        db_product = await self.get_product(product_id)
+        if not db_product:
+            return None
+        
+        for field, value in product_data.items():
+            if hasattr(db_product, field) and value is not None:
+                setattr(db_product, field, value)
+        
+        await self.db.commit()
+        response_cache.purge("catalog", f"product:{product_id}")
+        await self.db.refresh(db_product)
+        return db_product
+    
+    async def delete_product(self, product_id: int) -> bool:
+        """Soft delete product."""
+        db_product = await self.get_product(product_id)
+        if not db_product:
+            return False
+        
+        db_product.is_active = False
+        await self.db.commit()
+        response_cache.purge("catalog", f"product:{product_id}")
+        return True
+    
+    async def get_product_rating(self, product_id: int) -> Tuple[Optional[float], int]:
+        """Average rating and number of reviews for a product."""
+        average, count = (await self.db.execute(_product_rating_stmt(product_id))).one()
+        return average, count
+    
+    async def get_product_reviews(self, product_id: int) -> List[Review]:
+        """Get reviews for a product."""
+        result = await self.db.execute(_product_reviews_stmt(product_id))
+        return result.scalars().all()
+    
+    async def add_review(self, product_id: int, user_id: int, rating: int, comment: str) -> Review:
+        """Add a review for a product."""
+        review = Review(
+            product_id=product_id,
+            user_id=user_id,
+            rating=rating,
+            comment=comment
+        )
+        self.db.add(review)
+        await self.db.commit()
+        response_cache.purge(f"product:{product_id}")
+        await self.db.refresh(review)
+        return review
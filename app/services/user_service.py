@@ -1,11 +1,25 @@
 """User service for authentication and user management."""
 
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.user import User
-from app.core.auth import AuthManager
-from typing import Optional
+from app.core.auth import AuthManager, get_pwd_context
+from app.core.hashing import password_hasher
+from app.core.tracing import traced_methods
+from typing import Optional, List
 
+def _new_user(user_data: dict, hashed_password: str) -> User:
+    return User(
+        email=user_data['email'],
+        username=user_data['username'],
+        hashed_password=hashed_password,
+        full_name=user_data.get('full_name'),
+        phone=user_data.get('phone'),
+        address=user_data.get('address')
+    )
+
+@traced_methods
 class UserService:
     """Service layer for user operations."""
     
@@ -26,27 +40,32 @@ class UserService:
         stmt = select(User).where(User.username == username)
         return self.db.execute(stmt).scalar_one_or_none()
     
+    def get_users(self) -> List[User]:
+        """Get all users, newest first."""
+        stmt = select(User).order_by(User.created_at.desc())
+        return self.db.execute(stmt).scalars().all()
+    
     def create_user(self, user_data: dict) -> User:
         """Create new user."""
         hashed_password = AuthManager.get_password_hash(user_data['password'])
-        db_user = User(
-            email=user_data['email'],
-            username=user_data['username'],
-            hashed_password=hashed_password,
-            full_name=user_data.get('full_name'),
-            phone=user_data.get('phone'),
-            address=user_data.get('address')
-        )
+        db_user = _new_user(user_data, hashed_password)
         self.db.add(db_user)
         self.db.commit()
         self.db.refresh(db_user)
         return db_user
     
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
-        """Authenticate user credentials."""
+        """Authenticate user credentials, upgrading the hash if the bcrypt cost changed."""
         user = self.get_user_by_email(email)
-        if not user or not AuthManager.verify_password(password, user.hashed_password):
+        if not user:
+            get_pwd_context().dummy_verify()  # same timing as a wrong password
+            return None
+        valid, new_hash = get_pwd_context().verify_and_update(password, user.hashed_password)
+        if not valid:
             return None
+        if new_hash:
+            user.hashed_password = new_hash
+            self.db.commit()
         return user
     
     def update_user(self, user_id: int, user_data: dict) -> Optional[User]:
@@ -80,4 +99,70 @@ class UserService:
             self.db.commit()
             return admin_user
         
-        return existing_admin
\ No newline at end of file
+        return existing_admin
+
+@traced_methods
+class AsyncUserService:
+    """Async variant of UserService for use in NiceGUI handlers.
+    
+    bcrypt hashing is CPU bound, so it runs on the password hashing process
+    pool instead of on the event loop.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_user(self, user_id: int) -> Optional[User]:
+        """Get user by ID."""
+        return await self.db.get(User, user_id)
+    
+    async def get_user_by_email(self, email: str) -> Optional[User]:
+        """Get user by email."""
+        stmt = select(User).where(User.email == email)
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+    
+    async def get_user_by_username(self, username: str) -> Optional[User]:
+        """Get user by username."""
+        stmt = select(User).where(User.username == username)
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+    
+    async def get_users(self) -> List[User]:
+        """Get all users, newest first."""
+        stmt = select(User).order_by(User.created_at.desc())
+        return (await self.db.execute(stmt)).scalars().all()
+    
+    async def create_user(self, user_data: dict) -> User:
+        """Create new user."""
+        hashed_password = await password_hasher.hash(user_data['password'])
+        db_user = _new_user(user_data, hashed_password)
+        self.db.add(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        return db_user
+    
+    async def authenticate_user(self, email: str, password: str) -> Optional[User]:
+        """Authenticate user credentials, upgrading the hash if the bcrypt cost changed."""
+        user = await self.get_user_by_email(email)
+        if not user:
+            await password_hasher.dummy_verify()  # same timing as a wrong password
+            return None
+        if not await password_hasher.verify(password, user.hashed_password):
+            return None
+        if password_hasher.needs_rehash(user.hashed_password):
+            user.hashed_password = await password_hasher.hash(password)
+            await self.db.commit()
+        return user
+    
+    async def update_user(self, user_id: int, user_data: dict) -> Optional[User]:
+        """Update user information."""
+        db_user = await self.get_user(user_id)
+        if not db_user:
+            return None
+        
+        for field, value in user_data.items():
+            if hasattr(db_user, field) and value is not None:
+                setattr(db_user, field, value)
+        
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        return db_user
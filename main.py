@@ -3,32 +3,121 @@ Versace Perfume E-commerce Store
 Luxury perfume shopping experience with elegant UI and complete e-commerce functionality.
 """
 
-import asyncio
-from nicegui import ui, app
-from app.core.config import settings
-from app.core.database import create_tables, init_sample_data
-from app.core.logging import app_logger
-from app.frontend.pages import home, products, cart, checkout, admin, auth
-from app.core.auth import AuthManager
+from app.core.startup import startup_profiler
+
+with startup_profiler.phase("import nicegui"):
+    from nicegui import ui, app
+
+with startup_profiler.phase("import core"):
+    from app.core.config import settings
+    from app.core.database import ensure_schema
+    from app.core.logging import app_logger
+    from app.core.jobs import job_queue
+    from app.core.hashing import is_hashing_worker, password_hasher
+    from app.core.sessions import session_store
+    from app.core.broker import event_broker
+    from app.core.catalog_version import setup_catalog_versioning
+    from app.core.query_stats import setup_query_instrumentation
+    from app.core.response_cache import setup_response_cache
+    from app.core.compression import setup_compression
+    from app.core.timing import setup_timing
+    from app.core.tracing import setup_tracing, tracer
+    from app.core.profiling import setup_profiling
+    from app.core.loop_lag import loop_lag_monitor
+    from app.core.admission import setup_admission_control
+    from app.core.health import prioritize_health_routes, system_sampler
+    from app.core.middleware import add_rate_limiting, add_request_id, add_session_middleware
+
+with startup_profiler.phase("import pages"):
+    from app.frontend.pages import home, products, cart, checkout, admin, auth
+    from app.api import api_router
 
 def setup_app():
     """Initialize the application with all necessary components."""
     try:
-        # Create database tables
-        create_tables()
-        app_logger.info("Database tables created successfully")
+        # Create or upgrade tables unless the schema stamp is current
+        with startup_profiler.phase("schema"):
+            ensure_schema()
+        
+        # Committed catalog writes change the REST API's ETags
+        setup_catalog_versioning()
         
-        # Initialize sample data
-        init_sample_data()
-        app_logger.info("Sample data initialized")
+        # Sample data is seeded by `python -m app.core.seed` in production
+        if settings.seed_on_startup:
+            with startup_profiler.phase("seed"):
+                from app.core.seed import seed_database
+                seed_database()
+            app_logger.info("Sample data initialized")
         
-        # Setup authentication
-        AuthManager.setup()
-        app_logger.info("Authentication system initialized")
+        with startup_profiler.phase("configure app"):
+            # Setup static files
+            app.add_static_files('/static', 'app/static')
+            app_logger.info("Static files configured")
+            
+            # REST API (catalog under /api/v1)
+            app.include_router(api_router)
+            
+            # Health probes answered ahead of every NiceGUI page route
+            prioritize_health_routes(app)
+            
+            # Per-request SQL statement instrumentation
+            setup_query_instrumentation(app)
+            
+            # Cached GET API responses, outside the SQL instrumentation so hits skip it
+            setup_response_cache(app)
+            
+            # Negotiated brotli/zstd/gzip, outside the response cache so its hits are compressed too
+            setup_compression(app)
+            
+            # Server-Timing phases and per-route latency histograms, inside tracing and rate limiting
+            setup_timing(app)
+            
+            # Root span per request; services, handlers and SQL statements nest under it
+            setup_tracing(app)
+            app.on_shutdown(tracer.shutdown)
+            
+            # cProfile for one route at a time, armed from the admin Profiling tab
+            setup_profiling(app)
+            
+            # Per-client request rate limits, outermost so rejected requests do no other work
+            if settings.rate_limit_enabled:
+                add_rate_limiting(app)
+            
+            # 503 for low-priority requests while the event loop lags, outside rate limiting
+            if settings.admission_enabled:
+                setup_admission_control(app)
+            
+            # Session cookie, kept off public (CDN-cacheable) responses such as the catalog API
+            add_session_middleware(app, settings.secret_key)
+            
+            # Request IDs for log records, outermost so every log line of a request carries one
+            add_request_id(app)
+            
+            # Background job workers
+            app.on_startup(job_queue.start)
+            app.on_shutdown(lambda: job_queue.stop())  # stop(timeout) would be handed a client
+            app_logger.info("Background job queue configured")
+            
+            # Password hashing worker processes
+            app.on_shutdown(password_hasher.shutdown)
+            
+            # Batched session writes; other workers' writes evict our cached copies
+            app.on_startup(session_store.start)
+            app.on_shutdown(session_store.stop)
+            event_broker.subscribe("sessions", lambda event: session_store.invalidate(event["ids"]))
+            app.on_startup(event_broker.start)
+            app.on_shutdown(event_broker.stop)
+            
+            # Event loop lag, exported on /metrics and used by admission control
+            app.on_startup(loop_lag_monitor.start)
+            app.on_shutdown(loop_lag_monitor.stop)
+            
+            # CPU/memory/disk sampled in the background so health checks never wait on psutil
+            app.on_startup(system_sampler.start)
+            app.on_shutdown(system_sampler.stop)
         
-        # Setup static files
-        app.add_static_files('/static', 'app/static')
-        app_logger.info("Static files configured")
+        # Logs the startup breakdown once the server accepts requests
+        app.on_startup(startup_profiler.finish)
         
     except Exception as e:
         app_logger.error(f"Error during app setup: {e}")
@@ -36,6 +125,12 @@ def setup_app():
 
 def main():
     """Main application entry point."""
+    if settings.workers > 1 and settings.worker_id is None:
+        # Multi-worker mode: this process only dispatches to the workers it starts
+        from app.core.cluster import run_cluster
+        run_cluster()
+        return
+    
     try:
         setup_app()
         
@@ -49,12 +144,14 @@ def main():
             host=settings.host,
             reload=settings.debug,
             show=settings.debug,
-            favicon="🌟"
+            favicon="🌟",
+            storage_secret=settings.secret_key  # signs the cookie that carries the session ID
         )
         
     except Exception as e:
         app_logger.error(f"Failed to start application: {e}")
         raise
 
-if __name__ in {"__main__", "__mp_main__"}:
+# Hashing pool workers import this module too (as __mp_main__) and must not start the app
+if __name__ in {"__main__", "__mp_main__"} and not is_hashing_worker():
     main()
\ No newline at end of file